@@ -1,98 +1,245 @@
+import json
 import logging
 import asyncio
-from typing import List, Union, Optional
+from datetime import datetime
+from typing import List, Union, Optional, Dict, Any, AsyncIterator
 import asyncpg
 
 # Import necessary modules
-from easy_bot import get_bot_instance, current_update, get_chat_id_from_update
+from easy_bot import get_bot_instance, current_update, get_chat_id_from_update, on_startup
+from base.delivery import (
+    DELIVERY_RETRY, handle_delivery_error, resend_chat_id, retry_delay,
+    ensure_is_active_column, flush_inactive_chats
+)
 
 logger = logging.getLogger(__name__)
 
-async def get_all_user_chat_ids() -> List[int]:
+# Статусы заданий рассылки
+JOB_STATUS_RUNNING = "running"
+JOB_STATUS_COMPLETED = "completed"
+JOB_STATUS_CANCELLED = "cancelled"
+
+# Задачи рассылки, выполняющиеся в текущем процессе: {job_id: asyncio.Task}
+_running_jobs = {}
+
+# Задания, отмененные из текущего процесса (проверяются перед каждой отправкой)
+_cancel_requested = set()
+
+# Количество получателей, загружаемых из БД за один запрос
+RECIPIENTS_BATCH_SIZE = 1000
+
+# Максимальное количество попыток отправки одному получателю
+MAX_SEND_ATTEMPTS = 3
+
+# Флаги создания таблицы заданий рассылки и столбцов сегментов
+_broadcast_tables_ready = False
+_recipient_columns_ready = False
+
+async def _connect():
+    """Создает новое соединение с PostgreSQL по настройкам из credentials"""
+    from credentials.postgres.config import HOST, PORT, DATABASE, USER, PASSWORD
+    return await asyncpg.connect(
+        host=HOST,
+        port=PORT,
+        user=USER,
+        password=PASSWORD,
+        database=DATABASE,
+        timeout=10.0
+    )
+
+def _jobs_table() -> str:
+    """Возвращает имя таблицы заданий рассылки с префиксом бота"""
+    from credentials.postgres.config import BOT_PREFIX
+    return f"{BOT_PREFIX}broadcast_jobs"
+
+async def ensure_broadcast_tables(conn) -> None:
     """
-    Получает все chat_id пользователей из базы данных PostgreSQL.
+    Создает таблицу заданий рассылки, если она еще не существует.
     
-    Returns:
-        List[int]: Список chat_id всех пользователей
+    Прогресс задания хранится как high-water mark: last_chat_id - последний
+    обработанный chat_id. Получатели обходятся строго по возрастанию chat_id,
+    поэтому после перезапуска рассылка продолжается с chat_id > last_chat_id.
+    
+    Args:
+        conn: Соединение asyncpg
     """
-    conn = None
-    try:
-        # Загружаем настройки PostgreSQL напрямую
-        from credentials.postgres.config import HOST, PORT, DATABASE, USER, PASSWORD, BOT_PREFIX
-        logger.info(f"Подключение к PostgreSQL: {HOST}:{PORT}, БД: {DATABASE}, пользователь: {USER}")
-        
-        # Устанавливаем прямое соединение с PostgreSQL
-        conn = await asyncpg.connect(
-            host=HOST,
-            port=PORT,
-            user=USER,
-            password=PASSWORD,
-            database=DATABASE,
-            timeout=10.0
+    global _broadcast_tables_ready
+    
+    if _broadcast_tables_ready:
+        return
+    
+    jobs_table = _jobs_table()
+    await conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {jobs_table} (
+            id SERIAL PRIMARY KEY,
+            message_text TEXT NOT NULL,
+            parse_mode VARCHAR(20),
+            recipients BIGINT[],
+            segment JSONB,
+            status VARCHAR(20) NOT NULL DEFAULT 'running',
+            last_chat_id BIGINT,
+            sent_count INTEGER NOT NULL DEFAULT 0,
+            failed_count INTEGER NOT NULL DEFAULT 0,
+            total_count INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            finished_at TIMESTAMP
         )
+    ''')
+    await conn.execute(f"ALTER TABLE {jobs_table} ADD COLUMN IF NOT EXISTS segment JSONB")
+    await conn.execute(f'''
+        CREATE INDEX IF NOT EXISTS {jobs_table}_status_idx
+        ON {jobs_table} (status)
+    ''')
+    
+    _broadcast_tables_ready = True
+
+def _users_table() -> str:
+    """Возвращает имя таблицы пользователей с префиксом бота"""
+    from credentials.postgres.config import BOT_PREFIX
+    return f"{BOT_PREFIX}users"
+
+async def ensure_recipient_columns(conn) -> None:
+    """
+    Добавляет в таблицу пользователей столбцы, используемые фильтрами сегментов,
+    и индекс для постраничного обхода получателей по chat_id.
+    
+    Args:
+        conn: Соединение asyncpg
+    """
+    global _recipient_columns_ready
+    
+    if _recipient_columns_ready:
+        return
+    
+    users_table = _users_table()
+    await conn.execute(f"ALTER TABLE {users_table} ADD COLUMN IF NOT EXISTS language VARCHAR(10)")
+    await conn.execute(f"ALTER TABLE {users_table} ADD COLUMN IF NOT EXISTS last_active_at TIMESTAMP")
+    await conn.execute(f"CREATE INDEX IF NOT EXISTS {users_table}_chat_id_idx ON {users_table} (chat_id)")
+    await ensure_is_active_column(conn)
+    
+    _recipient_columns_ready = True
+
+def _segment_conditions(segment: Optional[Dict[str, Any]], start_index: int = 1):
+    """
+    Формирует условия WHERE для фильтров сегмента получателей.
+    
+    Args:
+        segment: Фильтры сегмента (language, created_after, created_before, active_since)
+        start_index: Номер первого параметра запроса ($N)
         
-        # Проверяем соединение
-        await conn.fetchval("SELECT 1")
-        logger.info("Соединение с PostgreSQL успешно установлено")
+    Returns:
+        Tuple[List[str], List[Any]]: Условия и значения параметров
+    """
+    conditions = []
+    values = []
+    
+    if not segment:
+        return conditions, values
+    
+    columns = {
+        'language': "language = ${}",
+        'created_after': "created_at >= ${}",
+        'created_before': "created_at < ${}",
+        'active_since': "last_active_at >= ${}",
+    }
+    for key, condition in columns.items():
+        value = segment.get(key)
+        if value is None:
+            continue
+        if key != 'language' and isinstance(value, str):
+            value = datetime.fromisoformat(value)
+        conditions.append(condition.format(start_index + len(values)))
+        values.append(value)
+    
+    return conditions, values
+
+async def iter_recipient_chat_ids(segment: Optional[Dict[str, Any]] = None,
+                                  after_chat_id: Optional[int] = None,
+                                  batch_size: int = RECIPIENTS_BATCH_SIZE) -> AsyncIterator[int]:
+    """
+    Постранично выдает chat_id получателей по возрастанию, не загружая весь список в память.
+    
+    Используется keyset-пагинация (chat_id > последнего выданного), поэтому расход памяти
+    не зависит от размера аудитории, а обход можно продолжить с любого chat_id.
+    Пользователи, помеченные неактивными (заблокировали бота), пропускаются.
+    
+    Args:
+        segment: Фильтры сегмента: language (код языка), created_after, created_before,
+                 active_since (datetime или строка ISO)
+        after_chat_id: Начать с chat_id, строго большего указанного
+        batch_size: Количество chat_id, загружаемых за один запрос
         
-        # Получаем список пользователей
-        query = f"SELECT DISTINCT chat_id FROM {BOT_PREFIX}users"
-        rows = await conn.fetch(query)
+    Yields:
+        int: chat_id очередного получателя
+    """
+    conn = await _connect()
+    try:
+        await ensure_recipient_columns(conn)
         
-        # Извлекаем chat_id из результата
-        chat_ids = [row['chat_id'] for row in rows]
-        logger.info(f"Получено {len(chat_ids)} chat_id пользователей из PostgreSQL")
+        conditions, values = _segment_conditions(segment, start_index=3)
+        where = "".join(f" AND {condition}" for condition in conditions)
+        query = f'''
+            SELECT DISTINCT chat_id
+            FROM {_users_table()}
+            WHERE chat_id > $1 AND is_active{where}
+            ORDER BY chat_id
+            LIMIT $2
+        '''
         
-        # Если не найдено пользователей, добавим тестового пользователя
-        if not chat_ids:
-            logger.warning("Не найдено пользователей в базе данных PostgreSQL. Добавляем тестового пользователя.")
-            
-            # Добавляем тестового пользователя
-            current_update_obj = current_update
-            if current_update_obj and hasattr(current_update_obj, 'effective_user'):
-                user_id = current_update_obj.effective_user.id
-                chat_id = get_chat_id_from_update(current_update_obj)
-                username = current_update_obj.effective_user.username or "test_user"
-                
-                logger.info(f"Добавление текущего пользователя в БД: user_id={user_id}, chat_id={chat_id}, username={username}")
-                
-                await conn.execute(
-                    f"INSERT INTO {BOT_PREFIX}users (user_id, chat_id, username) VALUES ($1, $2, $3) ON CONFLICT (user_id) DO UPDATE SET chat_id = $2, username = $3",
-                    user_id, chat_id, username
-                )
-                
-                # Получаем обновленный список пользователей
-                rows = await conn.fetch(query)
-                chat_ids = [row['chat_id'] for row in rows]
-                logger.info(f"После добавления получено {len(chat_ids)} chat_id пользователей")
-            else:
-                logger.error("Не удалось получить информацию о текущем пользователе для добавления тестового пользователя")
-                
-                # Используем тестовые данные
-                test_user_id = 123456789
-                test_chat_id = 123456789
-                test_username = "test_user"
-                
-                logger.info(f"Добавление тестового пользователя в БД: user_id={test_user_id}, chat_id={test_chat_id}, username={test_username}")
-                
-                await conn.execute(
-                    f"INSERT INTO {BOT_PREFIX}users (user_id, chat_id, username) VALUES ($1, $2, $3) ON CONFLICT (user_id) DO UPDATE SET chat_id = $2, username = $3",
-                    test_user_id, test_chat_id, test_username
-                )
-                
-                # Получаем обновленный список пользователей
-                rows = await conn.fetch(query)
-                chat_ids = [row['chat_id'] for row in rows]
-                logger.info(f"После добавления получено {len(chat_ids)} chat_id пользователей")
+        # Начинаем с минимального BIGINT, если курсор не задан
+        cursor = after_chat_id if after_chat_id is not None else -(2 ** 63)
+        while True:
+            rows = await conn.fetch(query, cursor, batch_size, *values)
+            for row in rows:
+                yield row['chat_id']
+            if len(rows) < batch_size:
+                break
+            cursor = rows[-1]['chat_id']
+    finally:
+        await conn.close()
+
+async def count_recipients(segment: Optional[Dict[str, Any]] = None) -> int:
+    """
+    Подсчитывает количество получателей в сегменте.
+    
+    Args:
+        segment: Фильтры сегмента (см. iter_recipient_chat_ids)
         
+    Returns:
+        int: Количество уникальных chat_id
+    """
+    conn = await _connect()
+    try:
+        await ensure_recipient_columns(conn)
+        conditions, values = _segment_conditions(segment)
+        where = "".join(f" AND {condition}" for condition in conditions)
+        return await conn.fetchval(
+            f"SELECT COUNT(DISTINCT chat_id) FROM {_users_table()} WHERE is_active{where}",
+            *values
+        )
+    finally:
+        await conn.close()
+
+async def get_all_user_chat_ids(segment: Optional[Dict[str, Any]] = None) -> List[int]:
+    """
+    Получает все chat_id пользователей из базы данных PostgreSQL.
+    Для больших аудиторий используйте iter_recipient_chat_ids.
+    
+    Args:
+        segment: Фильтры сегмента (см. iter_recipient_chat_ids)
+    
+    Returns:
+        List[int]: Список chat_id всех пользователей
+    """
+    try:
+        chat_ids = [chat_id async for chat_id in iter_recipient_chat_ids(segment)]
+        logger.info(f"Получено {len(chat_ids)} chat_id пользователей из PostgreSQL")
         return chat_ids
     except Exception as e:
         logger.error(f"Ошибка при получении chat_id пользователей из PostgreSQL: {e}")
         # Возвращаем пустой список вместо выброса исключения
         return []
-    finally:
-        if conn:
-            await conn.close()
 
 async def send_message_to_chat(chat_id: int, message: str) -> bool:
     """
@@ -116,13 +263,368 @@ async def send_message_to_chat(chat_id: int, message: str) -> bool:
     logger.info(f"Сообщение отправлено пользователю с chat_id {chat_id}")
     return True
 
-async def announce(message: str, chat_ids: Union[List[int], str, None] = None) -> bool:
+async def create_broadcast_job(message: str, chat_ids: Optional[List[int]] = None,
+                               parse_mode: Optional[str] = "HTML",
+                               segment: Optional[Dict[str, Any]] = None) -> Optional[int]:
+    """
+    Сохраняет новое задание рассылки в базе данных.
+    
+    Args:
+        message: Текст объявления
+        chat_ids: Список chat_id получателей или None для всех пользователей
+        parse_mode: Режим разметки сообщения
+        segment: Фильтры сегмента для рассылки всем пользователям (см. iter_recipient_chat_ids)
+        
+    Returns:
+        Optional[int]: ID задания или None в случае ошибки
+    """
+    conn = None
+    try:
+        conn = await _connect()
+        await ensure_broadcast_tables(conn)
+        
+        recipients = None
+        total_count = None
+        if chat_ids is not None:
+            # Сортируем получателей, чтобы курсор last_chat_id был однозначным
+            recipients = sorted(set(int(chat_id) for chat_id in chat_ids))
+            total_count = len(recipients)
+        
+        job_id = await conn.fetchval(
+            f'''
+            INSERT INTO {_jobs_table()} (message_text, parse_mode, recipients, segment, total_count, status)
+            VALUES ($1, $2, $3, $4::jsonb, $5, $6)
+            RETURNING id
+            ''',
+            message, parse_mode, recipients,
+            json.dumps(segment, default=str) if segment else None,
+            total_count, JOB_STATUS_RUNNING
+        )
+        logger.info(f"Создано задание рассылки #{job_id} (получателей: {total_count if total_count is not None else 'все'})")
+        return job_id
+    except Exception as e:
+        logger.error(f"Ошибка при создании задания рассылки: {e}")
+        return None
+    finally:
+        if conn:
+            await conn.close()
+
+async def get_broadcast_job(job_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Возвращает состояние и статистику доставки задания рассылки.
+    
+    Args:
+        job_id: ID задания
+        
+    Returns:
+        Optional[Dict[str, Any]]: Данные задания или None, если задание не найдено
+    """
+    conn = None
+    try:
+        conn = await _connect()
+        await ensure_broadcast_tables(conn)
+        row = await conn.fetchrow(f"SELECT * FROM {_jobs_table()} WHERE id = $1", job_id)
+        return dict(row) if row else None
+    except Exception as e:
+        logger.error(f"Ошибка при получении задания рассылки #{job_id}: {e}")
+        return None
+    finally:
+        if conn:
+            await conn.close()
+
+async def cancel_broadcast_job(job_id: Optional[int] = None) -> int:
+    """
+    Отменяет выполняющееся задание рассылки (или все выполняющиеся задания).
+    
+    Статус меняется в базе данных, поэтому отмена действует и на задания,
+    запущенные другим процессом бота: они проверяют статус при каждой отметке прогресса.
+    
+    Args:
+        job_id: ID задания или None для отмены всех выполняющихся заданий
+        
+    Returns:
+        int: Количество отмененных заданий
+    """
+    conn = None
+    try:
+        conn = await _connect()
+        await ensure_broadcast_tables(conn)
+        
+        if job_id is None:
+            rows = await conn.fetch(
+                f'''
+                UPDATE {_jobs_table()}
+                SET status = $1, updated_at = CURRENT_TIMESTAMP, finished_at = CURRENT_TIMESTAMP
+                WHERE status = $2
+                RETURNING id
+                ''',
+                JOB_STATUS_CANCELLED, JOB_STATUS_RUNNING
+            )
+        else:
+            rows = await conn.fetch(
+                f'''
+                UPDATE {_jobs_table()}
+                SET status = $1, updated_at = CURRENT_TIMESTAMP, finished_at = CURRENT_TIMESTAMP
+                WHERE status = $2 AND id = $3
+                RETURNING id
+                ''',
+                JOB_STATUS_CANCELLED, JOB_STATUS_RUNNING, job_id
+            )
+        
+        for row in rows:
+            _cancel_requested.add(row['id'])
+            logger.info(f"Задание рассылки #{row['id']} отменено")
+        
+        return len(rows)
+    except Exception as e:
+        logger.error(f"Ошибка при отмене задания рассылки: {e}")
+        return 0
+    finally:
+        if conn:
+            await conn.close()
+
+async def _job_recipients(job: Dict[str, Any]) -> AsyncIterator[int]:
+    """
+    Выдает оставшихся получателей задания по возрастанию chat_id.
+    
+    Args:
+        job: Строка задания из таблицы broadcast_jobs
+        
+    Yields:
+        int: chat_id, которые еще не были обработаны
+    """
+    last_chat_id = job['last_chat_id']
+    
+    if job['recipients'] is not None:
+        for chat_id in job['recipients']:
+            if last_chat_id is None or chat_id > last_chat_id:
+                yield chat_id
+        return
+    
+    segment = json.loads(job['segment']) if job['segment'] else None
+    recipients = iter_recipient_chat_ids(segment, after_chat_id=last_chat_id)
+    try:
+        async for chat_id in recipients:
+            yield chat_id
+    finally:
+        # Закрываем соединение генератора сразу, даже если рассылка прервана
+        await recipients.aclose()
+
+async def run_broadcast_job(job_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Выполняет (или продолжает) задание рассылки с сохраненной отметки прогресса.
+    
+    После каждой отправки в задании фиксируются last_chat_id и счетчики доставки,
+    поэтому при перезапуске процесса уже получившие сообщение пользователи пропускаются.
+    
+    Args:
+        job_id: ID задания
+        
+    Returns:
+        Optional[Dict[str, Any]]: Итоговое состояние задания или None в случае ошибки
+    """
+    bot_app = get_bot_instance()
+    if not bot_app:
+        logger.error("Бот не инициализирован, невозможно выполнить рассылку")
+        return None
+    
+    conn = None
+    try:
+        conn = await _connect()
+        await ensure_broadcast_tables(conn)
+        
+        job = await conn.fetchrow(f"SELECT * FROM {_jobs_table()} WHERE id = $1", job_id)
+        if not job:
+            logger.error(f"Задание рассылки #{job_id} не найдено")
+            return None
+        
+        if job['status'] != JOB_STATUS_RUNNING:
+            logger.info(f"Задание рассылки #{job_id} имеет статус {job['status']}, пропускаем")
+            return dict(job)
+        
+        logger.info(f"Задание рассылки #{job_id}: продолжаем с курсора {job['last_chat_id']}")
+        
+        # Для рассылки всем пользователям общее число получателей известно только сейчас
+        if job['total_count'] is None:
+            segment = json.loads(job['segment']) if job['segment'] else None
+            await conn.execute(
+                f"UPDATE {_jobs_table()} SET total_count = $2 WHERE id = $1",
+                job_id, await count_recipients(segment)
+            )
+        
+        status = JOB_STATUS_RUNNING
+        recipients = _job_recipients(dict(job))
+        try:
+            async for chat_id in recipients:
+                if job_id in _cancel_requested:
+                    status = JOB_STATUS_CANCELLED
+                    break
+                
+                sent = int(await _deliver(bot_app.bot, chat_id, job['message_text'], job['parse_mode']))
+                failed = 1 - sent
+                
+                # Фиксируем прогресс; статус в ответе позволяет заметить отмену из другого процесса
+                status = await conn.fetchval(
+                    f'''
+                    UPDATE {_jobs_table()}
+                    SET last_chat_id = $2,
+                        sent_count = sent_count + $3,
+                        failed_count = failed_count + $4,
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE id = $1
+                    RETURNING status
+                    ''',
+                    job_id, chat_id, sent, failed
+                )
+                if status != JOB_STATUS_RUNNING:
+                    break
+        finally:
+            await recipients.aclose()
+            await flush_inactive_chats()
+        
+        if status == JOB_STATUS_RUNNING:
+            await conn.execute(
+                f'''
+                UPDATE {_jobs_table()}
+                SET status = $2, updated_at = CURRENT_TIMESTAMP, finished_at = CURRENT_TIMESTAMP
+                WHERE id = $1 AND status = $3
+                ''',
+                job_id, JOB_STATUS_COMPLETED, JOB_STATUS_RUNNING
+            )
+        
+        result = await conn.fetchrow(f"SELECT * FROM {_jobs_table()} WHERE id = $1", job_id)
+        logger.info(
+            f"Задание рассылки #{job_id} завершено со статусом {result['status']}: "
+            f"отправлено {result['sent_count']}, ошибок {result['failed_count']} из {result['total_count']}"
+        )
+        return dict(result)
+    except Exception as e:
+        logger.error(f"Ошибка при выполнении задания рассылки #{job_id}: {e}")
+        return None
+    finally:
+        _cancel_requested.discard(job_id)
+        if conn:
+            await conn.close()
+
+async def _deliver(bot, chat_id: int, message: str, parse_mode: Optional[str]) -> bool:
+    """
+    Отправляет объявление одному получателю с повторами временных ошибок.
+    
+    Args:
+        bot: Экземпляр telegram.Bot
+        chat_id: ID чата получателя
+        message: Текст объявления
+        parse_mode: Режим разметки сообщения
+        
+    Returns:
+        bool: True, если сообщение доставлено
+    """
+    target_chat_id = chat_id
+    for attempt in range(1, MAX_SEND_ATTEMPTS + 1):
+        try:
+            await bot.send_message(chat_id=target_chat_id, text=message, parse_mode=parse_mode)
+            logger.info(f"Объявление успешно отправлено пользователю {chat_id}")
+            return True
+        except Exception as e:
+            logger.error(f"Ошибка при отправке сообщения пользователю {chat_id}: {e}")
+            # Недоступные чаты помечаются неактивными и не повторяются
+            kind = handle_delivery_error(target_chat_id, e)
+            if kind == DELIVERY_RETRY and attempt < MAX_SEND_ATTEMPTS:
+                # Группа, ставшая супергруппой, получает сообщение по новому chat_id
+                target_chat_id = resend_chat_id(target_chat_id, e)
+                await asyncio.sleep(retry_delay(e, attempt))
+                continue
+            return False
+    return False
+
+async def _send_without_job(bot, message: str, chat_ids: List[int],
+                            parse_mode: Optional[str] = "HTML") -> int:
+    """
+    Отправляет объявление явному списку получателей без сохранения задания.
+    Используется, если задание рассылки не удалось сохранить в БД;
+    прогресс такой рассылки не переживает перезапуск процесса.
+    
+    Args:
+        bot: Экземпляр telegram.Bot
+        message: Текст объявления
+        chat_ids: Список chat_id получателей
+        parse_mode: Режим разметки сообщения
+        
+    Returns:
+        int: Количество доставленных сообщений
+    """
+    sent_count = 0
+    try:
+        for chat_id in sorted(set(int(chat_id) for chat_id in chat_ids)):
+            if await _deliver(bot, chat_id, message, parse_mode):
+                sent_count += 1
+    finally:
+        await flush_inactive_chats()
+    return sent_count
+
+def start_broadcast_job(job_id: int) -> asyncio.Task:
+    """
+    Запускает задание рассылки в фоне, если оно еще не выполняется в этом процессе.
+    
+    Args:
+        job_id: ID задания
+        
+    Returns:
+        asyncio.Task: Задача, выполняющая рассылку
+    """
+    task = _running_jobs.get(job_id)
+    if task is not None and not task.done():
+        return task
+    
+    task = asyncio.create_task(run_broadcast_job(job_id))
+    _running_jobs[job_id] = task
+    task.add_done_callback(lambda _: _running_jobs.pop(job_id, None))
+    return task
+
+@on_startup
+async def resume_broadcast_jobs(application=None) -> List[int]:
+    """
+    Продолжает задания рассылки, прерванные перезапуском бота.
+    Вызывается автоматически при старте приложения.
+    
+    Args:
+        application: Экземпляр приложения бота (не используется)
+        
+    Returns:
+        List[int]: ID возобновленных заданий
+    """
+    conn = None
+    try:
+        conn = await _connect()
+        await ensure_broadcast_tables(conn)
+        rows = await conn.fetch(
+            f"SELECT id FROM {_jobs_table()} WHERE status = $1 ORDER BY id",
+            JOB_STATUS_RUNNING
+        )
+    except Exception as e:
+        logger.error(f"Ошибка при поиске незавершенных заданий рассылки: {e}")
+        return []
+    finally:
+        if conn:
+            await conn.close()
+    
+    job_ids = [row['id'] for row in rows]
+    for job_id in job_ids:
+        logger.info(f"Возобновление задания рассылки #{job_id}")
+        start_broadcast_job(job_id)
+    
+    return job_ids
+
+async def announce(message: str, chat_ids: Union[List[int], str, None] = None,
+                   segment: Optional[Dict[str, Any]] = None) -> bool:
     """
     Отправляет объявление всем пользователям бота или указанному списку чатов.
     
     Args:
         message (str): Текст объявления
         chat_ids (Union[List[int], str, None]): Список chat_id для отправки или строка 'all' для всех пользователей
+        segment (Optional[Dict[str, Any]]): Фильтры сегмента при отправке всем пользователям:
+            language, created_after, created_before, active_since (см. iter_recipient_chat_ids)
         
     Returns:
         bool: True если объявление успешно отправлено хотя бы одному пользователю, иначе False
@@ -133,57 +635,49 @@ async def announce(message: str, chat_ids: Union[List[int], str, None] = None) -
         logger.error("Бот не инициализирован, невозможно отправить объявление")
         return False
     
-    # Определяем получателей
-    recipient_chat_ids = []
+    # Определяем получателей: None - все пользователи из базы, получаемые постранично
+    recipient_chat_ids = None
     
-    # Если chat_ids это строка 'all' или None, получаем всех пользователей из базы
-    if chat_ids == "all" or chat_ids is None:
-        try:
-            recipient_chat_ids = await get_all_user_chat_ids()
-            
-            # Если пользователей не найдено, но у нас есть текущий пользователь
-            if not recipient_chat_ids and current_update:
-                current_chat_id = get_chat_id_from_update(current_update)
-                if current_chat_id:
-                    logger.warning(f"В базе данных нет пользователей, отправляем только текущему пользователю: {current_chat_id}")
-                    recipient_chat_ids = [current_chat_id]
-                    
-        except Exception as e:
-            logger.error(f"Ошибка при получении chat_id пользователей: {e}")
-            # В случае ошибки, пробуем отправить сообщение текущему пользователю
-            if current_update:
-                current_chat_id = get_chat_id_from_update(current_update)
-                if current_chat_id:
-                    logger.info(f"Отправляем объявление только текущему пользователю: {current_chat_id}")
-                    recipient_chat_ids = [current_chat_id]
-    else:
+    if chat_ids != "all" and chat_ids is not None:
         # Используем переданный список chat_ids
         if isinstance(chat_ids, list):
             recipient_chat_ids = chat_ids
         else:
             # Если передан одиночный chat_id, преобразуем его в список
             recipient_chat_ids = [int(chat_ids)]
+        
+        # Проверяем, что есть кому отправлять
+        if not recipient_chat_ids:
+            logger.error("Не указаны получатели для отправки объявления")
+            return False
     
-    # Проверяем, что есть кому отправлять
-    if not recipient_chat_ids:
-        logger.error("Не указаны получатели для отправки объявления")
-        return False
-    
-    # Отправляем объявление
-    success_count = 0
-    total_count = len(recipient_chat_ids)
-    
-    for chat_id in recipient_chat_ids:
-        try:
-            await bot_app.bot.send_message(
-                chat_id=chat_id,
-                text=message,
-                parse_mode="HTML"
-            )
-            logger.info(f"Объявление успешно отправлено пользователю {chat_id}")
-            success_count += 1
-        except Exception as e:
-            logger.error(f"Ошибка при отправке сообщения пользователю {chat_id}: {e}")
+    # Сохраняем задание, чтобы рассылку можно было продолжить после перезапуска
+    job_id = await create_broadcast_job(message, recipient_chat_ids, segment=segment)
+    if job_id is None:
+        if recipient_chat_ids is None:
+            logger.error("Не удалось создать задание рассылки")
+            return False
+        # Явный список получателей известен и без БД: отправляем без сохранения прогресса
+        logger.warning("Не удалось создать задание рассылки, отправляем объявление без сохранения прогресса")
+        success_count = await _send_without_job(bot_app.bot, message, recipient_chat_ids)
+        total_count = len(recipient_chat_ids)
+    else:
+        # После запуска задания повторная отправка без него продублировала бы сообщения,
+        # поэтому при ошибке рассылка продолжается только через resume_broadcast_jobs
+        result = await start_broadcast_job(job_id)
+        if result is None:
+            logger.error(f"Задание рассылки #{job_id} прервано, оно будет продолжено при следующем запуске")
+            return False
+        
+        # Если в базе нет пользователей, отправляем только текущему пользователю
+        if recipient_chat_ids is None and not result['total_count'] and current_update:
+            current_chat_id = get_chat_id_from_update(current_update)
+            if current_chat_id:
+                logger.warning(f"В базе данных нет пользователей, отправляем только текущему пользователю: {current_chat_id}")
+                return await announce(message, [current_chat_id])
+        
+        success_count = result['sent_count']
+        total_count = result['total_count']
     
     # Логируем результаты
     logger.info(f"Объявление отправлено {success_count} из {total_count} пользователям")
@@ -193,4 +687,4 @@ async def announce(message: str, chat_ids: Union[List[int], str, None] = None) -
         return True
     else:
         logger.error(f"Не удалось отправить ни одного сообщения")
-        return False 
\ No newline at end of file
+        return False
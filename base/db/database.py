@@ -84,6 +84,11 @@ def init_database():
                     )
                 """)
                 
+                # Пользователи, заблокировавшие бота, помечаются неактивными (base.delivery)
+                cursor.execute(f"""
+                    ALTER TABLE {USERS_TABLE} ADD COLUMN IF NOT EXISTS is_active BOOLEAN NOT NULL DEFAULT TRUE
+                """)
+                
                 # Создаем таблицу сообщений
                 logger.info(f"Создание таблицы {MESSAGES_TABLE} (если не существует)")
                 cursor.execute(f"""
@@ -302,13 +307,15 @@ def get_notifications_to_send(current_time):
     
     try:
         with conn.cursor() as cursor:
-            # Находим все неотправленные уведомления, время которых настало или прошло
+            # Находим все неотправленные уведомления, время которых настало или прошло,
+            # кроме уведомлений пользователей, чаты которых помечены неактивными
             query = f"""
                 SELECT id, user_id, notification_text 
                 FROM {NOTIFICATIONS_TABLE} 
                 WHERE 
                     is_sent = FALSE AND 
-                    notification_time <= %s
+                    notification_time <= %s AND
+                    user_id NOT IN (SELECT user_id FROM {USERS_TABLE} WHERE is_active = FALSE)
                 ORDER BY notification_time
             """
             # Логируем SQL запрос и текущее время для отладки
@@ -0,0 +1,271 @@
+"""
+Классификация ошибок доставки сообщений и пометка недоступных чатов.
+
+Используется рассылками, отправкой уведомлений и функциями ответа бота:
+чаты, которые заблокировали бота или были удалены, помечаются неактивными
+(пакетно) и больше не попадают в выборки получателей.
+"""
+import asyncio
+import logging
+from datetime import timedelta
+from typing import Optional
+
+import asyncpg
+from telegram.error import BadRequest, ChatMigrated, Forbidden, NetworkError, RetryAfter, TimedOut
+
+logger = logging.getLogger(__name__)
+
+# Результаты классификации ошибок доставки
+DELIVERY_DEAD = "dead"      # Чат недоступен навсегда: бот заблокирован, пользователь удален, чат не найден
+DELIVERY_RETRY = "retry"    # Временная ошибка: лимит запросов или сетевой сбой, можно повторить
+DELIVERY_FAILED = "failed"  # Ошибка конкретного запроса, повтор не поможет
+
+# Фрагменты текстов ошибок Telegram, означающие недоступный чат
+DEAD_CHAT_MARKERS = (
+    "bot was blocked",
+    "bot was kicked",
+    "user is deactivated",
+    "chat not found",
+    "peer_id_invalid",
+)
+
+# Фрагменты текстов ошибок, при которых чат может снова стать доступным
+# (ограничения в группе, медленный режим, бот удален и снова добавлен в канал):
+# такие чаты не помечаются неактивными
+TEMPORARY_FAILURE_MARKERS = (
+    "bot is not a member",
+    "have no rights to send",
+)
+
+# Количество чатов, при накоплении которого пометка выполняется сразу
+INACTIVE_FLUSH_SIZE = 100
+
+# Задержка перед пометкой накопленных чатов (секунды)
+INACTIVE_FLUSH_DELAY = 5.0
+
+# Чаты, ожидающие пометки неактивными
+_pending_inactive = set()
+# Группы, ставшие супергруппами: старый chat_id -> новый chat_id
+_pending_migrations = {}
+_flush_task = None
+_size_flush_task = None
+_is_active_column_ready = False
+
+def classify_delivery_error(error: BaseException) -> str:
+    """
+    Определяет тип ошибки отправки сообщения.
+
+    Args:
+        error: Исключение, возникшее при отправке
+
+    Returns:
+        str: DELIVERY_DEAD, DELIVERY_RETRY или DELIVERY_FAILED
+    """
+    if isinstance(error, RetryAfter):
+        return DELIVERY_RETRY
+
+    error_text = str(error).lower()
+    if any(marker in error_text for marker in TEMPORARY_FAILURE_MARKERS):
+        return DELIVERY_FAILED
+
+    if isinstance(error, Forbidden):
+        return DELIVERY_DEAD
+
+    # ChatMigrated - группа стала супергруппой, сообщение нужно отправить на новый chat_id
+    if isinstance(error, ChatMigrated):
+        return DELIVERY_RETRY
+
+    if any(marker in error_text for marker in DEAD_CHAT_MARKERS):
+        return DELIVERY_DEAD
+
+    if isinstance(error, BadRequest):
+        return DELIVERY_FAILED
+
+    if isinstance(error, (TimedOut, NetworkError)):
+        return DELIVERY_RETRY
+
+    return DELIVERY_FAILED
+
+def retry_delay(error: BaseException, attempt: int) -> float:
+    """
+    Возвращает паузу перед повторной отправкой.
+
+    Args:
+        error: Исключение, возникшее при отправке
+        attempt: Номер попытки (начиная с 1)
+
+    Returns:
+        float: Пауза в секундах (для RetryAfter - время, указанное Telegram)
+    """
+    if isinstance(error, RetryAfter):
+        retry_after = error.retry_after
+        if isinstance(retry_after, timedelta):
+            return retry_after.total_seconds()
+        return float(retry_after)
+    if isinstance(error, ChatMigrated):
+        return 0.0
+    return 2.0 * attempt
+
+def resend_chat_id(chat_id: int, error: BaseException) -> int:
+    """
+    Возвращает chat_id для повторной отправки.
+
+    Args:
+        chat_id: ID чата, в который не удалось отправить сообщение
+        error: Исключение, возникшее при отправке
+
+    Returns:
+        int: Новый ID супергруппы для ChatMigrated, иначе исходный chat_id
+    """
+    if isinstance(error, ChatMigrated):
+        return error.new_chat_id
+    return chat_id
+
+async def _connect():
+    """Создает новое соединение с PostgreSQL по настройкам из credentials"""
+    from credentials.postgres.config import HOST, PORT, DATABASE, USER, PASSWORD
+    return await asyncpg.connect(
+        host=HOST,
+        port=PORT,
+        user=USER,
+        password=PASSWORD,
+        database=DATABASE,
+        timeout=10.0
+    )
+
+async def ensure_is_active_column(conn) -> None:
+    """
+    Добавляет в таблицу пользователей столбец is_active, если его нет.
+
+    Args:
+        conn: Соединение asyncpg
+    """
+    global _is_active_column_ready
+
+    if _is_active_column_ready:
+        return
+
+    from credentials.postgres.config import BOT_PREFIX
+    await conn.execute(
+        f"ALTER TABLE {BOT_PREFIX}users ADD COLUMN IF NOT EXISTS is_active BOOLEAN NOT NULL DEFAULT TRUE"
+    )
+    _is_active_column_ready = True
+
+def mark_chat_inactive(chat_id: int) -> None:
+    """
+    Ставит чат в очередь на пометку неактивным.
+    Пометка выполняется одним запросом для накопленных чатов.
+
+    Args:
+        chat_id: ID недоступного чата
+    """
+    _pending_inactive.add(int(chat_id))
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        # Нет запущенного цикла событий - чаты будут помечены при следующем flush_inactive_chats()
+        return
+
+    _schedule_flush()
+
+def _schedule_flush() -> None:
+    """Запускает пометку сразу при накоплении INACTIVE_FLUSH_SIZE чатов или после задержки"""
+    global _flush_task, _size_flush_task
+
+    if len(_pending_inactive) >= INACTIVE_FLUSH_SIZE:
+        if _size_flush_task is None or _size_flush_task.done():
+            _size_flush_task = asyncio.create_task(flush_inactive_chats())
+    elif _flush_task is None or _flush_task.done():
+        _flush_task = asyncio.create_task(_delayed_flush())
+
+def migrate_chat(old_chat_id: int, new_chat_id: int) -> None:
+    """
+    Ставит в очередь замену chat_id группы, ставшей супергруппой.
+
+    Args:
+        old_chat_id: Прежний ID группы
+        new_chat_id: ID супергруппы
+    """
+    _pending_migrations[int(old_chat_id)] = int(new_chat_id)
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        # Нет запущенного цикла событий - замена выполнится при следующем flush_inactive_chats()
+        return
+
+    _schedule_flush()
+
+async def _delayed_flush() -> None:
+    """Помечает накопленные чаты после небольшой задержки"""
+    await asyncio.sleep(INACTIVE_FLUSH_DELAY)
+    await flush_inactive_chats()
+
+async def flush_inactive_chats() -> int:
+    """
+    Помечает неактивными все накопленные недоступные чаты
+    и обновляет chat_id групп, ставших супергруппами.
+
+    Returns:
+        int: Количество чатов, отправленных на пометку
+    """
+    if not _pending_inactive and not _pending_migrations:
+        return 0
+
+    chat_ids = list(_pending_inactive)
+    _pending_inactive.difference_update(chat_ids)
+    migrations = list(_pending_migrations.items())
+    for old_chat_id, _ in migrations:
+        _pending_migrations.pop(old_chat_id, None)
+
+    conn = None
+    try:
+        from credentials.postgres.config import BOT_PREFIX
+
+        conn = await _connect()
+        if migrations:
+            await conn.executemany(
+                f"UPDATE {BOT_PREFIX}users SET chat_id = $2 WHERE chat_id = $1",
+                migrations
+            )
+            logger.info(f"Обновлен chat_id групп, ставших супергруппами: {len(migrations)}")
+        if chat_ids:
+            await ensure_is_active_column(conn)
+            await conn.execute(
+                f"UPDATE {BOT_PREFIX}users SET is_active = FALSE WHERE chat_id = ANY($1::bigint[]) AND is_active",
+                chat_ids
+            )
+            logger.info(f"Помечено неактивными чатов: {len(chat_ids)}")
+        return len(chat_ids)
+    except Exception as e:
+        # Возвращаем чаты в очередь, чтобы обработать их при следующей попытке
+        _pending_inactive.update(chat_ids)
+        for old_chat_id, new_chat_id in migrations:
+            _pending_migrations.setdefault(old_chat_id, new_chat_id)
+        logger.error(f"Ошибка при пометке неактивных чатов: {e}")
+        return 0
+    finally:
+        if conn:
+            await conn.close()
+
+def handle_delivery_error(chat_id: Optional[int], error: BaseException) -> str:
+    """
+    Классифицирует ошибку отправки и ставит недоступный чат в очередь на пометку
+    (для ChatMigrated - в очередь на замену chat_id).
+
+    Args:
+        chat_id: ID чата, в который не удалось отправить сообщение
+        error: Исключение, возникшее при отправке
+
+    Returns:
+        str: DELIVERY_DEAD, DELIVERY_RETRY или DELIVERY_FAILED
+    """
+    kind = classify_delivery_error(error)
+    if isinstance(error, ChatMigrated) and chat_id is not None:
+        logger.info(f"Группа {chat_id} стала супергруппой {error.new_chat_id}, обновляем chat_id")
+        migrate_chat(chat_id, error.new_chat_id)
+    if kind == DELIVERY_DEAD and chat_id is not None:
+        logger.warning(f"Чат {chat_id} недоступен ({error}), помечаем пользователя неактивным")
+        mark_chat_inactive(chat_id)
+    return kind
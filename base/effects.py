@@ -0,0 +1,240 @@
+"""
+Буфер действий auto_* функций easy_bot для одного обработчика.
+
+auto_write_translated_message, auto_button, auto_message_with_buttons и
+auto_translate не отправляют запросы сразу, а добавляют действие в буфер
+текущего обработчика. Буфер хранится в contextvars, а не в user_data, поэтому
+не сохраняется вместе с данными пользователя и не смешивается между
+одновременными обновлениями одного пользователя.
+
+После выполнения функции-обработчика все тексты буфера переводятся одним
+пакетным вызовом, затем сообщения отправляются по порядку.
+"""
+import asyncio
+import contextvars
+import inspect
+import logging
+from typing import Any, Callable, List, NamedTuple, Optional
+
+# Виды действий
+EFFECT_MESSAGE = "message"
+EFFECT_BUTTONS = "buttons"
+EFFECT_MESSAGE_WITH_BUTTONS = "message_with_buttons"
+EFFECT_TRANSLATE = "translate"  # Только перевод (результат попадает в кэш переводов)
+
+# Текст сообщения с кнопками без собственного текста
+BUTTONS_PROMPT = "Выберите опцию:"
+PROCESSING_TEXT = "⏳ Обрабатываю запрос..."
+
+class Effect(NamedTuple):
+    """Отложенное действие обработчика"""
+    kind: str
+    text: Optional[str] = None
+    buttons_layout: Optional[list] = None
+
+    def texts(self) -> List[str]:
+        """Тексты действия для перевода"""
+        texts = [self.text] if self.text is not None else []
+        if self.kind == EFFECT_BUTTONS:
+            texts.append(BUTTONS_PROMPT)
+        for row in self.buttons_layout or ():
+            if isinstance(row[0], list):
+                texts.extend(button[0] for button in row)
+            else:
+                texts.append(row[0])
+        return texts
+
+class EffectBuffer:
+    """Действия одного обработчика вместе с его update и context"""
+
+    __slots__ = ('update', 'context', 'effects', 'closed')
+
+    def __init__(self, update, context):
+        self.update = update
+        self.context = context
+        self.effects: List[Effect] = []
+        self.closed = False
+
+    def texts(self) -> List[str]:
+        """Уникальные тексты всех действий в порядке появления"""
+        return list(dict.fromkeys(text for effect in self.effects for text in effect.texts()))
+
+# Задачи действий, запущенных вне обработчика
+_pending_tasks = set()
+
+_current_buffer: contextvars.ContextVar[Optional[EffectBuffer]] = contextvars.ContextVar("easy_bot_effects", default=None)
+
+def queue_effect(effect: Effect) -> None:
+    """
+    Добавляет действие в буфер текущего обработчика.
+
+    Вне обработчика (или после выполнения его действий, например из фоновой
+    задачи) действие выполняется сразу отдельной задачей. Без запущенного
+    цикла событий (вызов из синхронного кода вне бота) действие пропускается.
+
+    Args:
+        effect: Действие
+    """
+    buffer = _current_buffer.get()
+    if buffer is not None and not buffer.closed:
+        buffer.effects.append(effect)
+        return
+
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        logging.warning(f"Действие {effect.kind} пропущено: вызвано вне обработчика и без запущенного цикла событий")
+        return
+
+    from easy_bot import current_context, current_update
+    single = EffectBuffer(current_update, current_context)
+    single.effects.append(effect)
+    task = loop.create_task(apply_effects(single))
+    # Ссылка на задачу хранится до ее завершения, чтобы ее не удалил сборщик мусора
+    _pending_tasks.add(task)
+    task.add_done_callback(_pending_tasks.discard)
+
+async def run_with_effects(func: Callable, *args, **kwargs) -> Any:
+    """
+    Вызывает функцию-обработчик (синхронную или асинхронную) и выполняет
+    накопленные ею действия.
+
+    Args:
+        func: Функция-обработчик
+        *args, **kwargs: Аргументы функции
+
+    Returns:
+        Результат функции
+    """
+    from easy_bot import current_context, current_update
+
+    buffer = EffectBuffer(current_update, current_context)
+    token = _current_buffer.set(buffer)
+    try:
+        result = func(*args, **kwargs)
+        if inspect.iscoroutine(result):
+            result = await result
+    finally:
+        _current_buffer.reset(token)
+        buffer.closed = True
+
+    await apply_effects(buffer)
+    return result
+
+def _language(context) -> tuple:
+    """(полное название языка, код языка) пользователя из context"""
+    from easy_bot import LANGUAGES
+    lang_code = None
+    if context is not None and hasattr(context, 'user_data') and context.user_data:
+        lang_code = context.user_data.get('language')
+    return LANGUAGES.get(lang_code, "Русский"), lang_code
+
+async def _translate_all(texts: List[str], language: str) -> dict:
+    """Переводит тексты одним пакетным вызовом (при ошибке - по одному)"""
+    if not texts or language.lower() in ("русский", "ru"):
+        return {text: text for text in texts}
+    try:
+        from language.translate_any_message import translate_multiple
+        return dict(zip(texts, await translate_multiple(texts, language)))
+    except Exception as e:
+        logging.error(f"Ошибка при пакетном переводе, переводим по одному: {e}")
+        from easy_bot import translate
+        return {text: await translate(text, language) for text in texts}
+
+async def _needs_processing_message(texts: List[str], language: str) -> bool:
+    from language.translate_any_message import should_show_processing_message
+    for text in texts:
+        if await should_show_processing_message(text, language):
+            return True
+    return False
+
+def _build_keyboard(buttons_layout, translated: dict):
+    from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+    keyboard = []
+    for row in buttons_layout:
+        if isinstance(row[0], list):
+            keyboard.append([InlineKeyboardButton(translated[button[0]], callback_data=button[1]) for button in row])
+        else:
+            keyboard.append([InlineKeyboardButton(translated[row[0]], callback_data=row[1])])
+    return InlineKeyboardMarkup(keyboard)
+
+async def _send(effect: Effect, update, context, translated: dict) -> None:
+    """Отправляет одно действие так же, как соответствующая функция easy_bot"""
+    from base.keyboard import replace_keyboard, settle_keyboard
+
+    query = update.callback_query
+    query_message = query.message if query else None
+    if query_message and effect.kind in (EFFECT_MESSAGE, EFFECT_MESSAGE_WITH_BUTTONS):
+        # Фоновая деактивация кнопок не должна перезаписать новое содержимое сообщения
+        await settle_keyboard(query_message.chat_id, query_message.message_id)
+
+    if effect.kind == EFFECT_MESSAGE:
+        if query:
+            await query.edit_message_text(text=translated[effect.text])
+        else:
+            await update.message.reply_text(text=translated[effect.text])
+
+    elif effect.kind == EFFECT_BUTTONS:
+        reply_markup = _build_keyboard(effect.buttons_layout, translated)
+        if query_message:
+            await replace_keyboard(context.bot, query_message.chat_id, query_message.message_id, reply_markup)
+        elif query:
+            await query.edit_message_reply_markup(reply_markup=reply_markup)
+        else:
+            await update.message.reply_text(text=translated[BUTTONS_PROMPT], reply_markup=reply_markup)
+
+    elif effect.kind == EFFECT_MESSAGE_WITH_BUTTONS:
+        reply_markup = _build_keyboard(effect.buttons_layout, translated)
+        if query:
+            await query.edit_message_text(text=translated[effect.text], reply_markup=reply_markup)
+        else:
+            await update.message.reply_text(text=translated[effect.text], reply_markup=reply_markup)
+
+async def apply_effects(buffer: EffectBuffer) -> None:
+    """
+    Выполняет действия буфера: один пакетный перевод всех текстов,
+    затем отправка сообщений по порядку.
+
+    Args:
+        buffer: Буфер действий обработчика
+    """
+    if not buffer.effects:
+        return
+    update, context = buffer.update, buffer.context
+    if update is None or context is None:
+        logging.warning(f"Действия обработчика пропущены: нет update или context ({len(buffer.effects)})")
+        return
+
+    from easy_bot import PRESET_TRANSLATIONS, report_delivery_error
+
+    language, lang_code = _language(context)
+    texts = buffer.texts()
+    chat = update.effective_chat
+
+    # Одно сообщение "Обрабатываю запрос..." на весь пакет, если нужен реальный перевод
+    processing_message = None
+    if chat and await _needs_processing_message(texts, language):
+        processing_text = PRESET_TRANSLATIONS[PROCESSING_TEXT].get(lang_code) or PROCESSING_TEXT
+        try:
+            processing_message = await context.bot.send_message(chat_id=chat.id, text=processing_text)
+        except Exception as e:
+            logging.error(f"Ошибка при отправке сообщения об обработке: {e}")
+            report_delivery_error(e, chat.id)
+
+    translated = await _translate_all(texts, language)
+
+    for effect in buffer.effects:
+        if effect.kind == EFFECT_TRANSLATE:
+            continue
+        try:
+            await _send(effect, update, context, translated)
+        except Exception as e:
+            logging.error(f"Ошибка при отправке сообщения ({effect.kind}): {e}")
+            report_delivery_error(e, chat.id if chat else None)
+
+    # Сообщение "Обрабатываю запрос..." удаляется после отправки всех сообщений
+    if processing_message:
+        try:
+            await context.bot.delete_message(chat_id=chat.id, message_id=processing_message.message_id)
+        except Exception as e:
+            logging.error(f"Ошибка при удалении сообщения об обработке: {e}")
@@ -0,0 +1,110 @@
+"""
+Общий HTTP-клиент для внешних API (ChatGPT, Google Sheets).
+
+Одна сессия aiohttp на весь процесс: соединения переиспользуются (keep-alive),
+число соединений ограничено, DNS-ответы кэшируются, у всех запросов есть таймауты.
+Сессия создается при запуске бота и закрывается при его остановке.
+"""
+import asyncio
+import logging
+from typing import Optional
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+# Ограничения пула соединений
+CONNECTION_LIMIT = 100          # Всего одновременных соединений
+CONNECTION_LIMIT_PER_HOST = 20  # Одновременных соединений к одному хосту
+DNS_CACHE_TTL = 300             # Время жизни кэша DNS (секунды)
+KEEPALIVE_TIMEOUT = 30          # Время удержания простаивающего соединения (секунды)
+
+# Таймауты по умолчанию (секунды)
+DEFAULT_TIMEOUT = aiohttp.ClientTimeout(total=60, connect=10, sock_read=50)
+
+_session: Optional[aiohttp.ClientSession] = None
+_session_loop = None
+_session_lock = None
+
+def _create_session() -> aiohttp.ClientSession:
+    """Создает сессию aiohttp с настроенным пулом соединений"""
+    connector = aiohttp.TCPConnector(
+        limit=CONNECTION_LIMIT,
+        limit_per_host=CONNECTION_LIMIT_PER_HOST,
+        ttl_dns_cache=DNS_CACHE_TTL,
+        keepalive_timeout=KEEPALIVE_TIMEOUT,
+    )
+    return aiohttp.ClientSession(connector=connector, timeout=DEFAULT_TIMEOUT)
+
+def _release_session(session: Optional[aiohttp.ClientSession], loop) -> None:
+    """
+    Освобождает сессию, созданную в другом цикле событий, перед ее заменой.
+
+    Сессию можно закрыть только в ее цикле: если он еще работает (в другом потоке),
+    закрытие выполняется в нем, иначе сессия отсоединяется от соединителя,
+    соединения которого принадлежат остановленному циклу.
+
+    Args:
+        session: Предыдущая сессия
+        loop: Цикл событий, в котором она создана
+    """
+    if session is None or session.closed:
+        return
+    if loop is not None and loop.is_running():
+        asyncio.run_coroutine_threadsafe(session.close(), loop)
+        logger.info("Общая HTTP-сессия предыдущего цикла событий закрывается")
+        return
+    session.detach()
+    if loop is None or loop.is_closed():
+        logger.warning("Общая HTTP-сессия брошена: ее цикл событий уже закрыт")
+    else:
+        logger.warning("Общая HTTP-сессия отсоединена: ее цикл событий остановлен")
+
+async def get_http_session() -> aiohttp.ClientSession:
+    """
+    Возвращает общую сессию aiohttp, создавая ее при первом обращении.
+
+    Returns:
+        aiohttp.ClientSession: Сессия, привязанная к текущему циклу событий
+    """
+    global _session, _session_loop, _session_lock
+
+    loop = asyncio.get_running_loop()
+    if _session is not None and not _session.closed and _session_loop is loop:
+        return _session
+
+    if _session_lock is None or _session_loop is not loop:
+        _session_lock = asyncio.Lock()
+
+    async with _session_lock:
+        if _session is None or _session.closed or _session_loop is not loop:
+            if _session_loop is not loop:
+                _release_session(_session, _session_loop)
+            _session = _create_session()
+            _session_loop = loop
+            logger.info("Создана общая HTTP-сессия")
+    return _session
+
+async def start_http_session(application=None) -> None:
+    """
+    Создает общую сессию при запуске приложения.
+
+    Args:
+        application: Экземпляр приложения бота (не используется)
+    """
+    await get_http_session()
+
+async def close_http_session(application=None) -> None:
+    """
+    Закрывает общую сессию и все ее соединения.
+
+    Args:
+        application: Экземпляр приложения бота (не используется)
+    """
+    global _session, _session_loop
+
+    if _session is not None and not _session.closed:
+        await _session.close()
+        logger.info("Общая HTTP-сессия закрыта")
+    _session = None
+    _session_loop = None
@@ -1,5 +1,20 @@
-from typing import List, Dict, Union
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import List, Dict, Optional, Tuple, Union
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import BadRequest
+
+# callback_data нажатых (неактивных) кнопок
+DISABLED_CALLBACK_DATA = "disabled"
+
+# Максимальное количество сообщений в кэше неактивных клавиатур
+DISABLED_KEYBOARD_CACHE_SIZE = 1000
+
+# (chat_id, message_id) -> клавиатура с неактивными кнопками
+_disabled_keyboards: "OrderedDict[Tuple[int, int], InlineKeyboardMarkup]" = OrderedDict()
+# (chat_id, message_id) -> выполняющееся изменение клавиатуры
+_pending_edits: Dict[Tuple[int, int], asyncio.Task] = {}
 
 def create_inline_keyboard(
     buttons: List[Dict[str, str]],
@@ -73,4 +88,103 @@ def create_mixed_keyboard(
     if row:
         keyboard.append(row)
     
-    return InlineKeyboardMarkup(keyboard) 
\ No newline at end of file
+    return InlineKeyboardMarkup(keyboard)
+
+def build_disabled_keyboard(reply_markup: InlineKeyboardMarkup) -> InlineKeyboardMarkup:
+    """
+    Создает копию клавиатуры, в которой все кнопки неактивны (тексты сохраняются).
+
+    Args:
+        reply_markup: Исходная клавиатура
+
+    Returns:
+        InlineKeyboardMarkup: Клавиатура с callback_data "disabled"
+    """
+    return InlineKeyboardMarkup([
+        [InlineKeyboardButton(button.text, callback_data=DISABLED_CALLBACK_DATA) for button in row]
+        for row in reply_markup.inline_keyboard
+    ])
+
+def is_keyboard_disabled(message) -> bool:
+    """Проверяет, были ли кнопки сообщения уже деактивированы ботом"""
+    return (message.chat_id, message.message_id) in _disabled_keyboards
+
+def deactivate_keyboard(bot, message) -> Optional[asyncio.Task]:
+    """
+    Делает кнопки сообщения неактивными, не дожидаясь ответа Telegram.
+
+    Изменение клавиатуры отправляется в фоне параллельно с обработкой нажатия,
+    поэтому обработчик не ждет лишний запрос к Bot API. Клавиатура каждого
+    сообщения деактивируется один раз: повторные нажатия до обновления
+    сообщения у пользователя новых запросов не создают.
+
+    Args:
+        bot: Объект бота
+        message: Сообщение с нажатой кнопкой
+
+    Returns:
+        asyncio.Task изменения клавиатуры или None, если изменять нечего
+    """
+    if not message or not message.reply_markup:
+        return None
+
+    key = (message.chat_id, message.message_id)
+    if key in _disabled_keyboards:
+        _disabled_keyboards.move_to_end(key)
+        return _pending_edits.get(key)
+
+    disabled = build_disabled_keyboard(message.reply_markup)
+    _disabled_keyboards[key] = disabled
+    while len(_disabled_keyboards) > DISABLED_KEYBOARD_CACHE_SIZE:
+        _disabled_keyboards.popitem(last=False)
+
+    task = asyncio.create_task(_edit_reply_markup(bot, key, disabled))
+    _pending_edits[key] = task
+    task.add_done_callback(lambda _: _pending_edits.pop(key, None))
+    return task
+
+async def _edit_reply_markup(bot, key: Tuple[int, int], reply_markup: Optional[InlineKeyboardMarkup]) -> None:
+    chat_id, message_id = key
+    try:
+        await bot.edit_message_reply_markup(chat_id=chat_id, message_id=message_id, reply_markup=reply_markup)
+    except BadRequest as e:
+        # Клавиатура уже изменена или сообщение удалено
+        logging.debug(f"Клавиатура сообщения {message_id} в чате {chat_id} не изменена: {e}")
+    except Exception as e:
+        logging.error(f"Ошибка при изменении клавиатуры сообщения {message_id} в чате {chat_id}: {e}")
+
+async def replace_keyboard(bot, chat_id: int, message_id: int, reply_markup: Optional[InlineKeyboardMarkup]) -> None:
+    """
+    Заменяет клавиатуру сообщения после фоновой деактивации.
+
+    Ожидает отправленную деактивацию этого сообщения (settle_keyboard),
+    чтобы она не перезаписала новую клавиатуру.
+
+    Args:
+        bot: Объект бота
+        chat_id: ID чата
+        message_id: ID сообщения
+        reply_markup: Новая клавиатура (None - убрать кнопки)
+    """
+    await settle_keyboard(chat_id, message_id)
+    await bot.edit_message_reply_markup(chat_id=chat_id, message_id=message_id, reply_markup=reply_markup)
+
+async def settle_keyboard(chat_id: int, message_id: int) -> None:
+    """
+    Дожидается фоновой деактивации кнопок сообщения перед его изменением
+    (новый текст или клавиатура не будут перезаписаны) и снимает отметку о деактивации.
+
+    Args:
+        chat_id: ID чата
+        message_id: ID сообщения
+    """
+    key = (chat_id, message_id)
+    pending = _pending_edits.get(key)
+    if pending is not None:
+        await asyncio.shield(pending)
+    _disabled_keyboards.pop(key, None)
+
+async def flush_keyboard_edits(application=None) -> None:
+    """Дожидается фоновых изменений клавиатур (после остановки обработки обновлений, пока соединение бота открыто)"""
+    if _pending_edits:
+        await asyncio.gather(*list(_pending_edits.values()), return_exceptions=True)
@@ -0,0 +1,221 @@
+"""
+Реестр метрик бота: счетчики, текущие значения (gauge) и гистограммы с метками.
+
+Метрики выводятся в текстовом формате Prometheus командой /metrics
+(только для администраторов) и, если задан METRICS_PORT, по HTTP (/metrics).
+"""
+import logging
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Порт HTTP-сервера метрик (переменная окружения METRICS_PORT); если не задан, сервер не запускается
+METRICS_PORT = os.environ.get("METRICS_PORT")
+METRICS_HOST = os.environ.get("METRICS_HOST", "127.0.0.1")
+
+# Границы интервалов гистограмм по умолчанию (секунды)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+_counters: Dict[str, Dict[Tuple, float]] = {}
+_gauges: Dict[str, Dict[Tuple, float]] = {}
+# Имя -> метки -> [количества по интервалам, сумма, количество]
+_histograms: Dict[str, Dict[Tuple, list]] = {}
+_histogram_buckets: Dict[str, Tuple[float, ...]] = {}
+_descriptions: Dict[str, str] = {}
+_metrics_runner = None
+
+def _labels_key(labels: Dict[str, object]) -> Tuple:
+    """Преобразует метки в ключ словаря"""
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+def _escape_label(value: str) -> str:
+    """Экранирует значение метки для текстового формата Prometheus"""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _escape_help(text: str) -> str:
+    """Экранирует описание метрики для текстового формата Prometheus"""
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+def describe(name: str, description: str) -> None:
+    """
+    Задает описание метрики (выводится в строке # HELP).
+
+    Args:
+        name: Имя метрики
+        description: Описание
+    """
+    _descriptions[name] = description
+
+def inc_counter(name: str, value: float = 1, **labels) -> None:
+    """
+    Увеличивает счетчик.
+
+    Args:
+        name: Имя метрики
+        value: Величина увеличения
+        **labels: Метки метрики
+    """
+    series = _counters.setdefault(name, {})
+    key = _labels_key(labels)
+    series[key] = series.get(key, 0) + value
+
+def set_gauge(name: str, value: float, **labels) -> None:
+    """
+    Устанавливает текущее значение метрики.
+
+    Args:
+        name: Имя метрики
+        value: Значение
+        **labels: Метки метрики
+    """
+    _gauges.setdefault(name, {})[_labels_key(labels)] = value
+
+def observe(name: str, value: float, buckets: Optional[Sequence[float]] = None, **labels) -> None:
+    """
+    Добавляет наблюдение в гистограмму.
+
+    Args:
+        name: Имя метрики
+        value: Наблюдаемое значение (например, длительность в секундах)
+        buckets: Границы интервалов (задаются при первом наблюдении, по умолчанию DEFAULT_BUCKETS)
+        **labels: Метки метрики
+    """
+    bounds = _histogram_buckets.get(name)
+    if bounds is None:
+        bounds = _histogram_buckets[name] = tuple(sorted(buckets or DEFAULT_BUCKETS))
+
+    series = _histograms.setdefault(name, {})
+    key = _labels_key(labels)
+    state = series.get(key)
+    if state is None:
+        state = series[key] = [[0] * len(bounds), 0.0, 0]
+
+    for i, bound in enumerate(bounds):
+        if value <= bound:
+            state[0][i] += 1
+            break
+    state[1] += value
+    state[2] += 1
+
+def get_histogram(name: str, **labels) -> Optional[Dict[str, float]]:
+    """
+    Возвращает сводку гистограммы.
+
+    Args:
+        name: Имя метрики
+        **labels: Метки метрики
+
+    Returns:
+        Словарь count и sum или None, если наблюдений не было
+    """
+    state = _histograms.get(name, {}).get(_labels_key(labels))
+    if state is None:
+        return None
+    return {"count": state[2], "sum": state[1]}
+
+def get_series(name: str) -> List[Tuple[Dict[str, str], float]]:
+    """
+    Возвращает все значения счетчика или gauge с их метками.
+
+    Args:
+        name: Имя метрики
+
+    Returns:
+        Список пар (метки, значение)
+    """
+    series = _counters.get(name) or _gauges.get(name) or {}
+    return [(dict(key), value) for key, value in series.items()]
+
+def get_metric(name: str, **labels) -> Optional[float]:
+    """
+    Возвращает значение метрики.
+
+    Args:
+        name: Имя метрики
+        **labels: Метки метрики
+
+    Returns:
+        Значение или None, если метрика не задана
+    """
+    key = _labels_key(labels)
+    for registry in (_counters, _gauges):
+        if name in registry and key in registry[name]:
+            return registry[name][key]
+    return None
+
+def render_metrics() -> str:
+    """
+    Формирует текст всех метрик в формате Prometheus.
+
+    Returns:
+        str: Текст метрик
+    """
+    lines = []
+    for kind, registry in (("counter", _counters), ("gauge", _gauges)):
+        for name in sorted(registry):
+            if name in _descriptions:
+                lines.append(f"# HELP {name} {_escape_help(_descriptions[name])}")
+            lines.append(f"# TYPE {name} {kind}")
+            for key, value in sorted(registry[name].items()):
+                if key:
+                    labels = ",".join(f'{label}="{_escape_label(label_value)}"' for label, label_value in key)
+                    lines.append(f"{name}{{{labels}}} {value:g}")
+                else:
+                    lines.append(f"{name} {value:g}")
+
+    for name in sorted(_histograms):
+        if name in _descriptions:
+            lines.append(f"# HELP {name} {_escape_help(_descriptions[name])}")
+        lines.append(f"# TYPE {name} histogram")
+        bounds = _histogram_buckets[name]
+        for key, (bucket_counts, total, count) in sorted(_histograms[name].items()):
+            labels = "".join(f'{label}="{_escape_label(label_value)}",' for label, label_value in key)
+            cumulative = 0
+            for bound, bucket_count in zip(bounds, bucket_counts):
+                cumulative += bucket_count
+                lines.append(f'{name}_bucket{{{labels}le="{bound:g}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{labels}le="+Inf"}} {count}')
+            suffix = f"{{{labels.rstrip(',')}}}" if labels else ""
+            lines.append(f"{name}_sum{suffix} {total:g}")
+            lines.append(f"{name}_count{suffix} {count}")
+    return "\n".join(lines) + "\n"
+
+async def start_metrics_server(application=None) -> None:
+    """
+    Запускает HTTP-сервер метрик, если задан METRICS_PORT.
+
+    Args:
+        application: Экземпляр приложения бота (не используется)
+    """
+    global _metrics_runner
+
+    if not METRICS_PORT or _metrics_runner is not None:
+        return
+
+    from aiohttp import web
+
+    async def handle_metrics(request):
+        return web.Response(text=render_metrics(), content_type="text/plain")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle_metrics)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, METRICS_HOST, int(METRICS_PORT)).start()
+    _metrics_runner = runner
+    logger.info(f"Сервер метрик запущен на {METRICS_HOST}:{METRICS_PORT}")
+
+async def stop_metrics_server(application=None) -> None:
+    """
+    Останавливает HTTP-сервер метрик.
+
+    Args:
+        application: Экземпляр приложения бота (не используется)
+    """
+    global _metrics_runner
+
+    if _metrics_runner is not None:
+        await _metrics_runner.cleanup()
+        _metrics_runner = None
@@ -0,0 +1,213 @@
+"""
+Маршрутизация callback-запросов inline-кнопок.
+
+Маршруты разбираются один раз при регистрации:
+- точные ("disabled") - поиск в словаре по callback_data;
+- по префиксу ("lang_") и с параметрами ("edit_{index:int}_{callback}") -
+  поиск в словаре по части callback_data до первого "_" включительно,
+  параметры разбираются одним split;
+- резервные - вызываются по порядку, если подходящий маршрут не найден.
+
+Время выбора обработчика не зависит от количества зарегистрированных
+маршрутов и публикуется в base.metrics (callback_dispatch_seconds).
+"""
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+# Разделитель префикса и параметров в callback_data
+SEPARATOR = "_"
+
+# Границы интервалов гистограммы времени выбора обработчика (секунды)
+DISPATCH_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1)
+
+# Преобразователи параметров: {name:int}
+CONVERTERS: Dict[str, Callable[[str], Any]] = {
+    "str": str,
+    "int": int,
+}
+
+class Route(NamedTuple):
+    """Маршрут callback-запроса"""
+    pattern: str
+    # async handler(update, context, **params) -> bool | None (False - не обработано)
+    handler: Callable[..., Awaitable[Any]]
+    # Параметры после префикса: (имя, преобразователь)
+    params: Tuple[Tuple[str, Callable[[str], Any]], ...] = ()
+    # async guard(update) -> bool: маршрут используется, только если guard вернул True
+    guard: Optional[Callable[[Any], Awaitable[bool]]] = None
+    # Префикс маршрута ("" для точных и резервных маршрутов)
+    prefix: str = ""
+
+    def parse(self, data: str) -> Optional[Dict[str, Any]]:
+        """
+        Разбирает параметры из callback_data.
+
+        Последний параметр получает остаток строки вместе с разделителями.
+
+        Args:
+            data: callback_data, начинающаяся с префикса маршрута
+
+        Returns:
+            Словарь параметров или None, если данные не подходят под маршрут
+        """
+        if not self.params:
+            return {}
+        parts = data[len(self.prefix):].split(SEPARATOR, len(self.params) - 1)
+        if len(parts) != len(self.params):
+            return None
+        try:
+            return {name: convert(part) for (name, convert), part in zip(self.params, parts)}
+        except ValueError:
+            return None
+
+def _prefix_key(data: str) -> Optional[str]:
+    """Часть callback_data до первого разделителя включительно"""
+    index = data.find(SEPARATOR)
+    return data[:index + 1] if index >= 0 else None
+
+def compile_pattern(pattern: str) -> Tuple[str, Tuple[Tuple[str, Callable[[str], Any]], ...]]:
+    """
+    Разбирает шаблон маршрута с параметрами.
+
+    Args:
+        pattern: Шаблон вида "edit_{index:int}_{callback}"
+
+    Returns:
+        (префикс, параметры)
+
+    Raises:
+        ValueError: Шаблон некорректен
+    """
+    prefix, _, rest = pattern.partition("{")
+    if not prefix.endswith(SEPARATOR) or SEPARATOR in prefix[:-1]:
+        raise ValueError(f"Префикс маршрута {pattern!r} должен содержать один '{SEPARATOR}' в конце")
+
+    params = []
+    for part in ("{" + rest).split(SEPARATOR):
+        if not (part.startswith("{") and part.endswith("}")):
+            raise ValueError(f"Параметр {part!r} маршрута {pattern!r} должен иметь вид {{имя}} или {{имя:тип}}")
+        name, _, type_name = part[1:-1].partition(":")
+        if type_name and type_name not in CONVERTERS:
+            raise ValueError(f"Неизвестный тип параметра {type_name!r} в маршруте {pattern!r}")
+        params.append((name, CONVERTERS[type_name or "str"]))
+    return prefix, tuple(params)
+
+class CallbackRouter:
+    """Таблица маршрутов callback-запросов"""
+
+    def __init__(self, metrics: bool = True):
+        """
+        Args:
+            metrics: Публиковать время выбора обработчика в base.metrics
+        """
+        self.metrics = metrics
+        self._exact: Dict[str, List[Route]] = {}
+        self._prefixed: Dict[str, List[Route]] = {}
+        self._fallbacks: List[Route] = []
+
+    def add(self, pattern: str, handler: Callable[..., Awaitable[Any]], guard=None) -> Route:
+        """
+        Регистрирует точный маршрут или маршрут с параметрами ("{...}" в шаблоне).
+
+        Args:
+            pattern: callback_data или шаблон вида "edit_{index:int}_{callback}"
+            handler: async handler(update, context, **параметры)
+            guard: async guard(update) -> bool, проверяемый перед вызовом
+
+        Returns:
+            Route: Зарегистрированный маршрут
+        """
+        if "{" not in pattern:
+            route = Route(pattern, handler, guard=guard)
+            self._exact.setdefault(pattern, []).append(route)
+            return route
+
+        prefix, params = compile_pattern(pattern)
+        route = Route(pattern, handler, params, guard, prefix)
+        self._prefixed.setdefault(prefix, []).append(route)
+        return route
+
+    def add_prefix(self, prefix: str, handler: Callable[..., Awaitable[Any]], guard=None) -> Route:
+        """
+        Регистрирует маршрут для всех callback_data с префиксом.
+        Обработчик получает остаток callback_data в параметре value.
+
+        Args:
+            prefix: Префикс, оканчивающийся на "_" (например, "lang_")
+            handler: async handler(update, context, value=...)
+            guard: async guard(update) -> bool, проверяемый перед вызовом
+
+        Returns:
+            Route: Зарегистрированный маршрут
+        """
+        return self.add(prefix + "{value}", handler, guard)
+
+    def add_fallback(self, handler: Callable[..., Awaitable[Any]], guard=None) -> Route:
+        """
+        Регистрирует резервный обработчик для callback_data без подходящего маршрута.
+
+        Args:
+            handler: async handler(update, context)
+            guard: async guard(update) -> bool, проверяемый перед вызовом
+
+        Returns:
+            Route: Зарегистрированный маршрут
+        """
+        route = Route("*", handler, guard=guard)
+        self._fallbacks.append(route)
+        return route
+
+    def match(self, data: str) -> Iterator[Tuple[Route, Dict[str, Any]]]:
+        """
+        Перебирает подходящие маршруты в порядке приоритета:
+        точные, по префиксу, резервные.
+
+        Args:
+            data: callback_data
+
+        Yields:
+            (маршрут, параметры)
+        """
+        for route in self._exact.get(data, ()):
+            yield route, {}
+
+        key = _prefix_key(data)
+        if key is not None:
+            for route in self._prefixed.get(key, ()):
+                params = route.parse(data)
+                if params is not None:
+                    yield route, params
+
+        for route in self._fallbacks:
+            yield route, {}
+
+    async def dispatch(self, update, context) -> bool:
+        """
+        Вызывает первый подходящий обработчик callback-запроса.
+
+        Маршрут пропускается, если guard вернул False или обработчик вернул False.
+
+        Args:
+            update: Объект обновления Telegram
+            context: Объект контекста Telegram
+
+        Returns:
+            bool: True, если запрос обработан
+        """
+        started = time.perf_counter()
+        data = update.callback_query.data or ""
+
+        for route, params in self.match(data):
+            if route.guard is not None and not await route.guard(update):
+                continue
+            if self.metrics:
+                self._observe(route, time.perf_counter() - started)
+            if await route.handler(update, context, **params) is not False:
+                return True
+            started = time.perf_counter()
+        return False
+
+    def _observe(self, route: Route, seconds: float) -> None:
+        from base.metrics import inc_counter, observe
+        inc_counter("callback_routed_total", route=route.pattern)
+        observe("callback_dispatch_seconds", seconds, DISPATCH_BUCKETS, route=route.pattern)
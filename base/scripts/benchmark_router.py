@@ -0,0 +1,145 @@
+"""
+Замер времени выбора обработчика callback-запроса в CallbackRouter.
+
+Для таблиц с разным количеством маршрутов выводит время поиска точного
+маршрута, маршрута по префиксу и маршрута с параметрами. Время не должно
+расти вместе с количеством маршрутов.
+
+Затем выводит полное время dispatch() с маршрутами опроса и их условием
+has_active_survey (хранилище сессий заменено заглушкой в памяти) и число
+обращений к хранилищу: условие маршрута должно читать только сессии в памяти.
+
+Запуск из корня проекта:
+    python base/scripts/benchmark_router.py [количество повторов]
+"""
+import asyncio
+import importlib
+import importlib.util
+import os
+import sys
+import time
+import timeit
+import types
+
+# Модули загружаются напрямую, чтобы не импортировать весь пакет base (БД, настройки)
+BASE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+ROUTER_PATH = os.path.join(BASE_PATH, "router.py")
+
+# Количество зарегистрированных точных маршрутов
+TABLE_SIZES = (10, 1000, 100000)
+
+# Примеры callback_data
+CASES = [
+    ("точный", "menu_5"),
+    ("префикс", "lang_en"),
+    ("параметры", "edit_3_process_survey_results"),
+]
+
+# Пользователи для замера dispatch()
+USER_IN_SURVEY = 1
+USER_WITHOUT_SURVEY = 2
+
+# Примеры для dispatch(): (название, callback_data, пользователь)
+DISPATCH_CASES = [
+    ("точный", "menu_5", USER_WITHOUT_SURVEY),
+    ("edit, есть опрос", "edit_1_process_survey_results", USER_IN_SURVEY),
+    ("edit, нет опроса", "edit_1_process_survey_results", USER_WITHOUT_SURVEY),
+    ("кнопка, есть опрос", "answer_1", USER_IN_SURVEY),
+    ("кнопка, нет опроса", "answer_1", USER_WITHOUT_SURVEY),
+]
+
+def load_router():
+    spec = importlib.util.spec_from_file_location("callback_router", ROUTER_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+async def handler(update, context, **params):
+    return True
+
+def build(router_module, size):
+    router = router_module.CallbackRouter(metrics=False)
+    for i in range(size):
+        router.add(f"menu_{i}", handler)
+    router.add_prefix("lang_", handler)
+    router.add("edit_{index:int}_{callback}", handler)
+    router.add("confirm_{callback}", handler)
+    return router
+
+def load_survey():
+    """Загружает base.survey.survey без base/__init__.py и base/survey/__init__.py"""
+    for name, path in (("base", BASE_PATH), ("base.survey", os.path.join(BASE_PATH, "survey"))):
+        if name not in sys.modules:
+            package = types.ModuleType(name)
+            package.__path__ = [path]
+            sys.modules[name] = package
+    return importlib.import_module("base.survey.survey"), importlib.import_module("base.survey.session_store")
+
+def make_update(data, user_id):
+    return types.SimpleNamespace(
+        callback_query=types.SimpleNamespace(data=data),
+        effective_user=types.SimpleNamespace(id=user_id),
+    )
+
+def build_with_survey(router_module, survey, size):
+    """Таблица маршрутов бота: точные маршруты и маршруты опроса с условием has_active_survey"""
+    router = router_module.CallbackRouter()
+    for i in range(size):
+        router.add(f"menu_{i}", handler)
+    # Обработчики опроса заменяются заглушками: замеряется выбор маршрута и проверка условия
+    survey.handle_edit_callback = survey.handle_confirm_callback = survey.handle_survey_button = handler
+    survey.register_survey_routes(router)
+    return router
+
+def benchmark_dispatch(router_module, number):
+    survey, session_store = load_survey()
+    from base.survey.definition import SurveyProgress
+
+    class StubStore(session_store.MemorySurveySessionStore):
+        """Хранилище в памяти, считающее обращения к get (в боте они могут идти в БД)"""
+        loads = 0
+
+        async def get(self, user_id):
+            StubStore.loads += 1
+            return await super().get(user_id)
+
+    store = StubStore()
+    store.start(USER_IN_SURVEY, SurveyProgress("benchmark"))
+    session_store._store = store
+
+    async def run(router, update):
+        started = time.perf_counter()
+        for _ in range(number):
+            await router.dispatch(update, None)
+        return time.perf_counter() - started
+
+    print(f"\nВремя dispatch() с условиями маршрутов опроса в микросекундах")
+    print(f"{'Маршрутов':>10} " + " ".join(f"{name:>20}" for name, _, _ in DISPATCH_CASES))
+    for size in TABLE_SIZES:
+        router = build_with_survey(router_module, survey, size)
+        times = [
+            asyncio.run(run(router, make_update(data, user_id))) / number * 1e6
+            for _, data, user_id in DISPATCH_CASES
+        ]
+        print(f"{size:>10} " + " ".join(f"{value:>20.2f}" for value in times))
+    print(f"Обращений к хранилищу сессий: {StubStore.loads}")
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    router_module = load_router()
+
+    print(f"Повторов: {number}, время выбора маршрута в микросекундах\n")
+    print(f"{'Маршрутов':>10} " + " ".join(f"{name:>10}" for name, _ in CASES))
+
+    for size in TABLE_SIZES:
+        router = build(router_module, size)
+        times = []
+        for _, data in CASES:
+            elapsed = timeit.timeit(lambda: next(router.match(data)), number=number)
+            times.append(elapsed / number * 1e6)
+        print(f"{size:>10} " + " ".join(f"{value:>10.2f}" for value in times))
+
+    benchmark_dispatch(router_module, number)
+
+if __name__ == "__main__":
+    main()
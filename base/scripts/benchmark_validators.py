@@ -0,0 +1,66 @@
+"""
+Замер стоимости проверки одного ответа на вопрос опроса.
+
+Для каждого типа проверки выводит время вызова заранее скомпилированного
+валидатора (как при прохождении опроса) и время прежней проверки цепочкой
+if/elif в validate_input (legacy_validate_input.py).
+
+Запуск из корня проекта:
+    python base/scripts/benchmark_validators.py [количество повторов]
+"""
+import importlib.util
+import os
+import sys
+import timeit
+
+# Модуль загружается напрямую, чтобы не импортировать весь пакет base (БД, настройки)
+VALIDATORS_PATH = os.path.join(os.path.dirname(__file__), "..", "survey", "validators.py")
+LEGACY_PATH = os.path.join(os.path.dirname(__file__), "legacy_validate_input.py")
+
+# Тип проверки, параметры и примеры ответов (корректный и некорректный)
+CASES = [
+    ("text", None, ["Любой текст", ""]),
+    ("number", {"min": 1, "max": 100}, ["42", "abc"]),
+    ("date", None, ["15.03.24", "завтра", "31.02.24"]),
+    ("datetime", None, ["15.03.24 14:30", "today 09:00", "15.03.24 25:00"]),
+    ("time", None, ["14:30", "1430"]),
+    ("phone", None, ["+7 (999) 123-45-67", "12-34"]),
+    ("url", None, ["https://example.com/page", "example.com"]),
+    ("confirm", None, ["Да", "oui", "может быть"]),
+    ("name", None, ["Иванов Иван Иванович", "иванов иван", "John Smith"]),
+]
+
+def load_module(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def run_case(validator, values):
+    for value in values:
+        try:
+            validator(value)
+        except Exception:
+            pass
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    validators = load_module("survey_validators", VALIDATORS_PATH)
+    legacy = load_module("legacy_validate_input", LEGACY_PATH)
+
+    print(f"Повторов: {number}, время на один ответ в микросекундах\n")
+    print(f"{'Тип':<10} {'компилированный':>16} {'validate_input':>16}")
+
+    for validation_type, params, values in CASES:
+        compiled = validators.compile_validator(validation_type, params)
+        precompiled_time = timeit.timeit(lambda: run_case(compiled, values), number=number)
+
+        def legacy_validator(value):
+            return legacy.validate_input(value, validation_type, params)
+        legacy_time = timeit.timeit(lambda: run_case(legacy_validator, values), number=number)
+
+        per_answer = number * len(values) / 1e6
+        print(f"{validation_type:<10} {precompiled_time / per_answer:>16.2f} {legacy_time / per_answer:>16.2f}")
+
+if __name__ == "__main__":
+    main()
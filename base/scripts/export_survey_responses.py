@@ -0,0 +1,75 @@
+"""
+Экспорт ответов на опрос из таблицы survey_responses в CSV или Parquet.
+
+Ответы читаются из БД курсором и записываются в файл по частям,
+поэтому экспорт больших опросов не загружает таблицу в память целиком.
+
+Запуск из корня проекта:
+    python base/scripts/export_survey_responses.py <survey_id> [файл] [--format csv|parquet]
+
+Для формата Parquet нужен пакет pyarrow (pip install pyarrow).
+"""
+import argparse
+import asyncio
+import importlib.util
+import os
+import sys
+
+import asyncpg
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+RESPONSES_PATH = os.path.join(PROJECT_ROOT, "base", "survey", "responses.py")
+
+# Настройки БД
+BOT_PREFIX = "tgbot_"
+
+def load_postgres_config():
+    """Загружает настройки подключения к PostgreSQL из файла конфигурации"""
+    global BOT_PREFIX
+
+    sys.path.insert(0, PROJECT_ROOT)
+    try:
+        from credentials.postgres.config import (
+            HOST, DATABASE, USER, PASSWORD, PORT, BOT_PREFIX as PREFIX
+        )
+        BOT_PREFIX = PREFIX if PREFIX else BOT_PREFIX
+        return HOST, DATABASE, USER, PASSWORD, PORT
+    except ImportError:
+        print("Не удалось загрузить настройки PostgreSQL из credentials/postgres/config.py")
+    except Exception as e:
+        print(f"Ошибка при загрузке настроек PostgreSQL: {e}")
+
+    print("Используем настройки PostgreSQL по умолчанию")
+    return "localhost", "telegram_bot", "postgres", "postgres", 5432
+
+def load_responses_module():
+    # Модуль загружается напрямую, чтобы не инициализировать бота
+    spec = importlib.util.spec_from_file_location("survey_responses", RESPONSES_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+async def export(survey_id: str, output_path: str, fmt: str):
+    host, database, user, password, port = load_postgres_config()
+    responses = load_responses_module()
+
+    conn = await asyncpg.connect(host=host, port=port, user=user, password=password, database=database)
+    try:
+        exported = await responses.export_responses(conn, BOT_PREFIX, survey_id, output_path, fmt)
+    finally:
+        await conn.close()
+
+    print(f"Выгружено ответов: {exported} -> {output_path}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Экспорт ответов на опрос")
+    parser.add_argument("survey_id", help="Идентификатор опроса")
+    parser.add_argument("output", nargs="?", help="Файл для записи (по умолчанию <survey_id>.<формат>)")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv", help="Формат файла")
+    args = parser.parse_args()
+
+    output_path = args.output or f"{args.survey_id}.{args.format}"
+    asyncio.run(export(args.survey_id, output_path, args.format))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+"""
+Прежняя проверка ответов на вопросы опроса цепочкой if/elif (validate_input).
+
+Используется только в benchmark_validators.py для сравнения со
+скомпилированными валидаторами base/survey/validators.py: при каждом ответе
+тип проверки ищется перебором ветвей, а регулярные выражения и ключевые
+слова обрабатываются заново.
+"""
+import re
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+TYPE_TEXT = "text"
+TYPE_NUMBER = "number"
+TYPE_SYMBOLS = "symbols"
+TYPE_BUTTONS = "buttons"  # Новый тип для кнопок
+TYPE_DATE = "date"        # Тип для даты
+TYPE_DATETIME = "datetime"  # Тип для даты со временем
+TYPE_TIME = "time"        # Тип для времени
+TYPE_PHONE = "phone"      # Тип для телефона
+TYPE_URL = "url"          # Тип для ссылки
+TYPE_CONFIRM = "confirm"  # Тип для подтверждения
+TYPE_NAME = "name"        # Тип для ФИО
+
+# Мультиязычные ключевые слова для дат
+DATE_KEYWORDS = {
+    "сегодня": {"ru": "сегодня", "en": "today", "uk": "сьогодні", "zh": "今天", "es": "hoy", "fr": "aujourd'hui"},
+    "завтра": {"ru": "завтра", "en": "tomorrow", "uk": "завтра", "zh": "明天", "es": "mañana", "fr": "demain"},
+    "вчера": {"ru": "вчера", "en": "yesterday", "uk": "вчора", "zh": "昨天", "es": "ayer", "fr": "hier"}
+}
+
+# Мультиязычные ключевые слова для подтверждений
+CONFIRM_KEYWORDS = {
+    "да": {"ru": ["да", "конечно", "точно", "верно"], 
+           "en": ["yes", "yeah", "sure", "true"], 
+           "uk": ["так", "так-так", "звичайно"], 
+           "zh": ["是的", "对", "当然"], 
+           "es": ["sí", "claro", "por supuesto"], 
+           "fr": ["oui", "bien sûr", "certainement"]},
+    "нет": {"ru": ["нет", "неа", "ни за что"], 
+            "en": ["no", "nope", "false"], 
+            "uk": ["ні", "не"], 
+            "zh": ["不", "不是", "否"], 
+            "es": ["no", "nunca"], 
+            "fr": ["non", "pas"]}
+}
+
+class ValidationError(Exception):
+    """Exception raised when survey input validation fails."""
+    pass
+
+def validate_input(value: str, validation_type: str, validation_params: Optional[dict] = None) -> Any:
+    """
+    Validates user input based on the specified validation type and parameters.
+    
+    Args:
+        value: The user input to validate
+        validation_type: The type of validation to perform
+        validation_params: Additional parameters for validation
+    
+    Returns:
+        The validated and possibly converted value
+    
+    Raises:
+        ValidationError: If validation fails
+    """
+    if validation_type == TYPE_TEXT:
+        # Text validation is always valid
+        return value
+        
+    elif validation_type == TYPE_NUMBER:
+        try:
+            min_val = validation_params.get('min', float('-inf'))
+            max_val = validation_params.get('max', float('inf'))
+            num_value = float(value)
+            
+            if num_value < min_val or num_value > max_val:
+                raise ValidationError(f"Введите число от {min_val} до {max_val}")
+                
+            # Return integer if the number is whole
+            if num_value.is_integer():
+                return int(num_value)
+            return num_value
+            
+        except ValueError:
+            raise ValidationError("Пожалуйста, введите корректное число")
+            
+    elif validation_type == TYPE_SYMBOLS:
+        # Only allow specified symbols
+        return value
+    
+    elif validation_type == TYPE_DATE:
+        try:
+            # Проверяем на ключевые слова
+            date_value = _parse_date_keywords(value.lower())
+            if date_value:
+                return date_value.strftime("%d.%m.%y")
+            
+            # Проверяем формат даты
+            date_match = re.match(r'^(\d{1,2})\.(\d{1,2})\.(\d{2})$', value)
+            if not date_match:
+                raise ValidationError("Пожалуйста, введите дату в формате ДД.ММ.ГГ (двузначный год)")
+            
+            day, month, year = map(int, date_match.groups())
+            
+            # Проверяем диапазоны значений
+            if day < 1 or day > 31:
+                raise ValidationError("День должен быть в диапазоне от 1 до 31")
+            
+            if month < 1 or month > 12:
+                raise ValidationError("Месяц должен быть в диапазоне от 1 до 12")
+            
+            if year < 0 or year > 99:
+                raise ValidationError("Год должен быть двузначным числом (от 00 до 99)")
+            
+            # Корректируем год если задан двузначным числом
+            full_year = 2000 + year if year < 50 else 1900 + year
+                
+            # Проверяем валидность даты (месяцы с разным количеством дней и високосные года)
+            days_in_month = [0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+            
+            # Проверка на високосный год для февраля
+            if month == 2 and ((full_year % 400 == 0) or (full_year % 100 != 0 and full_year % 4 == 0)):
+                days_in_month[2] = 29
+                
+            # Проверяем, что день не превышает количество дней в месяце
+            if day > days_in_month[month]:
+                raise ValidationError(f"Некорректная дата: в месяце {month} только {days_in_month[month]} дней")
+                
+            # Дополнительная проверка через datetime
+            try:
+                date_value = datetime(full_year, month, day)
+                return value  # Возвращаем оригинальное значение, так как оно прошло все проверки
+            except ValueError:
+                raise ValidationError("Пожалуйста, введите корректную дату")
+                
+        except ValidationError:
+            raise
+        except Exception as e:
+            raise ValidationError(f"Ошибка в формате даты: {e}")
+    
+    elif validation_type == TYPE_DATETIME:
+        try:
+            # Проверяем на ключевые слова
+            parts = value.lower().split()
+            date_part = parts[0]
+            time_part = parts[1] if len(parts) > 1 else "00:00"
+            
+            # Обрабатываем дату
+            date_value = None
+            if _is_date_keyword(date_part):
+                date_value = _parse_date_keywords(date_part)
+            else:
+                # Проверяем формат даты
+                date_match = re.match(r'^(\d{1,2})\.(\d{1,2})\.(\d{2})$', date_part)
+                if not date_match:
+                    raise ValidationError("Пожалуйста, введите дату в формате ДД.ММ.ГГ ЧЧ:ММ (двузначный год)")
+                
+                day, month, year = map(int, date_match.groups())
+                
+                # Проверяем диапазоны значений
+                if day < 1 or day > 31:
+                    raise ValidationError("День должен быть в диапазоне от 1 до 31")
+                
+                if month < 1 or month > 12:
+                    raise ValidationError("Месяц должен быть в диапазоне от 1 до 12")
+                
+                if year < 0 or year > 99:
+                    raise ValidationError("Год должен быть двузначным числом (от 00 до 99)")
+                
+                # Корректируем год если задан двузначным числом
+                full_year = 2000 + year if year < 50 else 1900 + year
+                
+                # Проверяем валидность даты (месяцы с разным количеством дней и високосные года)
+                days_in_month = [0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+                
+                # Проверка на високосный год для февраля
+                if month == 2 and ((full_year % 400 == 0) or (full_year % 100 != 0 and full_year % 4 == 0)):
+                    days_in_month[2] = 29
+                    
+                # Проверяем, что день не превышает количество дней в месяце
+                if day > days_in_month[month]:
+                    raise ValidationError(f"Некорректная дата: в месяце {month} только {days_in_month[month]} дней")
+                
+                # Проверяем валидность даты
+                try:
+                    date_value = datetime(full_year, month, day)
+                except ValueError:
+                    raise ValidationError("Пожалуйста, введите корректную дату")
+            
+            # Обрабатываем время
+            time_match = re.match(r'^(\d{1,2}):(\d{2})$', time_part)
+            if not time_match:
+                raise ValidationError("Пожалуйста, введите время в формате ЧЧ:ММ")
+            
+            hour, minute = map(int, time_match.groups())
+            if hour < 0 or hour > 23 or minute < 0 or minute > 59:
+                raise ValidationError("Пожалуйста, введите корректное время")
+            
+            # Если дата получена из ключевого слова, добавляем время
+            if date_value:
+                date_value = date_value.replace(hour=hour, minute=minute)
+                return date_value.strftime("%d.%m.%y %H:%M")
+            
+            # Иначе просто возвращаем введенное значение, которое уже прошло валидацию
+            return value
+            
+        except ValidationError:
+            raise
+        except Exception as e:
+            raise ValidationError(f"Ошибка в формате даты и времени: {e}")
+    
+    elif validation_type == TYPE_TIME:
+        try:
+            # Проверяем формат времени
+            time_match = re.match(r'^(\d{1,2}):(\d{2})$', value)
+            if not time_match:
+                raise ValidationError("Пожалуйста, введите время в формате ЧЧ:ММ")
+            
+            hour, minute = map(int, time_match.groups())
+            if hour < 0 or hour > 23 or minute < 0 or minute > 59:
+                raise ValidationError("Пожалуйста, введите корректное время")
+            
+            return value
+            
+        except ValidationError:
+            raise
+        except Exception as e:
+            raise ValidationError(f"Ошибка в формате времени: {e}")
+    
+    elif validation_type == TYPE_PHONE:
+        try:
+            # Удаляем все символы кроме цифр и +
+            clean_phone = re.sub(r'[^\d+]', '', value)
+            
+            # Проверяем что номер состоит из цифр и имеет хотя бы 7 цифр
+            if not re.match(r'^\+?\d{7,15}$', clean_phone):
+                raise ValidationError("Пожалуйста, введите корректный номер телефона")
+            
+            return value
+            
+        except ValidationError:
+            raise
+        except Exception as e:
+            raise ValidationError(f"Ошибка в формате телефона: {e}")
+    
+    elif validation_type == TYPE_URL:
+        try:
+            # Проверяем что URL начинается с http:// или https://
+            if not re.match(r'^https?://', value):
+                raise ValidationError("URL должен начинаться с http:// или https://")
+            
+            # Проверяем что URL имеет хотя бы один символ после протокола
+            if not re.match(r'^https?://[^\s]+$', value):
+                raise ValidationError("Пожалуйста, введите корректный URL")
+            
+            return value
+            
+        except ValidationError:
+            raise
+        except Exception as e:
+            raise ValidationError(f"Ошибка в формате URL: {e}")
+    
+    elif validation_type == TYPE_CONFIRM:
+        try:
+            # Проверяем ключевые слова для подтверждения на разных языках
+            value_lower = value.lower()
+            
+            # Проверяем на положительное подтверждение
+            for variants in CONFIRM_KEYWORDS["да"].values():
+                if value_lower in variants:
+                    return "да"
+            
+            # Проверяем на отрицательное подтверждение
+            for variants in CONFIRM_KEYWORDS["нет"].values():
+                if value_lower in variants:
+                    return "нет"
+            
+            raise ValidationError("Пожалуйста, ответьте 'да' или 'нет'")
+            
+        except ValidationError:
+            raise
+        except Exception as e:
+            raise ValidationError(f"Ошибка при обработке подтверждения: {e}")
+    
+    elif validation_type == TYPE_NAME:
+        try:
+            # Разделяем строку на слова
+            words = value.strip().split()
+            
+            # Проверяем что есть хотя бы два слова
+            if len(words) < 2:
+                raise ValidationError("Пожалуйста, введите фамилию и имя")
+            
+            # Проверяем что каждое слово начинается с заглавной буквы для кириллицы
+            if any(re.match(r'^[а-яё]', word.lower()) for word in words):  # Если есть кириллические символы
+                if any(not re.match(r'^[А-ЯЁ][а-яё]+$', word) for word in words):
+                    raise ValidationError("Имя и фамилия должны начинаться с заглавной буквы")
+            
+            return value
+            
+        except ValidationError:
+            raise
+        except Exception as e:
+            raise ValidationError(f"Ошибка при обработке ФИО: {e}")
+    
+    # Default case
+    return value
+
+def _is_date_keyword(text: str) -> bool:
+    """Проверяет, является ли текст ключевым словом для даты"""
+    text_lower = text.lower()
+    for keyword_dict in DATE_KEYWORDS.values():
+        if text_lower in keyword_dict.values():
+            return True
+    return False
+
+def _parse_date_keywords(text: str) -> Optional[datetime]:
+    """Преобразует ключевые слова даты в объект datetime"""
+    text_lower = text.lower()
+    
+    # Получаем текущую дату
+    today = datetime.now()
+    
+    # Проверяем ключевое слово "сегодня"
+    for lang_value in DATE_KEYWORDS["сегодня"].values():
+        if text_lower == lang_value:
+            return today
+    
+    # Проверяем ключевое слово "завтра"
+    for lang_value in DATE_KEYWORDS["завтра"].values():
+        if text_lower == lang_value:
+            return today + timedelta(days=1)
+    
+    # Проверяем ключевое слово "вчера"
+    for lang_value in DATE_KEYWORDS["вчера"].values():
+        if text_lower == lang_value:
+            return today - timedelta(days=1)
+    
+    return None
@@ -1,4 +1,5 @@
-from .survey import survey, create_survey, get_survey_results, handle_survey_response, start_survey
+from .survey import survey, create_survey, get_survey_results, handle_survey_response, start_survey, register_survey_routes
+from .validators import register_validator, ValidationError
 
 # Специальная версия декоратора survey для функций без return
 def auto_survey(survey_id):
@@ -25,24 +26,23 @@ def auto_survey(survey_id):
                 chat_id = current_update.effective_chat.id
                 
                 # Store the active survey for this user
-                from .survey import _active_surveys
-                _active_surveys[user_id] = {
-                    'survey_id': survey_id,
-                    'data': result
-                }
+                from .survey import begin_survey
+                progress = begin_survey(user_id, survey_id)
                 
                 # Ask the first question directly using the bot
-                if result and result.get('questions'):
+                if result and result.questions:
                     import asyncio
                     from .survey import ask_next_question
                     asyncio.create_task(ask_next_question(
                         current_context, 
                         chat_id, 
-                        result
+                        result,
+                        progress,
+                        user_id
                     ))
             
             return result
         return wrapper
     return decorator
 
-__all__ = ['survey', 'create_survey', 'get_survey_results', 'handle_survey_response', 'auto_survey', 'start_survey'] 
\ No newline at end of file
+__all__ = ['survey', 'create_survey', 'get_survey_results', 'handle_survey_response', 'auto_survey', 'start_survey', 'register_validator', 'ValidationError', 'register_survey_routes'] 
\ No newline at end of file
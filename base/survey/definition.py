@@ -0,0 +1,152 @@
+"""
+Определения опросов и прогресс пользователей.
+
+SurveyDefinition - неизменяемое описание опроса (вопросы со скомпилированными
+валидаторами и заранее подготовленной раскладкой кнопок). Создается один раз
+на survey_id и используется всеми пользователями.
+
+SurveyProgress - состояние прохождения опроса одним пользователем (индекс
+текущего вопроса и ответы). Это маленький объект с __slots__, поэтому запуск
+опроса почти ничего не выделяет, а пользователи не делят общий список ответов.
+"""
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from .validators import compile_validator
+
+class SurveyQuestion(NamedTuple):
+    """Вопрос опроса с разобранной валидацией"""
+    text: str
+    validation_type: str
+    validation_params: Optional[dict]
+    # Кнопки: ряды из пар (текст, callback_data), пустой кортеж для текстовых вопросов
+    buttons: Tuple[Tuple[Tuple[str, str], ...], ...] = ()
+    # Скомпилированная проверка ответа: value -> проверенное значение
+    validator: Optional[Callable[[str], Any]] = None
+
+    @property
+    def button_texts(self) -> Tuple[str, ...]:
+        """Тексты всех кнопок по порядку (для перевода одним списком)"""
+        return tuple(text for row in self.buttons for text, _ in row)
+
+class SurveyDefinition(NamedTuple):
+    """Неизменяемое описание опроса"""
+    survey_id: str
+    questions: Tuple[SurveyQuestion, ...]
+    after_callback: Optional[str] = None
+    rewrite_data: Optional[Tuple[Tuple[Any, ...], ...]] = None
+
+    def __len__(self) -> int:
+        return len(self.questions)
+
+    @classmethod
+    def from_data(cls, survey_id: str, survey_data: Dict[str, Any]) -> 'SurveyDefinition':
+        """
+        Создает определение из словаря опроса старого формата
+        ({'questions': [...], 'after_callback': ..., 'rewrite_data': ...}).
+
+        Args:
+            survey_id: Идентификатор опроса
+            survey_data: Словарь опроса
+
+        Returns:
+            SurveyDefinition: Определение опроса
+        """
+        questions = tuple(
+            SurveyQuestion(
+                question['text'],
+                question['validation_type'],
+                question.get('validation_params'),
+                compile_buttons(question.get('validation_params')),
+                compile_validator(question['validation_type'], question.get('validation_params'))
+            )
+            for question in survey_data.get('questions', [])
+        )
+        rewrite_data = survey_data.get('rewrite_data')
+        return cls(
+            survey_id,
+            questions,
+            survey_data.get('after_callback'),
+            tuple(tuple(label) for label in rewrite_data) if rewrite_data else None
+        )
+
+def compile_buttons(validation_params: Optional[dict]) -> Tuple[Tuple[Tuple[str, str], ...], ...]:
+    """
+    Подготавливает раскладку кнопок вопроса.
+
+    Кнопки задаются списком, где элемент - одиночная кнопка [текст, данные]
+    или горизонтальный ряд [[текст, данные], [текст, данные], ...].
+
+    Args:
+        validation_params: Параметры валидации вопроса ({'buttons': [...]})
+
+    Returns:
+        Ряды кнопок из пар (текст, callback_data)
+    """
+    if not validation_params or 'buttons' not in validation_params:
+        return ()
+
+    rows = []
+    for button_row in validation_params['buttons']:
+        if not isinstance(button_row, list) or not button_row:
+            continue
+        if isinstance(button_row[0], list):
+            # Горизонтальный ряд кнопок
+            rows.append(tuple((button[0], button[1]) for button in button_row))
+        else:
+            # Одиночная кнопка
+            rows.append(((button_row[0], button_row[1]),))
+    return tuple(rows)
+
+class SurveyProgress:
+    """Прогресс прохождения опроса одним пользователем"""
+
+    __slots__ = ('survey_id', 'current_index', 'answers', 'is_editing', 'edit_index', 'asked_at', 'version')
+
+    # Поля, сохраняемые в хранилище сессий
+    FIELDS = __slots__
+
+    def __init__(self,
+                 survey_id: str,
+                 current_index: int = 0,
+                 answers: Optional[List[Any]] = None,
+                 is_editing: bool = False,
+                 edit_index: int = 0,
+                 asked_at: Optional[float] = None,
+                 version: int = 0):
+        self.survey_id = survey_id
+        self.current_index = current_index
+        self.answers = answers if answers is not None else []
+        self.is_editing = is_editing
+        self.edit_index = edit_index
+        # Время отправки текущего вопроса (time.time()) для метрики времени ответа
+        self.asked_at = asked_at
+        # Номер версии сохраненной сессии (защита от записи устаревшего прогресса другим процессом)
+        self.version = version
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Возвращает прогресс в виде словаря для сохранения"""
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> 'SurveyProgress':
+        """
+        Восстанавливает прогресс из сохраненного словаря.
+
+        Args:
+            state: Словарь, созданный to_dict
+
+        Returns:
+            SurveyProgress: Прогресс пользователя
+        """
+        return cls(
+            state['survey_id'],
+            state.get('current_index', 0),
+            state.get('answers'),
+            state.get('is_editing', False),
+            state.get('edit_index', 0),
+            state.get('asked_at'),
+            state.get('version', 0)
+        )
+
+    def __repr__(self) -> str:
+        return f"SurveyProgress({self.survey_id!r}, index={self.current_index}, answers={len(self.answers)})"
@@ -0,0 +1,152 @@
+"""
+Подготовка переведенных вопросов и клавиатур опроса.
+
+Все тексты вопроса (сам вопрос и подписи кнопок) переводятся одним пакетным
+вызовом. Готовый результат (переведенный текст и InlineKeyboardMarkup)
+кэшируется по (survey_id, индекс вопроса, язык), поэтому следующие
+пользователи с тем же языком получают вопрос без обращений к переводчику.
+"""
+import logging
+from collections import OrderedDict
+from typing import List, Optional, Sequence, Tuple
+
+from .definition import SurveyDefinition
+
+# Максимальное количество подготовленных вопросов в кэше
+RENDER_CACHE_SIZE = 1000
+
+# Индекс вопроса в ключе кэша для экрана проверки ответов
+SUMMARY_INDEX = -1
+
+# Тексты экрана проверки ответов
+SUMMARY_HEADER = "Проверьте ваши данные:"
+CONFIRM_LABEL = "Все верно"
+
+# (survey_id, индекс вопроса, язык) -> подготовленный вопрос
+_render_cache: "OrderedDict[Tuple[str, int, str], tuple]" = OrderedDict()
+
+def _get_language() -> str:
+    """Возвращает язык текущего пользователя"""
+    from easy_bot import get_user_language
+    return get_user_language()
+
+async def translate_texts(texts: Sequence[str], language: str) -> List[str]:
+    """
+    Переводит список текстов одним пакетным вызовом.
+
+    Args:
+        texts: Тексты на русском языке
+        language: Целевой язык
+
+    Returns:
+        Переведенные тексты в том же порядке
+    """
+    if not texts or language.lower() in ("русский", "ru"):
+        return list(texts)
+    try:
+        from language.translate_any_message import translate_multiple
+        return list(await translate_multiple(list(texts), language))
+    except Exception as e:
+        logging.error(f"Ошибка при пакетном переводе, переводим по одному: {e}")
+        from easy_bot import translate
+        return [await translate(text, language) for text in texts]
+
+def _cache_get(key):
+    rendered = _render_cache.get(key)
+    if rendered is not None:
+        _render_cache.move_to_end(key)
+    return rendered
+
+def _cache_put(key, rendered) -> None:
+    _render_cache[key] = rendered
+    while len(_render_cache) > RENDER_CACHE_SIZE:
+        _render_cache.popitem(last=False)
+
+async def render_question(definition: SurveyDefinition, index: int, language: Optional[str] = None):
+    """
+    Возвращает переведенный текст вопроса и его клавиатуру.
+
+    Args:
+        definition: Определение опроса
+        index: Индекс вопроса
+        language: Целевой язык (по умолчанию язык текущего пользователя)
+
+    Returns:
+        (текст вопроса, InlineKeyboardMarkup или None для текстовых вопросов)
+    """
+    language = language or _get_language()
+    key = (definition.survey_id, index, language)
+    rendered = _cache_get(key)
+    if rendered is not None:
+        return rendered
+
+    question = definition.questions[index]
+    translated = await translate_texts((question.text,) + question.button_texts, language)
+
+    reply_markup = None
+    if question.buttons:
+        from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+        labels = iter(translated[1:])
+        reply_markup = InlineKeyboardMarkup([
+            [InlineKeyboardButton(next(labels), callback_data=data) for _, data in row]
+            for row in question.buttons
+        ])
+
+    rendered = (translated[0], reply_markup)
+    _cache_put(key, rendered)
+    return rendered
+
+def _summary_label(question_text: str) -> str:
+    """Текст вопроса без пояснений после знака вопроса и двоеточия"""
+    return question_text.split('?')[0].split(':')[0]
+
+async def render_summary(definition: SurveyDefinition, language: Optional[str] = None):
+    """
+    Возвращает переведенные тексты и клавиатуру экрана проверки ответов.
+
+    Args:
+        definition: Определение опроса (с rewrite_data)
+        language: Целевой язык (по умолчанию язык текущего пользователя)
+
+    Returns:
+        (заголовок, подписи вопросов, InlineKeyboardMarkup с кнопками изменения и подтверждения)
+    """
+    language = language or _get_language()
+    key = (definition.survey_id, SUMMARY_INDEX, language)
+    rendered = _cache_get(key)
+    if rendered is not None:
+        return rendered
+
+    from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+    question_labels = [_summary_label(question.text) for question in definition.questions]
+    edit_labels = [label[0] for label in definition.rewrite_data[:len(definition.questions)]]
+    translated = await translate_texts(
+        [SUMMARY_HEADER] + question_labels + edit_labels + [CONFIRM_LABEL],
+        language
+    )
+
+    header = translated[0]
+    labels = tuple(translated[1:1 + len(question_labels)])
+    edit_texts = translated[1 + len(question_labels):-1]
+
+    keyboard = [
+        [InlineKeyboardButton(text, callback_data=f"edit_{i}_{definition.after_callback}")]
+        for i, text in enumerate(edit_texts)
+    ]
+    keyboard.append([InlineKeyboardButton(translated[-1], callback_data=f"confirm_{definition.after_callback}")])
+
+    rendered = (header, labels, InlineKeyboardMarkup(keyboard))
+    _cache_put(key, rendered)
+    return rendered
+
+def invalidate_survey(survey_id: str) -> None:
+    """
+    Удаляет подготовленные вопросы опроса из кэша (при изменении опроса).
+
+    Args:
+        survey_id: Идентификатор опроса
+    """
+    for key in [key for key in _render_cache if key[0] == survey_id]:
+        del _render_cache[key]
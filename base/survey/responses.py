@@ -0,0 +1,326 @@
+"""
+Хранение и анализ ответов на опросы.
+
+Завершенные прохождения опросов накапливаются в памяти и записываются в таблицу
+survey_responses пакетами (не чаще раза в FLUSH_INTERVAL или сразу при
+накоплении BATCH_SIZE ответов). Счетчики текущего процесса (запуски, ответы
+на каждый вопрос, завершения) ведутся только в base.metrics (см. stats.py),
+а полные агрегаты по всем ответам считаются в БД через GROUP BY. Экспорт читает ответы курсором и пишет их в CSV или Parquet
+по частям, не загружая таблицу в память целиком.
+
+Модуль не использует относительные импорты, чтобы его можно было загрузить
+из скриптов в base/scripts без инициализации бота.
+"""
+import asyncio
+import csv
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+# Максимальное количество ответов в одной пакетной записи
+BATCH_SIZE = 100
+
+# Максимальное время ожидания ответа в буфере перед записью (секунды)
+FLUSH_INTERVAL = 2.0
+
+# Максимальное количество ответов в буфере, пока БД недоступна (самые старые отбрасываются)
+MAX_BUFFERED_RESPONSES = 10000
+
+# Строк, читаемых из БД за один раз при экспорте
+EXPORT_BATCH_SIZE = 5000
+
+def table_name(prefix: str) -> str:
+    """Возвращает имя таблицы ответов для префикса бота"""
+    return f"{prefix}survey_responses"
+
+async def ensure_table(conn, prefix: str) -> None:
+    """
+    Создает таблицу ответов, если ее еще нет.
+
+    Args:
+        conn: Соединение asyncpg
+        prefix: Префикс таблиц бота
+    """
+    table = table_name(prefix)
+    await conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {table} (
+            id BIGSERIAL PRIMARY KEY,
+            survey_id TEXT NOT NULL,
+            user_id BIGINT NOT NULL,
+            answers JSONB NOT NULL,
+            completed_at TIMESTAMP NOT NULL DEFAULT NOW()
+        )
+    """)
+    await conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_survey_idx ON {table} (survey_id, completed_at)")
+
+_buffer: List[tuple] = []
+_flush_task: Optional[asyncio.Task] = None
+_batch_flush_task: Optional[asyncio.Task] = None
+_flush_lock = asyncio.Lock()
+_table_ready = False
+
+def record_response(survey_id: str, user_id: int, answers: List[Any]) -> None:
+    """
+    Сохраняет завершенное прохождение опроса (запись в БД выполняется пакетами в фоне).
+
+    Args:
+        survey_id: Идентификатор опроса
+        user_id: Telegram ID пользователя
+        answers: Ответы пользователя
+    """
+    global _batch_flush_task
+
+    _buffer.append((survey_id, user_id, json.dumps(list(answers), ensure_ascii=False, default=str)))
+    _trim_buffer()
+
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    if len(_buffer) >= BATCH_SIZE:
+        if _batch_flush_task is None or _batch_flush_task.done():
+            _batch_flush_task = loop.create_task(flush_responses())
+    else:
+        _schedule_flush()
+
+def _schedule_flush() -> None:
+    """Запускает отложенную запись буфера, если она еще не запланирована"""
+    global _flush_task
+    if _flush_task is None or _flush_task.done():
+        try:
+            _flush_task = asyncio.get_running_loop().create_task(_flush_later())
+        except RuntimeError:
+            pass
+
+def _trim_buffer() -> None:
+    """Отбрасывает самые старые ответы сверх MAX_BUFFERED_RESPONSES"""
+    overflow = len(_buffer) - MAX_BUFFERED_RESPONSES
+    if overflow > 0:
+        del _buffer[:overflow]
+        logging.error(f"Буфер ответов на опросы переполнен, отброшено самых старых ответов: {overflow}")
+
+async def _flush_later() -> None:
+    global _flush_task
+    await asyncio.sleep(FLUSH_INTERVAL)
+    # Во время записи уже можно запланировать следующую попытку
+    if _flush_task is asyncio.current_task():
+        _flush_task = None
+    await flush_responses()
+
+async def flush_responses(application=None) -> None:
+    """
+    Записывает накопленные ответы в БД (вызывается также при остановке бота).
+
+    Args:
+        application: Экземпляр приложения бота (не используется)
+    """
+    global _table_ready
+    from easy_bot import get_db_pool, BOT_PREFIX
+
+    async with _flush_lock:
+        if not _buffer:
+            return
+        batch = _buffer[:]
+        del _buffer[:len(batch)]
+
+        try:
+            pool = await get_db_pool()
+            if not pool:
+                raise RuntimeError("пул соединений с БД недоступен")
+            async with pool.acquire() as conn:
+                if not _table_ready:
+                    await ensure_table(conn, BOT_PREFIX)
+                    _table_ready = True
+                await conn.executemany(
+                    f"INSERT INTO {table_name(BOT_PREFIX)} (survey_id, user_id, answers) VALUES ($1, $2, $3::jsonb)",
+                    batch
+                )
+            logging.debug(f"Записано ответов на опросы: {len(batch)}")
+        except Exception as e:
+            logging.error(f"Ошибка при записи ответов на опросы ({len(batch)} шт.): {e}")
+            # Возвращаем ответы в начало буфера и планируем следующую попытку
+            _buffer[:0] = batch
+            _trim_buffer()
+            _schedule_flush()
+
+async def _fetch(query: str, *args):
+    """Выполняет запрос к таблице ответов ({table} в запросе заменяется ее именем)"""
+    global _table_ready
+    from easy_bot import get_db_pool, BOT_PREFIX
+
+    pool = await get_db_pool()
+    if not pool:
+        raise RuntimeError("пул соединений с БД недоступен")
+    async with pool.acquire() as conn:
+        if not _table_ready:
+            await ensure_table(conn, BOT_PREFIX)
+            _table_ready = True
+        return await conn.fetch(query.format(table=table_name(BOT_PREFIX)), *args)
+
+async def count_responses(survey_id: str) -> int:
+    """
+    Возвращает количество сохраненных прохождений опроса.
+
+    Args:
+        survey_id: Идентификатор опроса
+    """
+    records = await _fetch("SELECT COUNT(*) AS count FROM {table} WHERE survey_id = $1", survey_id)
+    return records[0]['count']
+
+async def get_option_counts(survey_id: str, question_index: int, limit: int = 50) -> Dict[str, int]:
+    """
+    Считает количество каждого варианта ответа на вопрос по всем сохраненным прохождениям.
+
+    Args:
+        survey_id: Идентификатор опроса
+        question_index: Индекс вопроса
+        limit: Максимальное количество вариантов (самые частые)
+
+    Returns:
+        Словарь вариант -> количество
+    """
+    records = await _fetch(
+        """
+        SELECT answers ->> $2::int AS value, COUNT(*) AS count
+        FROM {table}
+        WHERE survey_id = $1
+        GROUP BY 1
+        ORDER BY count DESC
+        LIMIT $3
+        """,
+        survey_id, question_index, limit
+    )
+    return {record['value']: record['count'] for record in records}
+
+async def get_numeric_stats(survey_id: str, question_index: int, buckets: int = 10) -> Dict[str, Any]:
+    """
+    Считает распределение числовых ответов на вопрос.
+
+    Args:
+        survey_id: Идентификатор опроса
+        question_index: Индекс вопроса
+        buckets: Количество интервалов гистограммы
+
+    Returns:
+        Словарь: count, min, max, avg, median и histogram (список количеств по интервалам)
+    """
+    value = "(answers ->> $2::int)::float8"
+    numeric_filter = "survey_id = $1 AND jsonb_typeof(answers -> $2::int) = 'number'"
+    stats = await _fetch(
+        f"""
+        SELECT COUNT(*) AS count, MIN({value}) AS min, MAX({value}) AS max, AVG({value}) AS avg,
+               percentile_cont(0.5) WITHIN GROUP (ORDER BY {value}) AS median
+        FROM {{table}}
+        WHERE {numeric_filter}
+        """,
+        survey_id, question_index
+    )
+    result = {key: (float(stats[0][key]) if stats[0][key] is not None else None) for key in ('min', 'max', 'avg', 'median')}
+    result['count'] = stats[0]['count']
+    result['histogram'] = []
+
+    if result['count'] and result['max'] > result['min']:
+        records = await _fetch(
+            f"""
+            SELECT LEAST(width_bucket({value}, $3::float8, $4::float8, $5::int), $5::int) AS bucket, COUNT(*) AS count
+            FROM {{table}}
+            WHERE {numeric_filter}
+            GROUP BY 1
+            """,
+            survey_id, question_index, result['min'], result['max'], buckets
+        )
+        histogram = [0] * buckets
+        for record in records:
+            histogram[record['bucket'] - 1] = record['count']
+        result['histogram'] = histogram
+    return result
+
+async def get_completion_funnel(survey_id: str) -> Dict[str, Any]:
+    """
+    Возвращает воронку прохождения опроса.
+
+    Запуски, ответы на отдельные вопросы и завершения берутся из base.metrics
+    (с момента запуска процесса), completed_total - по сохраненным прохождениям в БД.
+
+    Args:
+        survey_id: Идентификатор опроса
+
+    Returns:
+        Словарь: started, answered (по вопросам), completed, completed_total (в БД)
+    """
+    from base.survey.stats import get_counters
+
+    counters = get_counters(survey_id)
+    try:
+        counters['completed_total'] = await count_responses(survey_id)
+    except Exception as e:
+        logging.error(f"Ошибка при подсчете ответов на опрос {survey_id}: {e}")
+        counters['completed_total'] = None
+    return counters
+
+async def export_responses(conn, prefix: str, survey_id: str, output_path: str, fmt: str = "csv") -> int:
+    """
+    Экспортирует ответы на опрос в файл, читая их из БД по частям.
+
+    Args:
+        conn: Соединение asyncpg
+        prefix: Префикс таблиц бота
+        survey_id: Идентификатор опроса
+        output_path: Путь к файлу
+        fmt: "csv" или "parquet" (нужен пакет pyarrow)
+
+    Returns:
+        Количество выгруженных строк
+    """
+    table = table_name(prefix)
+    columns_count = await conn.fetchval(
+        f"SELECT COALESCE(MAX(jsonb_array_length(answers)), 0) FROM {table} WHERE survey_id = $1",
+        survey_id
+    )
+    header = ['id', 'user_id', 'completed_at'] + [f"answer_{i + 1}" for i in range(columns_count)]
+
+    def to_row(record) -> List[Any]:
+        answers = json.loads(record['answers'])
+        answers += [None] * (columns_count - len(answers))
+        return [record['id'], record['user_id'], record['completed_at'].isoformat()] + [
+            answer if answer is None or isinstance(answer, str) else json.dumps(answer, ensure_ascii=False)
+            for answer in answers
+        ]
+
+    query = f"SELECT id, user_id, completed_at, answers::text AS answers FROM {table} WHERE survey_id = $1 ORDER BY id"
+    exported = 0
+
+    async with conn.transaction():
+        cursor = conn.cursor(query, survey_id, prefetch=EXPORT_BATCH_SIZE)
+
+        if fmt == "csv":
+            with open(output_path, "w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(header)
+                async for record in cursor:
+                    writer.writerow(to_row(record))
+                    exported += 1
+            return exported
+
+        if fmt != "parquet":
+            raise ValueError(f"Неизвестный формат экспорта: {fmt}")
+
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = pa.schema(
+            [('id', pa.int64()), ('user_id', pa.int64()), ('completed_at', pa.string())]
+            + [(name, pa.string()) for name in header[3:]]
+        )
+        rows = []
+        with pq.ParquetWriter(output_path, schema) as writer:
+            async for record in cursor:
+                rows.append(to_row(record))
+                if len(rows) >= EXPORT_BATCH_SIZE:
+                    writer.write_table(pa.Table.from_pylist([dict(zip(header, row)) for row in rows], schema=schema))
+                    exported += len(rows)
+                    rows = []
+            if rows:
+                writer.write_table(pa.Table.from_pylist([dict(zip(header, row)) for row in rows], schema=schema))
+                exported += len(rows)
+    return exported
@@ -0,0 +1,523 @@
+"""
+Хранилище активных опросов пользователей.
+
+Сессия опроса - SurveyProgress пользователя (ID опроса, индекс текущего вопроса
+и ответы). Обработчики опроса изменяют ее в памяти, а хранилище сохраняет изменения:
+- MemorySurveySessionStore - только в памяти процесса;
+- PostgresSurveySessionStore - дополнительно в таблице bot_user_state (JSONB),
+  чтобы опросы переживали перезапуск и были доступны другим процессам бота.
+
+Запись в Postgres выполняется в фоне (не задерживает ответ пользователю):
+изменения накапливаются и раз в FLUSH_INTERVAL записываются одним запросом на
+пользователя, причем обновляются только измененные поля. Сессия загружается
+из БД при первом обращении к пользователю и истекает через SESSION_TTL без активности.
+
+Определения опросов создаются в памяти процесса (create_survey), поэтому вместе
+с сессиями в таблице survey_definitions хранятся исходные данные опросов: после
+перезапуска или в другом процессе опрос пользователя восстанавливается по ним.
+"""
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from .definition import SurveyProgress
+
+# Тип хранилища: "postgres" или "memory"
+SESSION_BACKEND = "postgres"
+
+# Время жизни неактивной сессии опроса (секунды)
+SESSION_TTL = 24 * 60 * 60
+
+# Время, в течение которого сессия из памяти используется без проверки в БД (секунды).
+# Если ответы пользователя могут обрабатывать разные процессы, его стоит уменьшить:
+# в течение этого времени процесс может работать с устаревшим прогрессом. Запись
+# устаревшего прогресса поверх более нового отклоняется по номеру версии сессии,
+# но ответ, обработанный по устаревшему прогрессу, будет потерян.
+LOCAL_CACHE_TTL = 60
+
+# Интервал удаления из памяти истекших сессий и отметок об их отсутствии (секунды)
+PRUNE_INTERVAL = 60
+
+# Интервал фоновой записи изменений в БД (секунды)
+FLUSH_INTERVAL = 0.5
+
+# Имя состояния в таблице bot_user_state
+STATE_NAME = "survey"
+
+# Значение bot_id в bot_user_state (таблицы уже разделены по BOT_PREFIX)
+BOT_ID = 0
+
+# Интервал удаления истекших сессий из БД (секунды)
+CLEANUP_INTERVAL = 60 * 60
+
+class MemorySurveySessionStore:
+    """Хранилище сессий опросов в памяти процесса"""
+
+    def __init__(self, ttl: float = SESSION_TTL):
+        """
+        Args:
+            ttl: Время жизни неактивной сессии (секунды)
+        """
+        self.ttl = ttl
+        # user_id -> (время последнего обращения, сессия или None)
+        self._sessions: Dict[int, Tuple[float, Optional[SurveyProgress]]] = {}
+        self._pruned_at = time.monotonic()
+
+    def peek(self, user_id: int) -> Optional[SurveyProgress]:
+        """
+        Возвращает сессию из памяти без обращения к БД.
+
+        Args:
+            user_id: Telegram ID пользователя
+
+        Returns:
+            Сессия опроса или None
+        """
+        entry = self._sessions.get(user_id)
+        if entry is None:
+            return None
+        touched_at, session = entry
+        if session is not None and time.monotonic() - touched_at > self.ttl:
+            del self._sessions[user_id]
+            return None
+        return session
+
+    async def get(self, user_id: int) -> Optional[SurveyProgress]:
+        """
+        Возвращает активную сессию опроса пользователя.
+
+        Args:
+            user_id: Telegram ID пользователя
+
+        Returns:
+            Сессия опроса или None
+        """
+        self._maybe_prune()
+        return self.peek(user_id)
+
+    def has_cached_session(self, user_id: int) -> Optional[bool]:
+        """
+        Проверяет наличие сессии только по памяти процесса, без обращения к БД.
+
+        Args:
+            user_id: Telegram ID пользователя
+
+        Returns:
+            True или False; None, если актуальных данных о пользователе в памяти нет
+        """
+        return self.peek(user_id) is not None
+
+    def _maybe_prune(self) -> None:
+        """Удаляет устаревшие записи из памяти не чаще раза в PRUNE_INTERVAL"""
+        now = time.monotonic()
+        if now - self._pruned_at < PRUNE_INTERVAL:
+            return
+        self._pruned_at = now
+        self._prune(now)
+
+    def _prune(self, now: float) -> None:
+        """Удаляет сессии, неактивные дольше ttl"""
+        for user_id, (touched_at, _) in list(self._sessions.items()):
+            if now - touched_at > self.ttl:
+                del self._sessions[user_id]
+
+    def start(self, user_id: int, session: SurveyProgress) -> None:
+        """
+        Сохраняет новую сессию опроса (заменяет предыдущую).
+
+        Args:
+            user_id: Telegram ID пользователя
+            session: Прогресс пользователя в опросе
+        """
+        self._sessions[user_id] = (time.monotonic(), session)
+
+    def save(self, user_id: int, *keys: str) -> None:
+        """
+        Отмечает изменение полей сессии (сама сессия уже изменена на месте).
+
+        Args:
+            user_id: Telegram ID пользователя
+            keys: Измененные поля (например, 'answers', 'current_index')
+        """
+        entry = self._sessions.get(user_id)
+        if entry is not None and entry[1] is not None:
+            self._sessions[user_id] = (time.monotonic(), entry[1])
+
+    def delete(self, user_id: int) -> None:
+        """
+        Удаляет сессию опроса пользователя.
+
+        Args:
+            user_id: Telegram ID пользователя
+        """
+        self._sessions.pop(user_id, None)
+
+    def save_definition(self, survey_id: str, source: Dict[str, Any]) -> None:
+        """
+        Сохраняет исходные данные опроса для восстановления в другом процессе
+        (в памяти не нужно: опрос уже создан в этом процессе).
+
+        Args:
+            survey_id: Идентификатор опроса
+            source: Аргументы create_survey или словарь опроса
+        """
+
+    async def load_definition(self, survey_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Загружает исходные данные опроса, сохраненные save_definition.
+
+        Args:
+            survey_id: Идентификатор опроса
+
+        Returns:
+            Исходные данные опроса или None
+        """
+        return None
+
+    async def flush(self) -> None:
+        """Записывает накопленные изменения (в памяти нечего записывать)"""
+
+    async def close(self) -> None:
+        """Останавливает хранилище"""
+        await self.flush()
+
+class PostgresSurveySessionStore(MemorySurveySessionStore):
+    """Хранилище сессий опросов в таблице bot_user_state с кэшем в памяти"""
+
+    def __init__(self,
+                 ttl: float = SESSION_TTL,
+                 local_cache_ttl: float = LOCAL_CACHE_TTL,
+                 flush_interval: float = FLUSH_INTERVAL):
+        """
+        Args:
+            ttl: Время жизни неактивной сессии (секунды)
+            local_cache_ttl: Время использования сессии из памяти без проверки в БД (секунды)
+            flush_interval: Интервал фоновой записи изменений (секунды)
+        """
+        super().__init__(ttl)
+        self.local_cache_ttl = local_cache_ttl
+        self.flush_interval = flush_interval
+        # user_id -> ("set", None) | ("merge", измененные поля) | ("delete", None)
+        self._pending: Dict[int, Tuple[str, Optional[set]]] = {}
+        # survey_id -> исходные данные опроса (JSON), ожидающие записи
+        self._pending_definitions: Dict[str, str] = {}
+        self._loaded_at: Dict[int, float] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self._table_ready = False
+        self._cleaned_at = 0.0
+
+    async def get(self, user_id: int) -> Optional[SurveyProgress]:
+        """
+        Возвращает сессию из памяти или загружает ее из БД.
+
+        Args:
+            user_id: Telegram ID пользователя
+
+        Returns:
+            Сессия опроса или None
+        """
+        self._maybe_prune()
+        if self._is_fresh(user_id):
+            return self.peek(user_id)
+
+        try:
+            session = await self._load(user_id)
+        except Exception as e:
+            logging.error(f"Ошибка при загрузке сессии опроса пользователя {user_id}: {e}")
+            return self.peek(user_id)
+
+        # Изменения, сделанные во время загрузки, важнее загруженных данных
+        if user_id in self._pending:
+            return self.peek(user_id)
+
+        self._sessions[user_id] = (time.monotonic(), session)
+        self._loaded_at[user_id] = time.monotonic()
+        return session
+
+    def _is_fresh(self, user_id: int) -> bool:
+        """Данные о сессии в памяти можно использовать без проверки в БД"""
+        loaded_at = self._loaded_at.get(user_id)
+        return user_id in self._pending or (loaded_at is not None and time.monotonic() - loaded_at < self.local_cache_ttl)
+
+    def has_cached_session(self, user_id: int) -> Optional[bool]:
+        if not self._is_fresh(user_id):
+            return None
+        return self.peek(user_id) is not None
+
+    def _prune(self, now: float) -> None:
+        super()._prune(now)
+        # Отметки об отсутствии сессии и времени загрузки нужны только local_cache_ttl
+        for user_id, loaded_at in list(self._loaded_at.items()):
+            if user_id in self._pending or now - loaded_at < self.local_cache_ttl:
+                continue
+            del self._loaded_at[user_id]
+            entry = self._sessions.get(user_id)
+            if entry is not None and entry[1] is None:
+                del self._sessions[user_id]
+
+    def start(self, user_id: int, session: SurveyProgress) -> None:
+        super().start(user_id, session)
+        self._loaded_at[user_id] = time.monotonic()
+        self._pending[user_id] = ("set", None)
+        self._schedule_flush()
+
+    def save(self, user_id: int, *keys: str) -> None:
+        if self.peek(user_id) is None:
+            return
+        super().save(user_id, *keys)
+        self._loaded_at[user_id] = time.monotonic()
+
+        operation, fields = self._pending.get(user_id, ("merge", set()))
+        if operation == "merge":
+            self._pending[user_id] = ("merge", fields | set(keys))
+        self._schedule_flush()
+
+    def delete(self, user_id: int) -> None:
+        super().delete(user_id)
+        self._sessions[user_id] = (time.monotonic(), None)
+        self._loaded_at[user_id] = time.monotonic()
+        self._pending[user_id] = ("delete", None)
+        self._schedule_flush()
+
+    def save_definition(self, survey_id: str, source: Dict[str, Any]) -> None:
+        try:
+            data = json.dumps(source, ensure_ascii=False)
+        except (TypeError, ValueError) as e:
+            logging.warning(f"Опрос {survey_id} не сохранен в БД (данные не сериализуются в JSON): {e}")
+            return
+        self._pending_definitions[survey_id] = data
+        self._schedule_flush()
+
+    async def load_definition(self, survey_id: str) -> Optional[Dict[str, Any]]:
+        from easy_bot import get_db_pool, BOT_PREFIX
+
+        if survey_id in self._pending_definitions:
+            return json.loads(self._pending_definitions[survey_id])
+
+        try:
+            pool = await get_db_pool()
+            if not pool:
+                raise RuntimeError("пул соединений с БД недоступен")
+            async with pool.acquire() as conn:
+                await self._ensure_table(conn, f"{BOT_PREFIX}bot_user_state")
+                source = await conn.fetchval(
+                    f"SELECT source FROM {BOT_PREFIX}survey_definitions WHERE survey_id = $1",
+                    survey_id
+                )
+        except Exception as e:
+            logging.error(f"Ошибка при загрузке опроса {survey_id}: {e}")
+            return None
+        return json.loads(source) if source else None
+
+    def _schedule_flush(self) -> None:
+        """Запускает фоновую запись, если она еще не запланирована"""
+        if self._flush_task is None or self._flush_task.done():
+            try:
+                self._flush_task = asyncio.get_running_loop().create_task(self._flush_later())
+            except RuntimeError:
+                # Нет запущенного цикла событий - изменения будут записаны при следующем flush
+                pass
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_interval)
+        await self.flush()
+
+    async def flush(self) -> None:
+        """Записывает накопленные изменения в БД"""
+        from easy_bot import get_db_pool, BOT_PREFIX
+
+        async with self._flush_lock:
+            if not self._pending and not self._pending_definitions:
+                return
+            pending, self._pending = self._pending, {}
+            definitions, self._pending_definitions = self._pending_definitions, {}
+
+            pool = await get_db_pool()
+            if not pool:
+                logging.error("Не удалось получить пул соединений с БД для сессий опросов")
+                self._requeue(pending, definitions)
+                return
+
+            table = f"{BOT_PREFIX}bot_user_state"
+            users = f"{BOT_PREFIX}users"
+            try:
+                async with pool.acquire() as conn:
+                    await self._ensure_table(conn, table)
+                    if definitions:
+                        # Опрос записывается раньше сессий, которые на него ссылаются
+                        await conn.executemany(
+                            f"""
+                            INSERT INTO {BOT_PREFIX}survey_definitions (survey_id, source, updated_at)
+                            VALUES ($1, $2::jsonb, NOW())
+                            ON CONFLICT (survey_id) DO UPDATE
+                            SET source = EXCLUDED.source, updated_at = NOW()
+                            """,
+                            list(definitions.items())
+                        )
+                        definitions = {}
+                    for user_id, (operation, fields) in pending.items():
+                        session = self.peek(user_id)
+                        if operation == "delete" or session is None:
+                            await conn.execute(
+                                f"""
+                                DELETE FROM {table}
+                                WHERE user_id = (SELECT id FROM {users} WHERE user_id = $1)
+                                  AND bot_id = $2 AND state_name = $3
+                                """,
+                                user_id, BOT_ID, STATE_NAME
+                            )
+                        elif operation == "set":
+                            await conn.execute(
+                                f"""
+                                INSERT INTO {table} (user_id, bot_id, state_name, state_data, updated_at)
+                                SELECT id, $2, $3, $4::jsonb, NOW() FROM {users} WHERE user_id = $1
+                                ON CONFLICT (user_id, bot_id) DO UPDATE
+                                SET state_name = EXCLUDED.state_name,
+                                    state_data = EXCLUDED.state_data,
+                                    updated_at = NOW()
+                                """,
+                                user_id, BOT_ID, STATE_NAME, json.dumps(session.to_dict(), ensure_ascii=False, default=str)
+                            )
+                        else:
+                            # Обновляем только измененные поля, если сессию в БД не изменил другой процесс
+                            changes = {key: getattr(session, key) for key in fields}
+                            changes['version'] = session.version + 1
+                            updated = await conn.fetchval(
+                                f"""
+                                UPDATE {table}
+                                SET state_data = state_data || $4::jsonb,
+                                    updated_at = NOW()
+                                WHERE user_id = (SELECT id FROM {users} WHERE user_id = $1)
+                                  AND bot_id = $2 AND state_name = $3
+                                  AND COALESCE((state_data ->> 'version')::int, 0) = $5
+                                RETURNING 1
+                                """,
+                                user_id, BOT_ID, STATE_NAME, json.dumps(changes, ensure_ascii=False, default=str),
+                                session.version
+                            )
+                            if updated:
+                                session.version += 1
+                            else:
+                                await self._check_conflict(conn, table, users, user_id)
+
+                    if time.monotonic() - self._cleaned_at > CLEANUP_INTERVAL:
+                        self._cleaned_at = time.monotonic()
+                        await conn.execute(
+                            f"DELETE FROM {table} WHERE state_name = $1 AND updated_at < NOW() - make_interval(secs => $2)",
+                            STATE_NAME, float(self.ttl)
+                        )
+            except Exception as e:
+                logging.error(f"Ошибка при сохранении сессий опросов: {e}")
+                self._requeue(pending, definitions)
+
+    async def _check_conflict(self, conn, table: str, users: str, user_id: int) -> None:
+        """Сбрасывает сессию в памяти, если в БД ее изменил другой процесс"""
+        exists = await conn.fetchval(
+            f"""
+            SELECT 1 FROM {table}
+            WHERE user_id = (SELECT id FROM {users} WHERE user_id = $1)
+              AND bot_id = $2 AND state_name = $3
+            """,
+            user_id, BOT_ID, STATE_NAME
+        )
+        if exists and user_id not in self._pending:
+            logging.warning(f"Сессия опроса пользователя {user_id} изменена другим процессом, загружаем ее заново")
+            self._sessions.pop(user_id, None)
+            self._loaded_at.pop(user_id, None)
+
+    def _requeue(self, pending: Dict[int, Tuple[str, Optional[set]]], definitions: Dict[str, str]) -> None:
+        """Возвращает незаписанные изменения в очередь (новые изменения важнее)"""
+        for survey_id, data in definitions.items():
+            self._pending_definitions.setdefault(survey_id, data)
+        for user_id, (operation, fields) in pending.items():
+            if user_id not in self._pending:
+                self._pending[user_id] = (operation, fields)
+            elif self._pending[user_id][0] == "merge" and operation != "merge":
+                # Сессия после неудачной полной записи должна быть записана целиком
+                self._pending[user_id] = (operation, fields)
+            elif self._pending[user_id][0] == "merge":
+                self._pending[user_id] = ("merge", self._pending[user_id][1] | fields)
+
+    async def _load(self, user_id: int) -> Optional[SurveyProgress]:
+        """Загружает сессию пользователя из БД"""
+        from easy_bot import get_db_pool, BOT_PREFIX
+
+        pool = await get_db_pool()
+        if not pool:
+            raise RuntimeError("пул соединений с БД недоступен")
+
+        table = f"{BOT_PREFIX}bot_user_state"
+        async with pool.acquire() as conn:
+            await self._ensure_table(conn, table)
+            state = await conn.fetchval(
+                f"""
+                SELECT state_data FROM {table}
+                WHERE user_id = (SELECT id FROM {BOT_PREFIX}users WHERE user_id = $1)
+                  AND bot_id = $2 AND state_name = $3
+                  AND updated_at > NOW() - make_interval(secs => $4)
+                """,
+                user_id, BOT_ID, STATE_NAME, float(self.ttl)
+            )
+        return SurveyProgress.from_dict(json.loads(state)) if state else None
+
+    async def _ensure_table(self, conn, table: str) -> None:
+        """Создает таблицы состояний и опросов, если их еще нет (один раз за запуск)"""
+        if self._table_ready:
+            return
+        from easy_bot import BOT_PREFIX
+        await conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                id SERIAL PRIMARY KEY,
+                user_id INTEGER NOT NULL,
+                bot_id INTEGER NOT NULL,
+                state_name TEXT,
+                state_data JSONB,
+                created_at TIMESTAMP DEFAULT NOW(),
+                UNIQUE(user_id, bot_id)
+            )
+        """)
+        await conn.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP NOT NULL DEFAULT NOW()")
+        await conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {BOT_PREFIX}survey_definitions (
+                survey_id TEXT PRIMARY KEY,
+                source JSONB NOT NULL,
+                updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+            )
+        """)
+        self._table_ready = True
+
+    async def close(self) -> None:
+        """Останавливает фоновую запись и записывает оставшиеся изменения"""
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+        await self.flush()
+
+_store: Optional[MemorySurveySessionStore] = None
+
+def get_session_store() -> MemorySurveySessionStore:
+    """
+    Возвращает хранилище сессий опросов (создается при первом обращении).
+
+    Returns:
+        Хранилище, выбранное в SESSION_BACKEND
+    """
+    global _store
+    if _store is None:
+        if SESSION_BACKEND == "postgres":
+            _store = PostgresSurveySessionStore()
+        else:
+            _store = MemorySurveySessionStore()
+    return _store
+
+async def close_session_store(application=None) -> None:
+    """
+    Записывает несохраненные изменения сессий (вызывается при остановке бота).
+
+    Args:
+        application: Экземпляр приложения бота (не используется)
+    """
+    if _store is not None:
+        await _store.close()
@@ -0,0 +1,162 @@
+"""
+Метрики прохождения опросов.
+
+Счетчики начатых и завершенных опросов, ответов, ошибок проверки и
+исправлений ответов, а также гистограммы времени подготовки вопроса и
+времени, которое пользователь думал над ответом, по (survey_id, номер вопроса).
+Метрики публикуются в base.metrics (/metrics и HTTP-эндпоинт), сводка по
+опросам доступна администраторам командой /survey_stats.
+"""
+import time
+from typing import Any, Dict, List, Optional
+
+from .responses import record_response
+
+# Границы интервалов гистограмм (секунды)
+RENDER_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+THINK_BUCKETS = (1, 2, 5, 10, 20, 30, 60, 120, 300, 600, 1800, 3600)
+
+METRIC_DESCRIPTIONS = {
+    "survey_started_total": "Начатые опросы",
+    "survey_answered_total": "Принятые ответы на вопросы",
+    "survey_validation_errors_total": "Ответы, не прошедшие проверку",
+    "survey_edits_total": "Исправления ответов с экрана проверки",
+    "survey_completed_total": "Завершенные опросы",
+    "survey_render_seconds": "Время подготовки вопроса (перевод и клавиатура)",
+    "survey_think_seconds": "Время от отправки вопроса до ответа пользователя",
+}
+
+_described = False
+
+def _describe() -> None:
+    global _described
+    if _described:
+        return
+    from base.metrics import describe
+    for name, description in METRIC_DESCRIPTIONS.items():
+        describe(name, description)
+    _described = True
+
+def survey_started(survey_id: str) -> None:
+    """Учитывает начало опроса"""
+    from base.metrics import inc_counter
+    _describe()
+    inc_counter("survey_started_total", survey_id=survey_id)
+
+def question_rendered(survey_id: str, question_index: int, seconds: float) -> None:
+    """Учитывает время подготовки вопроса"""
+    from base.metrics import observe
+    _describe()
+    observe("survey_render_seconds", seconds, RENDER_BUCKETS, survey_id=survey_id, question=question_index)
+
+def question_answered(survey_id: str, question_index: int, asked_at: Optional[float] = None) -> None:
+    """
+    Учитывает принятый ответ на вопрос.
+
+    Args:
+        survey_id: Идентификатор опроса
+        question_index: Номер вопроса
+        asked_at: Время отправки вопроса (time.time()), если известно
+    """
+    from base.metrics import inc_counter, observe
+    _describe()
+    inc_counter("survey_answered_total", survey_id=survey_id, question=question_index)
+    if asked_at:
+        observe("survey_think_seconds", max(0.0, time.time() - asked_at), THINK_BUCKETS,
+                survey_id=survey_id, question=question_index)
+
+def validation_failed(survey_id: str, question_index: int) -> None:
+    """Учитывает ответ, не прошедший проверку"""
+    from base.metrics import inc_counter
+    _describe()
+    inc_counter("survey_validation_errors_total", survey_id=survey_id, question=question_index)
+
+def answer_edited(survey_id: str, question_index: int) -> None:
+    """Учитывает переход к исправлению ответа"""
+    from base.metrics import inc_counter
+    _describe()
+    inc_counter("survey_edits_total", survey_id=survey_id, question=question_index)
+
+def survey_completed(survey_id: str, user_id: int, answers: List[Any]) -> None:
+    """Учитывает завершение опроса и сохраняет ответы"""
+    from base.metrics import inc_counter
+    _describe()
+    record_response(survey_id, user_id, answers)
+    inc_counter("survey_completed_total", survey_id=survey_id)
+
+def _by_question(name: str, survey_id: str) -> Dict[int, float]:
+    from base.metrics import get_series
+    return {
+        int(labels["question"]): value
+        for labels, value in get_series(name)
+        if labels.get("survey_id") == survey_id and "question" in labels
+    }
+
+def get_counters(survey_id: str) -> Dict[str, Any]:
+    """
+    Возвращает счетчики опроса из base.metrics (с момента запуска бота).
+
+    Args:
+        survey_id: Идентификатор опроса
+
+    Returns:
+        Словарь: started, completed, answered (количество ответов по номерам вопросов)
+    """
+    from base.metrics import get_metric
+    answered = _by_question("survey_answered_total", survey_id)
+    return {
+        'started': int(get_metric("survey_started_total", survey_id=survey_id) or 0),
+        'completed': int(get_metric("survey_completed_total", survey_id=survey_id) or 0),
+        'answered': [int(answered.get(index, 0)) for index in range(max(answered, default=-1) + 1)],
+    }
+
+def _average(name: str, survey_id: str, question_index: int) -> Optional[float]:
+    from base.metrics import get_histogram
+    summary = get_histogram(name, survey_id=survey_id, question=question_index)
+    if not summary or not summary["count"]:
+        return None
+    return summary["sum"] / summary["count"]
+
+def render_survey_stats(survey_id: Optional[str] = None) -> str:
+    """
+    Формирует текстовую сводку метрик опросов с момента запуска бота.
+
+    Args:
+        survey_id: Идентификатор опроса (по умолчанию все опросы с метриками)
+
+    Returns:
+        Текст сводки: воронка по вопросам, ошибки проверки, исправления и время
+    """
+    from base.metrics import get_metric, get_series
+
+    if survey_id:
+        survey_ids = [survey_id]
+    else:
+        survey_ids = sorted({labels["survey_id"] for labels, _ in get_series("survey_started_total")})
+
+    blocks = []
+    for sid in survey_ids:
+        started = int(get_metric("survey_started_total", survey_id=sid) or 0)
+        completed = int(get_metric("survey_completed_total", survey_id=sid) or 0)
+        rate = f" ({completed / started:.0%})" if started else ""
+        lines = [f"Опрос {sid}: начато {started}, завершено {completed}{rate}"]
+
+        answered = _by_question("survey_answered_total", sid)
+        errors = _by_question("survey_validation_errors_total", sid)
+        edits = _by_question("survey_edits_total", sid)
+        for index in sorted(set(answered) | set(errors) | set(edits)):
+            line = f"  {index + 1}. ответов {int(answered.get(index, 0))}"
+            if errors.get(index):
+                line += f", ошибок {int(errors[index])}"
+            if edits.get(index):
+                line += f", исправлений {int(edits[index])}"
+            think = _average("survey_think_seconds", sid, index)
+            if think is not None:
+                line += f", ответ за {think:.1f} с"
+            render = _average("survey_render_seconds", sid, index)
+            if render is not None:
+                line += f", подготовка {render * 1000:.0f} мс"
+            lines.append(line)
+        blocks.append("\n".join(lines))
+
+    return "\n\n".join(blocks)
@@ -0,0 +1,339 @@
+"""
+Валидаторы ответов на вопросы опроса.
+
+Валидатор компилируется один раз при создании опроса: compile_validator
+возвращает функцию value -> проверенное значение, в которой регулярные
+выражения уже скомпилированы, а ключевые слова собраны в плоские словари.
+При ошибке валидатор выбрасывает ValidationError с текстом для пользователя.
+
+Собственные типы проверки регистрируются через register_validator:
+
+    def even_number(params):
+        def validate(value):
+            if not value.isdigit() or int(value) % 2:
+                raise ValidationError("Введите четное число")
+            return int(value)
+        return validate
+
+    register_validator("even", even_number, alias="четное")
+
+После этого в опросе можно использовать ["Вопрос", "четное"].
+"""
+import re
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional
+
+# Constants for validation types
+TYPE_TEXT = "text"
+TYPE_NUMBER = "number"
+TYPE_SYMBOLS = "symbols"
+TYPE_BUTTONS = "buttons"  # Новый тип для кнопок
+TYPE_DATE = "date"        # Тип для даты
+TYPE_DATETIME = "datetime"  # Тип для даты со временем
+TYPE_TIME = "time"        # Тип для времени
+TYPE_PHONE = "phone"      # Тип для телефона
+TYPE_URL = "url"          # Тип для ссылки
+TYPE_CONFIRM = "confirm"  # Тип для подтверждения
+TYPE_NAME = "name"        # Тип для ФИО
+
+# Мультиязычные ключевые слова для дат
+DATE_KEYWORDS = {
+    "сегодня": {"ru": "сегодня", "en": "today", "uk": "сьогодні", "zh": "今天", "es": "hoy", "fr": "aujourd'hui"},
+    "завтра": {"ru": "завтра", "en": "tomorrow", "uk": "завтра", "zh": "明天", "es": "mañana", "fr": "demain"},
+    "вчера": {"ru": "вчера", "en": "yesterday", "uk": "вчора", "zh": "昨天", "es": "ayer", "fr": "hier"}
+}
+
+# Мультиязычные ключевые слова для подтверждений
+CONFIRM_KEYWORDS = {
+    "да": {"ru": ["да", "конечно", "точно", "верно"],
+           "en": ["yes", "yeah", "sure", "true"],
+           "uk": ["так", "так-так", "звичайно"],
+           "zh": ["是的", "对", "当然"],
+           "es": ["sí", "claro", "por supuesto"],
+           "fr": ["oui", "bien sûr", "certainement"]},
+    "нет": {"ru": ["нет", "неа", "ни за что"],
+            "en": ["no", "nope", "false"],
+            "uk": ["ні", "не"],
+            "zh": ["不", "不是", "否"],
+            "es": ["no", "nunca"],
+            "fr": ["non", "pas"]}
+}
+
+# Смещение в днях для каждого ключевого слова даты на любом языке
+_DATE_KEYWORD_OFFSETS = {
+    word: offset
+    for keyword, offset in (("вчера", -1), ("завтра", 1), ("сегодня", 0))
+    for word in DATE_KEYWORDS[keyword].values()
+}
+
+# Ответ ("да"/"нет") для каждого ключевого слова подтверждения на любом языке
+# (положительные ответы проверяются первыми, поэтому заполняются последними)
+_CONFIRM_ANSWERS = {
+    word: answer
+    for answer in ("нет", "да")
+    for variants in CONFIRM_KEYWORDS[answer].values()
+    for word in variants
+}
+
+_DATE_RE = re.compile(r'^(\d{1,2})\.(\d{1,2})\.(\d{2})$')
+_TIME_RE = re.compile(r'^(\d{1,2}):(\d{2})$')
+_PHONE_STRIP_RE = re.compile(r'[^\d+]')
+_PHONE_RE = re.compile(r'^\+?\d{7,15}$')
+_URL_SCHEME_RE = re.compile(r'^https?://')
+_URL_RE = re.compile(r'^https?://[^\s]+$')
+_CYRILLIC_START_RE = re.compile(r'^[а-яё]')
+_CYRILLIC_NAME_RE = re.compile(r'^[А-ЯЁ][а-яё]+$')
+_NUMBER_RANGE_RE = re.compile(r'номер:(\d+)-(\d+)')
+
+_DAYS_IN_MONTH = (0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+class ValidationError(Exception):
+    """Exception raised when survey input validation fails."""
+    pass
+
+Validator = Callable[[str], Any]
+ValidatorFactory = Callable[[Optional[dict]], Validator]
+
+# Тип проверки -> фабрика валидатора (получает параметры, возвращает функцию проверки)
+_validators: Dict[str, ValidatorFactory] = {}
+
+# Название типа в описании опроса ("текст", "дата", ...) -> тип проверки
+_aliases: Dict[str, str] = {}
+
+# Скомпилированные валидаторы без параметров
+_compiled: Dict[str, Validator] = {}
+
+def register_validator(validation_type: str, factory: ValidatorFactory, alias: Optional[str] = None) -> None:
+    """
+    Регистрирует тип проверки ответа.
+
+    Args:
+        validation_type: Имя типа проверки
+        factory: Функция (параметры) -> функция проверки значения
+        alias: Название типа в описании опроса (например, "телефон")
+    """
+    _validators[validation_type] = factory
+    _compiled.pop(validation_type, None)
+    if alias:
+        _aliases[alias] = validation_type
+
+def compile_validator(validation_type: str, validation_params: Optional[dict] = None) -> Validator:
+    """
+    Возвращает функцию проверки ответа для типа и параметров.
+
+    Args:
+        validation_type: Тип проверки
+        validation_params: Параметры проверки
+
+    Returns:
+        Функция value -> проверенное значение (выбрасывает ValidationError)
+    """
+    factory = _validators.get(validation_type)
+    if factory is None:
+        # Неизвестный тип принимает любое значение
+        return _accept
+    if validation_params is not None:
+        return factory(validation_params)
+
+    validator = _compiled.get(validation_type)
+    if validator is None:
+        validator = _compiled[validation_type] = factory(None)
+    return validator
+
+def parse_validation(validation_str) -> tuple:
+    """
+    Parses the validation string to determine type and parameters.
+
+    Args:
+        validation_str: String specifying validation (e.g. "текст", "номер:3-100")
+        or a list of button options
+
+    Returns:
+        Tuple of (validation_type, params_dict)
+    """
+    # Если передан список - значит это кнопки
+    if isinstance(validation_str, list):
+        return TYPE_BUTTONS, {'buttons': validation_str}
+
+    validation_type = _aliases.get(validation_str)
+    if validation_type is not None:
+        return validation_type, None
+
+    if validation_str.startswith("номер"):
+        # Parse number range
+        range_match = _NUMBER_RANGE_RE.match(validation_str)
+        if range_match:
+            min_val = int(range_match.group(1))
+            max_val = int(range_match.group(2))
+            return TYPE_NUMBER, {'min': min_val, 'max': max_val}
+
+    # Default to text if no valid format is found
+    return TYPE_TEXT, None
+
+def _accept(value: str) -> str:
+    """Принимает любое значение"""
+    return value
+
+def _parse_date_keyword(text: str) -> Optional[datetime]:
+    """Преобразует ключевое слово даты (в нижнем регистре) в объект datetime"""
+    offset = _DATE_KEYWORD_OFFSETS.get(text)
+    if offset is None:
+        return None
+    return datetime.now() + timedelta(days=offset)
+
+def _check_date(date_match) -> datetime:
+    """Проверяет день, месяц и двузначный год из совпадения _DATE_RE"""
+    day, month, year = map(int, date_match.groups())
+
+    # Проверяем диапазоны значений
+    if day < 1 or day > 31:
+        raise ValidationError("День должен быть в диапазоне от 1 до 31")
+
+    if month < 1 or month > 12:
+        raise ValidationError("Месяц должен быть в диапазоне от 1 до 12")
+
+    # Корректируем год если задан двузначным числом
+    full_year = 2000 + year if year < 50 else 1900 + year
+
+    # Проверяем, что день не превышает количество дней в месяце (с учетом високосного февраля)
+    days = _DAYS_IN_MONTH[month]
+    if month == 2 and ((full_year % 400 == 0) or (full_year % 100 != 0 and full_year % 4 == 0)):
+        days = 29
+    if day > days:
+        raise ValidationError(f"Некорректная дата: в месяце {month} только {days} дней")
+
+    try:
+        return datetime(full_year, month, day)
+    except ValueError:
+        raise ValidationError("Пожалуйста, введите корректную дату")
+
+def _check_time(text: str) -> tuple:
+    """Проверяет время в формате ЧЧ:ММ и возвращает (часы, минуты)"""
+    time_match = _TIME_RE.match(text)
+    if not time_match:
+        raise ValidationError("Пожалуйста, введите время в формате ЧЧ:ММ")
+
+    hour, minute = map(int, time_match.groups())
+    if hour > 23 or minute > 59:
+        raise ValidationError("Пожалуйста, введите корректное время")
+    return hour, minute
+
+def _number_validator(params: Optional[dict]) -> Validator:
+    params = params or {}
+    min_val = params.get('min', float('-inf'))
+    max_val = params.get('max', float('inf'))
+    range_error = f"Введите число от {min_val} до {max_val}"
+
+    def validate(value: str):
+        try:
+            num_value = float(value)
+        except ValueError:
+            raise ValidationError("Пожалуйста, введите корректное число")
+
+        if num_value < min_val or num_value > max_val:
+            raise ValidationError(range_error)
+
+        # Return integer if the number is whole
+        if num_value.is_integer():
+            return int(num_value)
+        return num_value
+    return validate
+
+def _date_validator(params: Optional[dict]) -> Validator:
+    def validate(value: str):
+        # Проверяем на ключевые слова
+        date_value = _parse_date_keyword(value.lower())
+        if date_value:
+            return date_value.strftime("%d.%m.%y")
+
+        # Проверяем формат даты
+        date_match = _DATE_RE.match(value)
+        if not date_match:
+            raise ValidationError("Пожалуйста, введите дату в формате ДД.ММ.ГГ (двузначный год)")
+
+        _check_date(date_match)
+        return value  # Возвращаем оригинальное значение, так как оно прошло все проверки
+    return validate
+
+def _datetime_validator(params: Optional[dict]) -> Validator:
+    def validate(value: str):
+        parts = value.lower().split()
+        if not parts:
+            raise ValidationError("Пожалуйста, введите дату в формате ДД.ММ.ГГ ЧЧ:ММ (двузначный год)")
+        date_part = parts[0]
+        time_part = parts[1] if len(parts) > 1 else "00:00"
+
+        # Обрабатываем дату: ключевое слово или ДД.ММ.ГГ
+        date_value = _parse_date_keyword(date_part)
+        if date_value is None:
+            date_match = _DATE_RE.match(date_part)
+            if not date_match:
+                raise ValidationError("Пожалуйста, введите дату в формате ДД.ММ.ГГ ЧЧ:ММ (двузначный год)")
+            date_value = _check_date(date_match)
+
+        # Добавляем время и приводим ответ к формату ДД.ММ.ГГ ЧЧ:ММ
+        hour, minute = _check_time(time_part)
+        return date_value.replace(hour=hour, minute=minute).strftime("%d.%m.%y %H:%M")
+    return validate
+
+def _time_validator(params: Optional[dict]) -> Validator:
+    def validate(value: str):
+        _check_time(value)
+        return value
+    return validate
+
+def _phone_validator(params: Optional[dict]) -> Validator:
+    def validate(value: str):
+        # Номер без лишних символов должен содержать от 7 до 15 цифр
+        if not _PHONE_RE.match(_PHONE_STRIP_RE.sub('', value)):
+            raise ValidationError("Пожалуйста, введите корректный номер телефона")
+        return value
+    return validate
+
+def _url_validator(params: Optional[dict]) -> Validator:
+    def validate(value: str):
+        if not _URL_SCHEME_RE.match(value):
+            raise ValidationError("URL должен начинаться с http:// или https://")
+        if not _URL_RE.match(value):
+            raise ValidationError("Пожалуйста, введите корректный URL")
+        return value
+    return validate
+
+def _confirm_validator(params: Optional[dict]) -> Validator:
+    def validate(value: str):
+        answer = _CONFIRM_ANSWERS.get(value.lower())
+        if answer is None:
+            raise ValidationError("Пожалуйста, ответьте 'да' или 'нет'")
+        return answer
+    return validate
+
+def _name_validator(params: Optional[dict]) -> Validator:
+    def validate(value: str):
+        words = value.strip().split()
+
+        # Проверяем что есть хотя бы два слова
+        if len(words) < 2:
+            raise ValidationError("Пожалуйста, введите фамилию и имя")
+
+        # Для кириллицы каждое слово должно начинаться с заглавной буквы
+        if any(_CYRILLIC_START_RE.match(word.lower()) for word in words):
+            if not all(_CYRILLIC_NAME_RE.match(word) for word in words):
+                raise ValidationError("Имя и фамилия должны начинаться с заглавной буквы")
+
+        return value
+    return validate
+
+def _accept_validator(params: Optional[dict]) -> Validator:
+    return _accept
+
+register_validator(TYPE_TEXT, _accept_validator, alias="текст")
+register_validator(TYPE_SYMBOLS, _accept_validator, alias="символы")
+register_validator(TYPE_BUTTONS, _accept_validator)
+register_validator(TYPE_NUMBER, _number_validator)
+register_validator(TYPE_DATE, _date_validator, alias="дата")
+register_validator(TYPE_DATETIME, _datetime_validator, alias="дата+время")
+register_validator(TYPE_TIME, _time_validator, alias="время")
+register_validator(TYPE_PHONE, _phone_validator, alias="телефон")
+register_validator(TYPE_URL, _url_validator, alias="ссылка")
+register_validator(TYPE_CONFIRM, _confirm_validator, alias="подтверждение")
+register_validator(TYPE_NAME, _name_validator, alias="фио")
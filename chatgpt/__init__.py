@@ -1,3 +1,4 @@
 from .chatgpt_integration import chatgpt
+from .request_manager import REQUEST_MODE_CANCEL, REQUEST_MODE_QUEUE
 
-__all__ = ['chatgpt'] 
\ No newline at end of file
+__all__ = ['chatgpt', 'REQUEST_MODE_CANCEL', 'REQUEST_MODE_QUEUE'] 
\ No newline at end of file
@@ -1,21 +1,50 @@
 import os
 import asyncio
 import aiohttp
+import codecs
 import json
 import logging
 import re
+from collections import OrderedDict, deque
 from functools import wraps
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator
 from datetime import datetime
 
+from chatgpt.context import CONTEXT_TOKEN_BUDGET, build_context, get_summary, schedule_summary_refresh
+from chatgpt.response_cache import make_cache_key, get_cached_response, store_response
+from chatgpt.request_manager import ChatRequestManager
+from chatgpt.resilience import BackendUnavailableError, RetryableResponseError, RETRYABLE_STATUSES, get_backend, parse_retry_after
+
 # Настройки API ChatGPT
 DEFAULT_MODEL = "gpt-3.5-turbo-0125"
 DEFAULT_TEMPERATURE = 0.7
 DEFAULT_MAX_TOKENS = 1000
 
+# Таймауты запросов к API (генерация ответа может занимать десятки секунд)
+API_TIMEOUT = aiohttp.ClientTimeout(total=60, connect=10)
+
+# Потоковый ответ: ограничиваем время ожидания каждого фрагмента, а не всей генерации
+STREAM_TIMEOUT = aiohttp.ClientTimeout(total=300, connect=10, sock_read=60)
+
+OPENAI_CHAT_URL = "https://api.openai.com/v1/chat/completions"
+
+# Сообщение пользователю, когда API ChatGPT временно отключен после серии ошибок
+CHATGPT_UNAVAILABLE_TEXT = "Сервис ChatGPT временно недоступен. Пожалуйста, попробуйте позже."
+
+# Настройки потоковой отправки ответа в Telegram
+STREAM_EDIT_INTERVAL = 1.0      # Минимальный интервал между редактированиями сообщения (секунды)
+STREAM_EDIT_MIN_CHARS = 40      # Минимальный прирост текста для очередного редактирования
+STREAM_CURSOR = " ▌"            # Признак того, что ответ еще генерируется
+TELEGRAM_MESSAGE_LIMIT = 4096   # Максимальная длина сообщения Telegram
+
+# История диалогов
+HISTORY_LIMIT = 20            # Количество последних сообщений, передаваемых модели
+HISTORY_CACHE_USERS = 10000   # Количество пользователей, чья история хранится в памяти
+
 # Глобальные переменные
 _api_key = None
 _api_url = None
+_history_cache: "OrderedDict[int, deque]" = OrderedDict()  # Telegram ID -> последние сообщения
 
 def load_api_key():
     """Загружает API ключ или URL для локального API."""
@@ -72,64 +101,211 @@ def load_api_key():
     logging.warning("API ключ/URL не найден. Некоторые функции будут недоступны.")
     return False
 
-async def get_user_messages_history(user_id: int, limit: int = 20) -> List[Dict[str, Any]]:
+def _cache_history(user_id: int, messages: List[Dict[str, Any]]) -> deque:
+    """
+    Сохраняет историю пользователя в кэше, вытесняя давно неактивных пользователей.
+    
+    Args:
+        user_id: Telegram ID пользователя
+        messages: Сообщения в хронологическом порядке
+        
+    Returns:
+        Кольцевой буфер с историей пользователя
+    """
+    history = deque(messages, maxlen=HISTORY_LIMIT)
+    _history_cache[user_id] = history
+    _history_cache.move_to_end(user_id)
+    while len(_history_cache) > HISTORY_CACHE_USERS:
+        _history_cache.popitem(last=False)
+    return history
+
+def record_message(user_id: int, role: str, content: str) -> None:
     """
-    Получает историю сообщений пользователя из базы данных.
+    Добавляет сообщение в кэш истории пользователя.
+    Если история пользователя еще не загружена, она будет прочитана из БД при следующем запросе.
     
     Args:
-        user_id: ID пользователя
+        user_id: Telegram ID пользователя
+        role: "user" или "assistant"
+        content: Текст сообщения
+    """
+    history = _history_cache.get(user_id)
+    if history is not None:
+        history.append({"role": role, "content": content})
+        _history_cache.move_to_end(user_id)
+
+async def _load_history_from_db(user_id: int, limit: int) -> Optional[List[Dict[str, Any]]]:
+    """
+    Загружает последние сообщения пользователя из БД.
+    
+    Args:
+        user_id: Telegram ID пользователя
         limit: Максимальное количество сообщений
         
     Returns:
-        Список сообщений пользователя
+        Сообщения в хронологическом порядке или None в случае ошибки
     """
-    try:
-        from easy_bot import get_db_connection
+    from easy_bot import get_db_pool, BOT_PREFIX
+    
+    pool = await get_db_pool()
+    if not pool:
+        logging.error("Не удалось получить пул соединений с БД для истории сообщений")
+        return None
+    
+    # messages.user_id ссылается на users.id, выборка идет по индексу (user_id, created_at)
+    query = f"""
+        SELECT 
+            message_text, 
+            is_bot_message
+        FROM 
+            {BOT_PREFIX}messages 
+        WHERE 
+            user_id = (SELECT id FROM {BOT_PREFIX}users WHERE user_id = $1)
+        ORDER BY 
+            created_at DESC
+        LIMIT $2
+    """
+    
+    async with pool.acquire() as conn:
+        records = await conn.fetch(query, user_id, limit)
+    
+    # Формируем список сообщений в хронологическом порядке (сначала старые)
+    return [
+        {
+            "role": "assistant" if record["is_bot_message"] else "user",
+            "content": record["message_text"]
+        }
+        for record in reversed(records)
+    ]
+
+async def get_user_messages_history(user_id: int, limit: int = HISTORY_LIMIT) -> List[Dict[str, Any]]:
+    """
+    Получает историю сообщений пользователя.
+    История активных диалогов хранится в памяти, БД читается только при первом обращении.
+    
+    Args:
+        user_id: Telegram ID пользователя
+        limit: Максимальное количество сообщений
         
-        conn = await get_db_connection()
-        if not conn:
-            logging.error("Не удалось получить соединение с БД для истории сообщений")
+    Returns:
+        Список сообщений пользователя
+    """
+    history = _history_cache.get(user_id)
+    if history is None:
+        try:
+            messages = await _load_history_from_db(user_id, HISTORY_LIMIT)
+        except Exception as e:
+            logging.error(f"Ошибка при получении истории сообщений: {e}")
             return []
+        if messages is None:
+            return []
+        history = _cache_history(user_id, messages)
+    else:
+        _history_cache.move_to_end(user_id)
+    
+    messages = list(history)
+    return messages[-limit:] if limit < len(messages) else messages
+
+def _parse_local_api_response(response_text: str) -> str:
+    """
+    Извлекает текст ответа из ответа локального API.
+    
+    Args:
+        response_text: Тело ответа (JSON или обычный текст)
         
-        # Получаем историю сообщений пользователя
-        query = """
-            SELECT 
-                message_text, 
-                is_bot_message,
-                created_at
-            FROM 
-                tgbot_messages 
-            WHERE 
-                user_id = $1
-            ORDER BY 
-                created_at DESC
-            LIMIT $2
-        """
-        
-        records = await conn.fetch(query, user_id, limit)
-        await conn.close()
+    Returns:
+        Текст ответа
+    """
+    try:
+        # Пробуем распарсить JSON
+        result = json.loads(response_text)
         
-        # Формируем список сообщений в хронологическом порядке (сначала старые)
-        messages = []
-        for record in reversed(records):
-            role = "assistant" if record["is_bot_message"] else "user"
-            messages.append({
-                "role": role,
-                "content": record["message_text"]
-            })
+        # Если ответ - это словарь
+        if isinstance(result, dict):
+            # Проверяем разные варианты полей
+            if "output" in result:
+                # Декодируем юникод если нужно
+                return decode_unicode_string(result["output"])
+            elif "response" in result:
+                return decode_unicode_string(result["response"])
+            elif "text" in result:
+                return decode_unicode_string(result["text"])
+            elif "content" in result:
+                return decode_unicode_string(result["content"])
+            elif "translated_text" in result:
+                return decode_unicode_string(result["translated_text"])
+            elif "translation" in result:
+                return decode_unicode_string(result["translation"])
+            elif "success" in result and "output" in result:
+                return decode_unicode_string(result["output"])
+            else:
+                # Если нет известных полей, возвращаем весь JSON в виде строки
+                # Пробуем найти любое текстовое поле
+                for key, value in result.items():
+                    if isinstance(value, str) and len(value) > 5:
+                        return decode_unicode_string(value)
+                return decode_unicode_string(str(result))
+        elif isinstance(result, str):
+            return decode_unicode_string(result)
+        else:
+            return decode_unicode_string(str(result))
+    except json.JSONDecodeError:
+        # Если не удалось распарсить JSON, возвращаем текст как есть
+        return decode_unicode_string(response_text)
+
+def _local_api_payload(messages: List[Dict[str, str]], language: str) -> Dict[str, Any]:
+    """
+    Формирует тело запроса к локальному API.
+    
+    Args:
+        messages: Список сообщений для контекста
+        language: Язык ответа
         
-        return messages
-    except Exception as e:
-        logging.error(f"Ошибка при получении истории сообщений: {e}")
-        return []
+    Returns:
+        Словарь с параметрами запроса
+    """
+    # Получаем последнее сообщение пользователя (или пустую строку)
+    user_message = next((msg["content"] for msg in reversed(messages) if msg["role"] == "user"), "")
+    
+    # Получаем системное сообщение (инструкцию)
+    system_message = next((msg["content"] for msg in messages if msg["role"] == "system"), "")
+    
+    return {
+        "text": user_message,
+        "language": language,
+        "prompt": system_message
+    }
+
+def _local_api_endpoint() -> str:
+    """Возвращает адрес метода локального API"""
+    # Если URL заканчивается на /chatgpt_translate
+    endpoint = _api_url
+    if not endpoint.endswith("/chatgpt_translate"):
+        endpoint = f"{endpoint}/chatgpt_translate"
+    return endpoint
+
+def _response_cache_key(messages: List[Dict[str, str]], model: str, temperature: float,
+                        language: str, cacheable: bool) -> Optional[str]:
+    """
+    Возвращает ключ кэша ответа или None, если запрос не кэшируется.
+    Запросы, помеченные cacheable, кэшируются без учета истории диалога.
+    Детерминированные запросы (temperature == 0) кэшируются с учетом истории.
+    """
+    if cacheable:
+        return make_cache_key(model, messages, language)
+    if temperature == 0:
+        return make_cache_key(model, messages, language, include_history=True)
+    return None
 
 async def call_openai_api(messages: List[Dict[str, str]], 
                         model: str = DEFAULT_MODEL,
                         temperature: float = DEFAULT_TEMPERATURE,
                         max_tokens: int = DEFAULT_MAX_TOKENS,
-                        language: str = "ru") -> Optional[str]:
+                        language: str = "ru",
+                        cacheable: bool = False) -> Optional[str]:
     """
     Вызывает API OpenAI или локальный API для получения ответа от модели.
+    Ответы на повторяющиеся запросы берутся из кэша (при temperature == 0 или cacheable=True).
     
     Args:
         messages: Список сообщений для контекста
@@ -137,179 +313,413 @@ async def call_openai_api(messages: List[Dict[str, str]],
         temperature: Температура генерации
         max_tokens: Максимальное количество токенов
         language: Язык ответа
+        cacheable: Кэшировать ответ по инструкции и вопросу, без учета истории
+                   (для вопросов, ответ на которые одинаков для всех пользователей)
         
     Returns:
         Текст ответа или None в случае ошибки
     """
+    cache_key = _response_cache_key(messages, model, temperature, language, cacheable)
+    if cache_key:
+        cached = await get_cached_response(cache_key)
+        if cached is not None:
+            return cached
+    
+    response = await _request_completion(messages, model, temperature, max_tokens, language)
+    
+    if cache_key and response:
+        await store_response(cache_key, response)
+    return response
+
+def _backend_name() -> str:
+    """Возвращает имя используемого бэкенда: локальный API или OpenAI"""
+    return "local" if _api_url else "openai"
+
+def is_chatgpt_available() -> bool:
+    """Проверяет, принимает ли API ChatGPT запросы (не отключен ли после серии ошибок)"""
+    return get_backend(_backend_name()).breaker.is_available()
+
+async def _request_completion(messages: List[Dict[str, str]],
+                              model: str,
+                              temperature: float,
+                              max_tokens: int,
+                              language: str) -> Optional[str]:
+    """
+    Выполняет запрос к API OpenAI или локальному API (без кэша).
+    Запрос ограничен по параллельности, повторяется при 429/5xx и не выполняется,
+    пока бэкенд отключен выключателем (см. chatgpt.resilience).
+    """
     if not _api_key and not _api_url:
         if not load_api_key():
             logging.error("API ключ/URL не найден. Невозможно выполнить запрос.")
             return None
     
+    backend = get_backend(_backend_name())
+    try:
+        return await backend.call(lambda: _post_completion(messages, model, temperature, max_tokens, language))
+    except BackendUnavailableError as e:
+        logging.error(f"API ChatGPT недоступен: {e}")
+        return None
+    except Exception as e:
+        logging.error(f"Ошибка при вызове API ChatGPT: {e}")
+        return None
+
+async def _post_completion(messages: List[Dict[str, str]],
+                           model: str,
+                           temperature: float,
+                           max_tokens: int,
+                           language: str) -> Optional[str]:
+    """
+    Выполняет одну попытку запроса к API.
+    
+    Raises:
+        RetryableResponseError: API ответил 429 или 5xx
+    """
+    from base.http_client import get_http_session
+    
+    session = await get_http_session()
+    
     # Если используем локальный API
     if _api_url:
-        try:
-            # Получаем последнее сообщение пользователя (или пустую строку)
-            user_message = next((msg["content"] for msg in reversed(messages) if msg["role"] == "user"), "")
-            
-            # Получаем системное сообщение (инструкцию)
-            system_message = next((msg["content"] for msg in messages if msg["role"] == "system"), "")
-            
-            # Настраиваем запрос к локальному API
-            data = {
-                "text": user_message,
-                "language": language,
-                "prompt": system_message
-            }
-            
-            headers = {
-                "Content-Type": "application/json"
-            }
+        # Настраиваем запрос к локальному API
+        data = _local_api_payload(messages, language)
+        
+        headers = {
+            "Content-Type": "application/json"
+        }
+        
+        async with session.post(_local_api_endpoint(), 
+                              headers=headers, 
+                              json=data,
+                              timeout=API_TIMEOUT) as response:
+            if response.status != 200:
+                error_text = await response.text()
+                if response.status in RETRYABLE_STATUSES:
+                    raise RetryableResponseError(response.status, parse_retry_after(response.headers.get("Retry-After")), error_text)
+                logging.error(f"Ошибка локального API ({response.status}): {error_text}")
+                return None
             
-            # Если URL заканчивается на /chatgpt_translate
-            endpoint = _api_url
-            if not endpoint.endswith("/chatgpt_translate"):
-                endpoint = f"{endpoint}/chatgpt_translate"
+            # Получаем ответ
+            response_text = await response.text()
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(endpoint, 
-                                      headers=headers, 
-                                      json=data) as response:
-                    if response.status != 200:
-                        error_text = await response.text()
-                        logging.error(f"Ошибка локального API ({response.status}): {error_text}")
-                        return None
-                    
-                    # Получаем ответ
-                    response_text = await response.text()
-                    
-                    try:
-                        # Пробуем распарсить JSON
-                        result = json.loads(response_text)
-                        
-                        # Если ответ - это словарь
-                        if isinstance(result, dict):
-                            # Проверяем разные варианты полей
-                            if "output" in result:
-                                # Декодируем юникод если нужно
-                                return decode_unicode_string(result["output"])
-                            elif "response" in result:
-                                return decode_unicode_string(result["response"])
-                            elif "text" in result:
-                                return decode_unicode_string(result["text"])
-                            elif "content" in result:
-                                return decode_unicode_string(result["content"])
-                            elif "translated_text" in result:
-                                return decode_unicode_string(result["translated_text"])
-                            elif "translation" in result:
-                                return decode_unicode_string(result["translation"])
-                            elif "success" in result and "output" in result:
-                                return decode_unicode_string(result["output"])
-                            else:
-                                # Если нет известных полей, возвращаем весь JSON в виде строки
-                                # Пробуем найти любое текстовое поле
-                                for key, value in result.items():
-                                    if isinstance(value, str) and len(value) > 5:
-                                        return decode_unicode_string(value)
-                                return decode_unicode_string(str(result))
-                        elif isinstance(result, str):
-                            return decode_unicode_string(result)
-                        else:
-                            return decode_unicode_string(str(result))
-                    except json.JSONDecodeError:
-                        # Если не удалось распарсить JSON, возвращаем текст как есть
-                        return decode_unicode_string(response_text)
-                        
-        except Exception as e:
-            logging.error(f"Ошибка при вызове локального API: {e}")
-            return None
+            return _parse_local_api_response(response_text)
     
     # Если используем официальный API OpenAI
-    else:
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {_api_key}"
-        }
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {_api_key}"
+    }
+    
+    data = {
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+        "max_tokens": max_tokens
+    }
+    
+    async with session.post(OPENAI_CHAT_URL, 
+                          headers=headers, 
+                          json=data,
+                          timeout=API_TIMEOUT) as response:
+        if response.status != 200:
+            error_text = await response.text()
+            if response.status in RETRYABLE_STATUSES:
+                raise RetryableResponseError(response.status, parse_retry_after(response.headers.get("Retry-After")), error_text)
+            logging.error(f"Ошибка API OpenAI ({response.status}): {error_text}")
+            return None
         
-        data = {
-            "model": model,
-            "messages": messages,
-            "temperature": temperature,
-            "max_tokens": max_tokens
-        }
+        result = await response.json()
+        return result["choices"][0]["message"]["content"]
+
+async def stream_openai_api(messages: List[Dict[str, str]],
+                          model: str = DEFAULT_MODEL,
+                          temperature: float = DEFAULT_TEMPERATURE,
+                          max_tokens: int = DEFAULT_MAX_TOKENS,
+                          language: str = "ru",
+                          cacheable: bool = False) -> AsyncIterator[str]:
+    """
+    Потоково получает ответ модели: возвращает фрагменты текста по мере генерации.
+    Для OpenAI используются server-sent events (stream: true), для локального API -
+    chunked-ответ. Если локальный API вернул обычный JSON, ответ отдается одним фрагментом.
+    Ответ из кэша (см. call_openai_api) отдается одним фрагментом.
+    
+    Args:
+        messages: Список сообщений для контекста
+        model: Название модели OpenAI
+        temperature: Температура генерации
+        max_tokens: Максимальное количество токенов
+        language: Язык ответа
+        cacheable: Кэшировать ответ по инструкции и вопросу, без учета истории
+        
+    Yields:
+        Фрагменты текста ответа
+    """
+    cache_key = _response_cache_key(messages, model, temperature, language, cacheable)
+    if cache_key:
+        cached = await get_cached_response(cache_key)
+        if cached is not None:
+            yield cached
+            return
+    
+    chunks = []
+    completed = False
+    stream = _stream_completion(messages, model, temperature, max_tokens, language)
+    try:
+        async for chunk in stream:
+            chunks.append(chunk)
+            yield chunk
+        completed = True
+    except Exception:
+        # Ошибка уже записана в лог, пользователь получит уже сгенерированную часть ответа
+        pass
+    finally:
+        await stream.aclose()
+    
+    # В кэш попадает только полностью полученный ответ
+    if cache_key and completed and chunks:
+        await store_response(cache_key, "".join(chunks))
+
+async def _stream_completion(messages: List[Dict[str, str]],
+                             model: str,
+                             temperature: float,
+                             max_tokens: int,
+                             language: str) -> AsyncIterator[str]:
+    """
+    Потоково выполняет запрос к API OpenAI или локальному API (без кэша).
+    Запрос занимает место в очереди бэкенда и учитывается выключателем;
+    повтор не выполняется, так как часть ответа уже может быть показана.
+    """
+    if not _api_key and not _api_url:
+        if not load_api_key():
+            logging.error("API ключ/URL не найден. Невозможно выполнить запрос.")
+            return
+    
+    backend = get_backend(_backend_name())
+    try:
+        await backend.hold()
+    except BackendUnavailableError as e:
+        logging.error(f"API ChatGPT недоступен: {e}")
+        raise
+    
+    success = False
+    stream = _stream_response(messages, model, temperature, max_tokens, language)
+    try:
+        async for chunk in stream:
+            yield chunk
+        success = True
+    finally:
+        await stream.aclose()
+        backend.finish(success)
+
+async def _stream_response(messages: List[Dict[str, str]],
+                           model: str,
+                           temperature: float,
+                           max_tokens: int,
+                           language: str) -> AsyncIterator[str]:
+    """
+    Читает потоковый ответ API.
+    
+    Raises:
+        RetryableResponseError: API ответил 429 или 5xx
+    """
+    from base.http_client import get_http_session
+    
+    # Если используем локальный API
+    if _api_url:
+        data = _local_api_payload(messages, language)
+        data["stream"] = True
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post("https://api.openai.com/v1/chat/completions", 
-                                      headers=headers, 
-                                      json=data) as response:
-                    if response.status != 200:
-                        error_text = await response.text()
-                        logging.error(f"Ошибка API OpenAI ({response.status}): {error_text}")
-                        return None
-                    
-                    result = await response.json()
-                    return result["choices"][0]["message"]["content"]
+            session = await get_http_session()
+            async with session.post(_local_api_endpoint(),
+                                  headers={"Content-Type": "application/json"},
+                                  json=data,
+                                  timeout=STREAM_TIMEOUT) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    logging.error(f"Ошибка локального API ({response.status}): {error_text}")
+                    if response.status in RETRYABLE_STATUSES:
+                        raise RetryableResponseError(response.status, parse_retry_after(response.headers.get("Retry-After")), error_text)
+                    return
+                
+                # Локальный API не поддерживает потоковый режим - отдаем ответ целиком
+                if "application/json" in response.headers.get("Content-Type", ""):
+                    yield _parse_local_api_response(await response.text())
+                    return
+                
+                # Фрагменты могут разрезать многобайтовые символы UTF-8
+                decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+                async for chunk in response.content.iter_any():
+                    text = decoder.decode(chunk)
+                    if text:
+                        yield text
+                tail = decoder.decode(b"", final=True)
+                if tail:
+                    yield tail
         except Exception as e:
-            logging.error(f"Ошибка при вызове API OpenAI: {e}")
-            return None
+            logging.error(f"Ошибка при потоковом вызове локального API: {e}")
+            raise
+        return
+    
+    # Если используем официальный API OpenAI
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {_api_key}"
+    }
+    
+    data = {
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+        "stream": True
+    }
+    
+    try:
+        session = await get_http_session()
+        async with session.post(OPENAI_CHAT_URL,
+                              headers=headers,
+                              json=data,
+                              timeout=STREAM_TIMEOUT) as response:
+            if response.status != 200:
+                error_text = await response.text()
+                logging.error(f"Ошибка API OpenAI ({response.status}): {error_text}")
+                if response.status in RETRYABLE_STATUSES:
+                    raise RetryableResponseError(response.status, parse_retry_after(response.headers.get("Retry-After")), error_text)
+                return
+            
+            # Каждое событие - строка вида "data: {...}", поток завершается "data: [DONE]"
+            async for raw_line in response.content:
+                line = raw_line.decode("utf-8").strip()
+                if not line.startswith("data:"):
+                    continue
+                
+                payload = line[len("data:"):].strip()
+                if payload == "[DONE]":
+                    break
+                
+                try:
+                    event = json.loads(payload)
+                except json.JSONDecodeError:
+                    continue
+                
+                choices = event.get("choices") or []
+                if choices:
+                    delta = (choices[0].get("delta") or {}).get("content")
+                    if delta:
+                        yield delta
+    except Exception as e:
+        logging.error(f"Ошибка при потоковом вызове API OpenAI: {e}")
+        raise
 
-def chatgpt(instruction: str):
+async def stream_response_to_chat(bot, chat_id: int, chunks: AsyncIterator[str], message=None) -> str:
+    """
+    Выводит потоковый ответ в чат, постепенно редактируя сообщение.
+    Редактирования ограничены по частоте (STREAM_EDIT_INTERVAL, STREAM_EDIT_MIN_CHARS),
+    чтобы не превышать лимиты Telegram. Первый фрагмент показывается сразу.
+    Текст длиннее лимита Telegram продолжается в новом сообщении.
+    
+    Args:
+        bot: Экземпляр бота
+        chat_id: ID чата
+        chunks: Асинхронный итератор фрагментов текста
+        message: Сообщение, которое нужно заменить ответом (например, сообщение об обработке).
+                 Если не указано, ответ отправляется новым сообщением.
+        
+    Returns:
+        Полный текст ответа (пустая строка, если ответ не получен)
+    """
+    from telegram.error import BadRequest, RetryAfter
+    from base.delivery import retry_delay
+    
+    loop = asyncio.get_running_loop()
+    text = ""
+    offset = 0      # Начало текущего сообщения в полном тексте
+    shown = ""      # Текст, показанный в текущем сообщении
+    next_edit = 0.0  # Время, раньше которого сообщение не редактируется
+    
+    async def show(part: str, final: bool = False) -> None:
+        nonlocal message, shown, next_edit
+        display = part if final else part + STREAM_CURSOR
+        while True:
+            try:
+                if message is None:
+                    message = await bot.send_message(chat_id=chat_id, text=display)
+                else:
+                    await bot.edit_message_text(chat_id=chat_id, message_id=message.message_id, text=display)
+                break
+            except RetryAfter as e:
+                delay = retry_delay(e, 1)
+                if not final:
+                    # Промежуточное редактирование пропускаем, итоговое - повторяем
+                    next_edit = loop.time() + delay
+                    return
+                await asyncio.sleep(delay)
+            except BadRequest as e:
+                if "not modified" not in str(e).lower():
+                    raise
+                break
+        shown = part
+        next_edit = loop.time() + STREAM_EDIT_INTERVAL
+    
+    try:
+        async for chunk in chunks:
+            text += chunk
+            
+            # Заполненное сообщение фиксируем и продолжаем ответ в новом
+            while len(text) - offset > TELEGRAM_MESSAGE_LIMIT - len(STREAM_CURSOR):
+                part = text[offset:offset + TELEGRAM_MESSAGE_LIMIT]
+                await show(part, final=True)
+                offset += len(part)
+                message = None
+                shown = ""
+            
+            current = text[offset:]
+            if not current.strip() or loop.time() < next_edit:
+                continue
+            if shown and len(current) - len(shown) < STREAM_EDIT_MIN_CHARS:
+                continue
+            await show(current)
+    finally:
+        if hasattr(chunks, "aclose"):
+            await chunks.aclose()
+    
+    # Итоговое редактирование: полный текст без признака генерации
+    current = text[offset:]
+    if current.strip():
+        await show(current, final=True)
+    
+    return text
+
+def chatgpt(instruction: str, stream: bool = False, summarize: bool = False,
+            token_budget: int = CONTEXT_TOKEN_BUDGET, cache: bool = False,
+            request_mode: Optional[str] = None):
     """
     Декоратор для интеграции с ChatGPT.
     
     Args:
         instruction: Инструкция для модели ChatGPT
+        stream: Выводить ответ по мере генерации, редактируя сообщение об обработке запроса
+        summarize: Заменять не поместившуюся в контекст часть диалога кратким содержанием
+        token_budget: Бюджет токенов на контекст запроса (инструкция и история)
+        cache: Кэшировать ответы по инструкции, вопросу и языку (для справочных вопросов,
+               ответ на которые не зависит от пользователя и истории диалога)
+        request_mode: Что делать с сообщением, пришедшим во время ответа:
+                      REQUEST_MODE_CANCEL - отменить текущий запрос и ответить на все сообщения сразу,
+                      REQUEST_MODE_QUEUE - дождаться ответа и отправить сообщения одним запросом.
+                      По умолчанию используется REQUEST_MODE из chatgpt.request_manager.
     
     Returns:
         Декоратор для функции
     """
     def decorator(func):
-        @wraps(func)
-        async def wrapper(message_text, *args, **kwargs):
-            from easy_bot import current_update, current_context, auto_write_translated_message
-            
-            if not current_update or not current_context:
-                logging.error("Невозможно получить контекст для ChatGPT")
-                return func(message_text, *args, **kwargs)
+        async def process(message_parts, payload):
+            """Отвечает на накопленные сообщения пользователя (выполняется менеджером запросов чата)"""
+            current_update, current_context, args, kwargs = payload
+            message_text = "\n".join(message_parts)
             
-            # Защита от бесконечной рекурсии и обработки системных сообщений
-            # Проверяем сообщение на признаки системного сообщения
-            is_system_message = False
-            
-            # Проверка на сообщения от бота
-            if current_update.message and current_update.message.from_user:
-                is_system_message = current_update.message.from_user.is_bot
-            
-            # Проверка на отсутствие сообщения или текста
-            if not current_update.message or not current_update.message.text:
-                is_system_message = True
-                
-            # Проверка на системные фразы
-            system_phrases = [
-                "обрабатываю запрос", 
-                "⏳",
-                "выберите язык", 
-                "выберите действие", 
-                "спросить chatgpt",
-                "тестим..."
-            ]
-            
-            message_lower = message_text.lower() if isinstance(message_text, str) else ""
-            if any(phrase in message_lower for phrase in system_phrases):
-                is_system_message = True
-            
-            # Если это системное сообщение, прекращаем обработку
-            if is_system_message:
-                logging.info(f"ChatGPT: пропускаем системное сообщение: '{message_text[:30]}...'")
-                return func(message_text, *args, **kwargs)
-            
-            # Защита от рекурсии через флаг обработки
+            # Флаг обработки (в чате одновременно выполняется не больше одного запроса)
             if hasattr(current_context, 'user_data'):
-                if 'chatgpt_in_progress' in current_context.user_data and current_context.user_data['chatgpt_in_progress']:
-                    logging.warning("Обнаружен рекурсивный вызов ChatGPT. Пропускаем.")
-                    return func(message_text, *args, **kwargs)
-                # Устанавливаем флаг обработки
                 current_context.user_data['chatgpt_in_progress'] = True
             
             user_id = current_update.effective_user.id
@@ -320,6 +730,22 @@ def chatgpt(instruction: str):
             if hasattr(current_context, 'user_data') and 'language' in current_context.user_data:
                 user_language = current_context.user_data['language']
             
+            # API отключен после серии ошибок - сразу сообщаем об этом, не ставя запрос в очередь
+            if not is_chatgpt_available():
+                try:
+                    from language.translate_any_message import translate_any_message
+                    unavailable_text = await translate_any_message(CHATGPT_UNAVAILABLE_TEXT, user_language)
+                    await current_context.bot.send_message(
+                        chat_id=chat_id,
+                        text=unavailable_text if unavailable_text else CHATGPT_UNAVAILABLE_TEXT
+                    )
+                except Exception as e:
+                    logging.error(f"Ошибка при отправке сообщения о недоступности ChatGPT: {e}")
+                finally:
+                    if hasattr(current_context, 'user_data'):
+                        current_context.user_data['chatgpt_in_progress'] = False
+                return func(message_text, *args, **kwargs)
+            
             # Для ChatGPT ВСЕГДА показываем сообщение об обработке запроса
             # так как запрос всегда отправляется на сервер
             processing_message = None
@@ -366,26 +792,59 @@ def chatgpt(instruction: str):
                     """
                 }
                 
-                # Добавляем текущее сообщение пользователя
+                # Добавляем текущее сообщение пользователя (несколько сообщений подряд объединяются)
                 user_message = {
                     "role": "user",
                     "content": message_text
                 }
                 
-                # Создаем сообщения для API
-                messages = [system_message] + message_history + [user_message]
+                # Сообщения пользователя уже могут быть в истории (их сохраняет easy_bot до вызова обработчика)
+                parts = [{"role": "user", "content": part} for part in message_parts]
+                known = next(
+                    (count for count in range(len(parts), 0, -1) if message_history[-count:] == parts[:count]),
+                    0
+                )
+                for part in message_parts[known:]:
+                    record_message(user_id, "user", part)
+                if known:
+                    message_history = message_history[:-known]
+                message_history.append(user_message)
                 
-                # Вызываем API ChatGPT или локальный API
-                response = await call_openai_api(messages, language=user_language)
+                # Создаем сообщения для API: история от новых к старым в пределах бюджета токенов
+                messages, dropped = build_context(
+                    system_message,
+                    message_history,
+                    token_budget=token_budget,
+                    summary=get_summary(user_id) if summarize else None
+                )
+                if summarize:
+                    schedule_summary_refresh(user_id, dropped, user_language)
+                
+                if stream:
+                    # Выводим ответ по мере генерации в сообщение об обработке запроса
+                    processing_message = getattr(current_context, '_chatgpt_processing_message', None)
+                    response = await stream_response_to_chat(
+                        current_context.bot,
+                        chat_id,
+                        stream_openai_api(messages, language=user_language, cacheable=cache),
+                        message=processing_message
+                    )
+                    if response and processing_message is not None:
+                        # Сообщение об обработке стало ответом - удалять его не нужно
+                        delattr(current_context, '_chatgpt_processing_message')
+                else:
+                    # Вызываем API ChatGPT или локальный API
+                    response = await call_openai_api(messages, language=user_language, cacheable=cache)
                 
                 # Отправляем ответ пользователю
                 result_message = None
                 if response:
-                    # Отправляем ответ пользователю
-                    result_message = await current_context.bot.send_message(
-                        chat_id=chat_id,
-                        text=response
-                    )
+                    # В потоковом режиме ответ уже выведен
+                    if not stream:
+                        result_message = await current_context.bot.send_message(
+                            chat_id=chat_id,
+                            text=response
+                        )
                     
                     # Добавляем сообщение бота в БД
                     try:
@@ -412,6 +871,18 @@ def chatgpt(instruction: str):
                         delattr(current_context, '_chatgpt_processing_message')
                     except Exception as e:
                         logging.error(f"Ошибка при удалении сообщения об обработке: {e}")
+            except asyncio.CancelledError:
+                # Запрос заменен более новым: убираем сообщение об обработке, ответ придет в новом запросе
+                if hasattr(current_context, '_chatgpt_processing_message'):
+                    try:
+                        await current_context.bot.delete_message(
+                            chat_id=chat_id,
+                            message_id=current_context._chatgpt_processing_message.message_id
+                        )
+                    except Exception as e:
+                        logging.error(f"Ошибка при удалении сообщения об обработке: {e}")
+                    delattr(current_context, '_chatgpt_processing_message')
+                raise
             except Exception as e:
                 logging.error(f"Ошибка при выполнении запроса к ChatGPT: {e}")
                 error_message = await current_context.bot.send_message(
@@ -438,7 +909,55 @@ def chatgpt(instruction: str):
                 if hasattr(current_context, 'user_data'):
                     current_context.user_data['chatgpt_in_progress'] = False
             
-            return func(message_text, *args, **kwargs)
+            func(message_text, *args, **kwargs)
+        
+        manager = ChatRequestManager(process, mode=request_mode)
+        
+        @wraps(func)
+        async def wrapper(message_text, *args, **kwargs):
+            from easy_bot import current_update, current_context
+            
+            if not current_update or not current_context:
+                logging.error("Невозможно получить контекст для ChatGPT")
+                return func(message_text, *args, **kwargs)
+            
+            # Защита от бесконечной рекурсии и обработки системных сообщений
+            # Проверяем сообщение на признаки системного сообщения
+            is_system_message = False
+            
+            # Проверка на сообщения от бота
+            if current_update.message and current_update.message.from_user:
+                is_system_message = current_update.message.from_user.is_bot
+            
+            # Проверка на отсутствие сообщения или текста
+            if not current_update.message or not current_update.message.text:
+                is_system_message = True
+                
+            # Проверка на системные фразы
+            system_phrases = [
+                "обрабатываю запрос", 
+                "⏳",
+                "выберите язык", 
+                "выберите действие", 
+                "спросить chatgpt",
+                "тестим..."
+            ]
+            
+            message_lower = message_text.lower() if isinstance(message_text, str) else ""
+            if any(phrase in message_lower for phrase in system_phrases):
+                is_system_message = True
+            
+            # Если это системное сообщение, прекращаем обработку
+            if is_system_message:
+                logging.info(f"ChatGPT: пропускаем системное сообщение: '{message_text[:30]}...'")
+                return func(message_text, *args, **kwargs)
+            
+            # Запрос выполняется в фоне, чтобы следующие сообщения чата могли его отменить или дополнить
+            manager.submit(
+                current_update.effective_chat.id,
+                message_text,
+                (current_update, current_context, args, kwargs)
+            )
         
         # Регистрируем обработчик в easy_bot
         try:
@@ -455,45 +974,46 @@ def chatgpt(instruction: str):
 
 async def add_message_to_db(user_id: int, message_text: str, is_bot: bool = False):
     """
-    Добавляет сообщение в базу данных.
+    Добавляет сообщение в историю диалога (кэш) и в базу данных.
     
     Args:
-        user_id: ID пользователя
+        user_id: Telegram ID пользователя
         message_text: Текст сообщения
         is_bot: Является ли сообщение от бота
     """
+    record_message(user_id, "assistant" if is_bot else "user", message_text)
+    
     try:
-        from easy_bot import get_db_connection
+        from easy_bot import get_db_pool, BOT_PREFIX
         
-        conn = await get_db_connection()
-        if not conn:
-            logging.error("Не удалось получить соединение с БД для добавления сообщения")
+        pool = await get_db_pool()
+        if not pool:
+            logging.error("Не удалось получить пул соединений с БД для добавления сообщения")
             return
         
-        # Получаем ID пользователя в БД
-        db_user_id = await conn.fetchval(
-            "SELECT id FROM tgbot_users WHERE user_id = $1",
-            user_id
-        )
-        
-        if not db_user_id:
-            # Создаем запись о пользователе, если еще не существует
+        async with pool.acquire() as conn:
+            # Получаем ID пользователя в БД
             db_user_id = await conn.fetchval(
-                "INSERT INTO tgbot_users (user_id, created_at) VALUES ($1, $2) RETURNING id",
-                user_id, datetime.now()
+                f"SELECT id FROM {BOT_PREFIX}users WHERE user_id = $1",
+                user_id
+            )
+            
+            if not db_user_id:
+                # Создаем запись о пользователе, если еще не существует (в личном чате chat_id совпадает с user_id)
+                db_user_id = await conn.fetchval(
+                    f"INSERT INTO {BOT_PREFIX}users (user_id, chat_id, created_at) VALUES ($1, $1, $2) RETURNING id",
+                    user_id, datetime.now()
+                )
+            
+            # Добавляем сообщение
+            await conn.execute(
+                f"""
+                INSERT INTO {BOT_PREFIX}messages 
+                (user_id, message_text, is_bot_message, created_at) 
+                VALUES ($1, $2, $3, $4)
+                """,
+                db_user_id, message_text, is_bot, datetime.now()
             )
-        
-        # Добавляем сообщение
-        await conn.execute(
-            """
-            INSERT INTO tgbot_messages 
-            (user_id, message_text, is_bot_message, created_at) 
-            VALUES ($1, $2, $3, $4)
-            """,
-            db_user_id, message_text, is_bot, datetime.now()
-        )
-        
-        await conn.close()
     except Exception as e:
         logging.error(f"Ошибка при добавлении сообщения в БД: {e}")
         # Не выбрасываем исключение дальше, чтобы не прерывать обработку сообщения
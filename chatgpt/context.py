@@ -0,0 +1,209 @@
+"""
+Сборка контекста запроса к ChatGPT с ограничением по количеству токенов.
+
+История заполняется от новых сообщений к старым, пока помещается в бюджет.
+Вытесненные старые сообщения могут заменяться кратким содержанием диалога,
+которое обновляется в фоне и не задерживает ответ.
+"""
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Бюджет токенов на контекст запроса (инструкция, краткое содержание, история)
+CONTEXT_TOKEN_BUDGET = 3000
+
+# Служебные токены, которые модель добавляет к каждому сообщению
+MESSAGE_TOKEN_OVERHEAD = 4
+
+# Приблизительное количество символов на токен, если tiktoken не установлен
+CHARS_PER_TOKEN = 4
+
+# Бюджет токенов на краткое содержание диалога
+SUMMARY_MAX_TOKENS = 300
+
+# Количество новых вытесненных сообщений, после которого краткое содержание обновляется
+SUMMARY_MIN_NEW_MESSAGES = 6
+
+SUMMARY_INSTRUCTION = (
+    "Кратко перескажи диалог пользователя с ассистентом: факты о пользователе, "
+    "его вопросы и договоренности. Не более 5 предложений."
+)
+
+_encodings = {}
+_summaries: Dict[int, str] = {}  # Telegram ID -> краткое содержание старой части диалога
+_summarized_until: Dict[int, Dict[str, Any]] = {}  # Telegram ID -> последнее учтенное в содержании сообщение
+_summary_tasks: Dict[int, asyncio.Task] = {}
+
+def _get_encoding(model: str):
+    """Возвращает токенизатор tiktoken для модели (кэшируется)"""
+    if tiktoken is None:
+        return None
+    if model not in _encodings:
+        try:
+            _encodings[model] = tiktoken.encoding_for_model(model)
+        except KeyError:
+            _encodings[model] = tiktoken.get_encoding("cl100k_base")
+    return _encodings[model]
+
+def count_tokens(text: str, model: str = "gpt-3.5-turbo") -> int:
+    """
+    Считает количество токенов в тексте.
+    Использует tiktoken, если он установлен, иначе - оценку по длине текста.
+
+    Args:
+        text: Текст
+        model: Название модели (определяет токенизатор)
+
+    Returns:
+        int: Количество токенов
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding(model)
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def count_message_tokens(message: Dict[str, Any], model: str = "gpt-3.5-turbo") -> int:
+    """
+    Считает количество токенов в сообщении с учетом служебных токенов.
+
+    Args:
+        message: Сообщение вида {"role": ..., "content": ...}
+        model: Название модели
+
+    Returns:
+        int: Количество токенов
+    """
+    return count_tokens(message.get("content") or "", model) + MESSAGE_TOKEN_OVERHEAD
+
+def build_context(system_message: Dict[str, Any],
+                  history: List[Dict[str, Any]],
+                  token_budget: int = CONTEXT_TOKEN_BUDGET,
+                  summary: Optional[str] = None,
+                  model: str = "gpt-3.5-turbo") -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Собирает сообщения для запроса к модели в пределах бюджета токенов.
+    Последнее сообщение истории (текущий запрос пользователя) включается всегда.
+
+    Args:
+        system_message: Системное сообщение с инструкцией
+        history: История диалога в хронологическом порядке
+        token_budget: Бюджет токенов на весь контекст
+        summary: Краткое содержание старой части диалога (если есть)
+        model: Название модели
+
+    Returns:
+        Tuple: (сообщения для запроса, вытесненные из контекста сообщения)
+    """
+    used = count_message_tokens(system_message, model)
+
+    summary_message = None
+    if summary:
+        summary_message = {
+            "role": "system",
+            "content": f"Краткое содержание предыдущего диалога: {summary}"
+        }
+        summary_tokens = count_message_tokens(summary_message, model)
+        if used + summary_tokens <= token_budget:
+            used += summary_tokens
+        else:
+            summary_message = None
+
+    # Заполняем контекст от новых сообщений к старым
+    selected = []
+    index = len(history)
+    while index > 0:
+        message = history[index - 1]
+        tokens = count_message_tokens(message, model)
+        if selected and used + tokens > token_budget:
+            break
+        selected.append(message)
+        used += tokens
+        index -= 1
+    selected.reverse()
+
+    messages = [system_message]
+    if summary_message:
+        messages.append(summary_message)
+    messages.extend(selected)
+    return messages, history[:index]
+
+def get_summary(user_id: int) -> Optional[str]:
+    """
+    Возвращает сохраненное краткое содержание диалога пользователя.
+
+    Args:
+        user_id: Telegram ID пользователя
+
+    Returns:
+        Краткое содержание или None
+    """
+    return _summaries.get(user_id)
+
+def schedule_summary_refresh(user_id: int, dropped: List[Dict[str, Any]], language: str = "ru") -> None:
+    """
+    Запускает фоновое обновление краткого содержания диалога.
+    Новое содержание объединяет предыдущее и вытесненные из контекста сообщения,
+    которые еще не были учтены. Обновление выполняется, когда таких сообщений
+    накопилось не меньше SUMMARY_MIN_NEW_MESSAGES, и не чаще одного раза одновременно.
+
+    Args:
+        user_id: Telegram ID пользователя
+        dropped: Сообщения, не поместившиеся в контекст
+        language: Язык пользователя
+    """
+    if not dropped:
+        return
+
+    task = _summary_tasks.get(user_id)
+    if task is not None and not task.done():
+        return
+
+    # Оставляем только сообщения после последнего учтенного
+    marker = _summarized_until.get(user_id)
+    new_messages = dropped
+    if marker is not None:
+        for index in range(len(dropped) - 1, -1, -1):
+            if dropped[index] == marker:
+                new_messages = dropped[index + 1:]
+                break
+
+    if len(new_messages) < SUMMARY_MIN_NEW_MESSAGES:
+        return
+
+    _summary_tasks[user_id] = asyncio.create_task(_refresh_summary(user_id, list(new_messages), language))
+
+async def _refresh_summary(user_id: int, dropped: List[Dict[str, Any]], language: str) -> None:
+    """Пересчитывает краткое содержание диалога пользователя"""
+    from chatgpt.chatgpt_integration import call_openai_api
+
+    try:
+        lines = []
+        previous = _summaries.get(user_id)
+        if previous:
+            lines.append(f"Ранее: {previous}")
+        for message in dropped:
+            author = "Ассистент" if message["role"] == "assistant" else "Пользователь"
+            lines.append(f"{author}: {message['content']}")
+
+        summary = await call_openai_api(
+            [
+                {"role": "system", "content": SUMMARY_INSTRUCTION},
+                {"role": "user", "content": "\n".join(lines)}
+            ],
+            max_tokens=SUMMARY_MAX_TOKENS,
+            language=language
+        )
+        if summary:
+            _summaries[user_id] = summary
+            _summarized_until[user_id] = dropped[-1]
+    except Exception as e:
+        logging.error(f"Ошибка при обновлении краткого содержания диалога: {e}")
+    finally:
+        _summary_tasks.pop(user_id, None)
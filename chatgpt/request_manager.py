@@ -0,0 +1,105 @@
+"""
+Управление запросами к ChatGPT в пределах одного чата.
+
+В каждом чате одновременно выполняется не больше одного запроса. Сообщения,
+пришедшие во время его выполнения, не теряются:
+- в режиме REQUEST_MODE_CANCEL выполняющийся запрос отменяется (вместе с вызовом API),
+  а все неотвеченные сообщения объединяются в один новый запрос;
+- в режиме REQUEST_MODE_QUEUE выполняющийся запрос завершается, после чего
+  накопленные сообщения отправляются одним дополнительным запросом.
+Новый запрос запускается после паузы DEBOUNCE_DELAY, чтобы собрать сообщения,
+отправленные подряд.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+REQUEST_MODE_CANCEL = "cancel"  # Новое сообщение отменяет текущий запрос
+REQUEST_MODE_QUEUE = "queue"    # Новое сообщение ждет завершения текущего запроса
+
+# Режим по умолчанию для бота
+REQUEST_MODE = REQUEST_MODE_CANCEL
+
+# Пауза перед повторным запросом для сбора сообщений, отправленных подряд (секунды)
+DEBOUNCE_DELAY = 1.0
+
+class ChatRequestManager:
+    """Очередь запросов к ChatGPT по чатам"""
+
+    def __init__(self,
+                 process: Callable[[List[str], Any], Awaitable[None]],
+                 mode: Optional[str] = None,
+                 debounce: float = DEBOUNCE_DELAY):
+        """
+        Args:
+            process: Корутина обработки запроса: (сообщения пользователя, данные последнего сообщения)
+            mode: REQUEST_MODE_CANCEL или REQUEST_MODE_QUEUE (по умолчанию REQUEST_MODE)
+            debounce: Пауза перед повторным запросом (секунды)
+        """
+        self.process = process
+        self.mode = mode or REQUEST_MODE
+        self.debounce = debounce
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self._pending: Dict[int, List[str]] = {}
+        self._payloads: Dict[int, Any] = {}
+
+    def submit(self, chat_id: int, text: str, payload: Any = None) -> None:
+        """
+        Добавляет сообщение пользователя и запускает или перезапускает обработку чата.
+
+        Args:
+            chat_id: ID чата
+            text: Текст сообщения
+            payload: Данные, передаваемые в process (например, update и context последнего сообщения)
+        """
+        self._pending.setdefault(chat_id, []).append(text)
+        self._payloads[chat_id] = payload
+
+        task = self._tasks.get(chat_id)
+        if task is None or task.done():
+            self._tasks[chat_id] = asyncio.create_task(self._run(chat_id, delay=0))
+            return
+
+        if self.mode == REQUEST_MODE_CANCEL:
+            # Текущий ответ уже не нужен: отменяем его и отвечаем на все сообщения сразу
+            logging.info(f"ChatGPT: новое сообщение в чате {chat_id}, текущий запрос отменен")
+            task.cancel()
+            self._tasks[chat_id] = asyncio.create_task(self._run(chat_id, delay=self.debounce, previous=task))
+        # В режиме очереди сообщение будет обработано после завершения текущего запроса
+
+    def is_busy(self, chat_id: int) -> bool:
+        """Проверяет, выполняется ли запрос в чате"""
+        task = self._tasks.get(chat_id)
+        return task is not None and not task.done()
+
+    async def _run(self, chat_id: int, delay: float, previous: Optional[asyncio.Task] = None) -> None:
+        """Обрабатывает неотвеченные сообщения чата, пока они есть"""
+        try:
+            if previous is not None:
+                # Дожидаемся завершения отмененного запроса (освобождение соединения, очистка)
+                await asyncio.gather(previous, return_exceptions=True)
+
+            while True:
+                if delay:
+                    await asyncio.sleep(delay)
+
+                texts = list(self._pending.get(chat_id) or [])
+                if not texts:
+                    break
+
+                await self.process(texts, self._payloads.get(chat_id))
+
+                # Сообщения обработаны - убираем их, оставляя пришедшие за время запроса
+                del self._pending[chat_id][:len(texts)]
+                if not self._pending[chat_id]:
+                    break
+                delay = self.debounce
+        except Exception as e:
+            logging.error(f"Ошибка при обработке запроса ChatGPT в чате {chat_id}: {e}")
+            self._pending.pop(chat_id, None)
+        finally:
+            if self._tasks.get(chat_id) is asyncio.current_task():
+                del self._tasks[chat_id]
+                if not self._pending.get(chat_id):
+                    self._pending.pop(chat_id, None)
+                    self._payloads.pop(chat_id, None)
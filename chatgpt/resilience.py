@@ -0,0 +1,274 @@
+"""
+Защита вызовов LLM от перегрузки и сбоев внешнего API.
+
+Для каждого бэкенда (OpenAI, локальный API):
+- ограничение числа одновременных запросов (семафор), остальные ждут в очереди;
+- повтор при 429/5xx и сетевых ошибках с экспоненциальной задержкой и случайным
+  разбросом, с учетом заголовка Retry-After;
+- общий срок выполнения запроса, включая ожидание в очереди и повторы;
+- автоматический выключатель: после серии неудачных запросов бэкенд считается
+  недоступным и запросы сразу отклоняются, пока не пройдет RESET_TIMEOUT.
+
+Глубина очереди, число выполняемых запросов и состояние выключателя
+публикуются в base.metrics.
+"""
+import asyncio
+import logging
+import random
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+import aiohttp
+
+# Максимальное число одновременных запросов к бэкенду
+MAX_CONCURRENT_REQUESTS = {
+    "openai": 10,
+    "local": 5,
+}
+DEFAULT_MAX_CONCURRENT_REQUESTS = 5
+
+# Повторы запросов
+RETRY_ATTEMPTS = 3         # Всего попыток
+RETRY_BASE_DELAY = 1.0     # Базовая задержка (секунды), удваивается с каждой попыткой
+RETRY_MAX_DELAY = 20.0     # Максимальная задержка (секунды)
+
+# Общий срок выполнения запроса, включая очередь и повторы (секунды)
+REQUEST_DEADLINE = 90.0
+
+# Автоматический выключатель
+FAILURE_THRESHOLD = 5      # Неудачных запросов подряд до отключения бэкенда
+RESET_TIMEOUT = 30.0       # Время до пробного запроса после отключения (секунды)
+
+# HTTP-статусы, при которых запрос повторяется
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+# Состояния выключателя
+BREAKER_CLOSED = "closed"        # Бэкенд работает
+BREAKER_OPEN = "open"            # Бэкенд отключен, запросы отклоняются
+BREAKER_HALF_OPEN = "half_open"  # Выполняется пробный запрос
+
+_BREAKER_STATE_VALUES = {BREAKER_CLOSED: 0, BREAKER_HALF_OPEN: 1, BREAKER_OPEN: 2}
+
+class BackendUnavailableError(Exception):
+    """Бэкенд отключен выключателем или не ответил в отведенный срок"""
+
+class RetryableResponseError(Exception):
+    """Ответ API, после которого запрос можно повторить (429, 5xx)"""
+
+    def __init__(self, status: int, retry_after: Optional[float] = None, message: str = ""):
+        super().__init__(f"HTTP {status}: {message}")
+        self.status = status
+        self.retry_after = retry_after
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Разбирает заголовок Retry-After (число секунд).
+
+    Args:
+        value: Значение заголовка
+
+    Returns:
+        Задержка в секундах или None
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """
+    Возвращает задержку перед повтором: Retry-After или экспоненциальная задержка
+    со случайным разбросом (full jitter).
+
+    Args:
+        attempt: Номер неудачной попытки (начиная с 1)
+        retry_after: Задержка, запрошенная сервером
+
+    Returns:
+        float: Задержка в секундах
+    """
+    if retry_after is not None:
+        return min(retry_after, RETRY_MAX_DELAY)
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempt - 1)))
+
+class CircuitBreaker:
+    """Автоматический выключатель для бэкенда"""
+
+    def __init__(self, name: str, failure_threshold: int = FAILURE_THRESHOLD, reset_timeout: float = RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = BREAKER_CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+
+    def allow_request(self) -> bool:
+        """Проверяет, можно ли выполнить запрос (после RESET_TIMEOUT пропускает один пробный)"""
+        if self.state == BREAKER_CLOSED:
+            return True
+        if self.state == BREAKER_OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self._set_state(BREAKER_HALF_OPEN)
+            return True
+        return False
+
+    def is_available(self) -> bool:
+        """Проверяет, принимает ли бэкенд запросы, не изменяя состояние"""
+        if self.state == BREAKER_OPEN:
+            return time.monotonic() - self.opened_at >= self.reset_timeout
+        return True
+
+    def record_success(self) -> None:
+        """Отмечает успешный запрос"""
+        self.failures = 0
+        if self.state != BREAKER_CLOSED:
+            logging.info(f"LLM-бэкенд {self.name} снова доступен")
+            self._set_state(BREAKER_CLOSED)
+
+    def record_failure(self) -> None:
+        """Отмечает неудачный запрос и отключает бэкенд при превышении порога"""
+        self.failures += 1
+        if self.state == BREAKER_HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != BREAKER_OPEN:
+                logging.warning(f"LLM-бэкенд {self.name} отключен после {self.failures} ошибок подряд")
+            self.opened_at = time.monotonic()
+            self._set_state(BREAKER_OPEN)
+
+    def _set_state(self, state: str) -> None:
+        from base.metrics import set_gauge
+        self.state = state
+        set_gauge("chatgpt_breaker_state", _BREAKER_STATE_VALUES[state], backend=self.name)
+
+class LLMBackend:
+    """Ограничение параллельности, повторы и выключатель для одного бэкенда"""
+
+    def __init__(self, name: str, max_concurrent: int):
+        self.name = name
+        self.semaphore = asyncio.BoundedSemaphore(max_concurrent)
+        self.breaker = CircuitBreaker(name)
+        self.waiting = 0
+        self.in_flight = 0
+
+    def _publish(self) -> None:
+        from base.metrics import set_gauge
+        set_gauge("chatgpt_queue_depth", self.waiting, backend=self.name)
+        set_gauge("chatgpt_in_flight", self.in_flight, backend=self.name)
+
+    async def _acquire(self, deadline: float) -> None:
+        """Занимает место в семафоре до истечения срока запроса"""
+        self.waiting += 1
+        self._publish()
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), timeout=max(0.0, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            raise BackendUnavailableError(f"Очередь к {self.name} не освободилась в срок")
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        self._publish()
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        self.semaphore.release()
+        self._publish()
+
+    def check_available(self) -> None:
+        """Отклоняет запрос, если бэкенд отключен выключателем"""
+        if not self.breaker.allow_request():
+            from base.metrics import inc_counter
+            inc_counter("chatgpt_requests_total", backend=self.name, result="rejected")
+            raise BackendUnavailableError(f"LLM-бэкенд {self.name} временно недоступен")
+
+    async def call(self, request: Callable[[], Awaitable], deadline: float = REQUEST_DEADLINE):
+        """
+        Выполняет запрос с ограничением параллельности, повторами и сроком.
+
+        Args:
+            request: Функция без аргументов, возвращающая корутину запроса.
+                     Для повтора она должна выбрасывать RetryableResponseError,
+                     aiohttp.ClientError или asyncio.TimeoutError.
+            deadline: Срок выполнения запроса (секунды)
+
+        Returns:
+            Результат запроса
+
+        Raises:
+            BackendUnavailableError: Бэкенд отключен или срок истек
+        """
+        from base.metrics import inc_counter
+
+        self.check_available()
+        expires_at = time.monotonic() + deadline
+
+        await self._acquire(expires_at)
+        try:
+            attempt = 0
+            while True:
+                attempt += 1
+                remaining = expires_at - time.monotonic()
+                try:
+                    if remaining <= 0:
+                        raise asyncio.TimeoutError()
+                    result = await asyncio.wait_for(request(), timeout=remaining)
+                    self.breaker.record_success()
+                    inc_counter("chatgpt_requests_total", backend=self.name, result="success")
+                    return result
+                except (RetryableResponseError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    retry_after = getattr(e, "retry_after", None)
+                    delay = backoff_delay(attempt, retry_after)
+                    if attempt >= RETRY_ATTEMPTS or time.monotonic() + delay >= expires_at:
+                        self.breaker.record_failure()
+                        inc_counter("chatgpt_requests_total", backend=self.name, result="failure")
+                        raise BackendUnavailableError(f"Запрос к {self.name} не выполнен: {e!r}") from e
+                    logging.warning(f"Попытка {attempt}/{RETRY_ATTEMPTS} запроса к {self.name} не удалась ({e!r}), повтор через {delay:.1f} с")
+                    inc_counter("chatgpt_retries_total", backend=self.name)
+                    await asyncio.sleep(delay)
+        finally:
+            self._release()
+
+    async def hold(self, deadline: float = REQUEST_DEADLINE):
+        """
+        Занимает место для потокового запроса (без повторов).
+        После завершения нужно вызвать finish().
+
+        Args:
+            deadline: Срок ожидания в очереди (секунды)
+
+        Raises:
+            BackendUnavailableError: Бэкенд отключен или очередь не освободилась в срок
+        """
+        self.check_available()
+        await self._acquire(time.monotonic() + deadline)
+
+    def finish(self, success: bool) -> None:
+        """
+        Освобождает место потокового запроса и учитывает его результат.
+
+        Args:
+            success: Успешно ли выполнен запрос
+        """
+        from base.metrics import inc_counter
+
+        self._release()
+        if success:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+        inc_counter("chatgpt_requests_total", backend=self.name, result="success" if success else "failure")
+
+_backends: Dict[str, LLMBackend] = {}
+
+def get_backend(name: str) -> LLMBackend:
+    """
+    Возвращает защищенный бэкенд по имени (создается при первом обращении).
+
+    Args:
+        name: Имя бэкенда ("openai" или "local")
+
+    Returns:
+        LLMBackend: Бэкенд
+    """
+    if name not in _backends:
+        _backends[name] = LLMBackend(name, MAX_CONCURRENT_REQUESTS.get(name, DEFAULT_MAX_CONCURRENT_REQUESTS))
+    return _backends[name]
@@ -0,0 +1,178 @@
+"""
+Кэш ответов ChatGPT для повторяющихся запросов.
+
+Ключ - хэш модели, инструкции, нормализованного текста вопроса и языка.
+Ответы хранятся в памяти (с ограничением по времени жизни и количеству записей)
+и, при включенном RESPONSE_CACHE_PERSISTENT, в таблице PostgreSQL.
+"""
+import hashlib
+import json
+import logging
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+# Время жизни ответа в кэше (секунды)
+RESPONSE_CACHE_TTL = 24 * 60 * 60
+
+# Максимальное количество ответов в памяти
+RESPONSE_CACHE_SIZE = 1000
+
+# Сохранять ответы в PostgreSQL (кэш переживает перезапуск бота и общий для нескольких процессов)
+RESPONSE_CACHE_PERSISTENT = False
+
+_cache: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()  # ключ -> (время истечения, ответ)
+_table_ready = False
+
+def _normalize(text: str) -> str:
+    """Приводит текст вопроса к единому виду: регистр, пробелы, завершающая пунктуация"""
+    text = re.sub(r"\s+", " ", (text or "").strip().lower())
+    return text.rstrip(" ?!.")
+
+def make_cache_key(model: str,
+                   messages: List[Dict[str, Any]],
+                   language: str,
+                   include_history: bool = False) -> str:
+    """
+    Формирует ключ кэша для запроса.
+
+    Args:
+        model: Название модели
+        messages: Сообщения запроса
+        language: Язык ответа
+        include_history: Учитывать ли в ключе историю диалога
+                         (все сообщения, кроме инструкции и последнего вопроса)
+
+    Returns:
+        str: Хэш запроса
+    """
+    instruction = "\n".join(msg["content"] for msg in messages if msg["role"] == "system")
+
+    question_index = next(
+        (index for index in range(len(messages) - 1, -1, -1) if messages[index]["role"] == "user"),
+        None
+    )
+    question = messages[question_index]["content"] if question_index is not None else ""
+
+    parts = [model, instruction.strip(), _normalize(question), language]
+    if include_history:
+        history = [
+            [msg["role"], msg["content"]]
+            for index, msg in enumerate(messages)
+            if msg["role"] != "system" and index != question_index
+        ]
+        parts.append(json.dumps(history, ensure_ascii=False))
+
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+def _table_name() -> str:
+    """Возвращает имя таблицы кэша с префиксом бота"""
+    from easy_bot import BOT_PREFIX
+    return f"{BOT_PREFIX}chatgpt_cache"
+
+async def _ensure_table(conn) -> None:
+    """Создает таблицу кэша ответов, если ее нет"""
+    global _table_ready
+
+    if _table_ready:
+        return
+
+    await conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {_table_name()} (
+            cache_key VARCHAR(64) PRIMARY KEY,
+            response TEXT NOT NULL,
+            expires_at TIMESTAMP NOT NULL
+        )
+    """)
+    _table_ready = True
+
+def _remember(key: str, response: str, expires_at: float) -> None:
+    """Сохраняет ответ в памяти, вытесняя самые старые записи"""
+    _cache[key] = (expires_at, response)
+    _cache.move_to_end(key)
+    while len(_cache) > RESPONSE_CACHE_SIZE:
+        _cache.popitem(last=False)
+
+async def get_cached_response(key: str) -> Optional[str]:
+    """
+    Возвращает сохраненный ответ по ключу.
+
+    Args:
+        key: Ключ кэша (make_cache_key)
+
+    Returns:
+        Текст ответа или None, если ответа нет или он устарел
+    """
+    entry = _cache.get(key)
+    if entry is not None:
+        expires_at, response = entry
+        if expires_at > time.time():
+            _cache.move_to_end(key)
+            return response
+        del _cache[key]
+
+    if not RESPONSE_CACHE_PERSISTENT:
+        return None
+
+    try:
+        from easy_bot import get_db_pool
+
+        pool = await get_db_pool()
+        if not pool:
+            return None
+
+        async with pool.acquire() as conn:
+            await _ensure_table(conn)
+            row = await conn.fetchrow(
+                f"SELECT response, expires_at FROM {_table_name()} WHERE cache_key = $1 AND expires_at > $2",
+                key, datetime.now()
+            )
+        if row is None:
+            return None
+
+        _remember(key, row["response"], row["expires_at"].timestamp())
+        return row["response"]
+    except Exception as e:
+        logging.error(f"Ошибка при чтении кэша ответов ChatGPT: {e}")
+        return None
+
+async def store_response(key: str, response: str, ttl: int = RESPONSE_CACHE_TTL) -> None:
+    """
+    Сохраняет ответ в кэше.
+
+    Args:
+        key: Ключ кэша (make_cache_key)
+        response: Текст ответа
+        ttl: Время жизни ответа (секунды)
+    """
+    _remember(key, response, time.time() + ttl)
+
+    if not RESPONSE_CACHE_PERSISTENT:
+        return
+
+    try:
+        from easy_bot import get_db_pool
+
+        pool = await get_db_pool()
+        if not pool:
+            return
+
+        async with pool.acquire() as conn:
+            await _ensure_table(conn)
+            await conn.execute(
+                f"""
+                INSERT INTO {_table_name()} (cache_key, response, expires_at)
+                VALUES ($1, $2, $3)
+                ON CONFLICT (cache_key) DO UPDATE
+                SET response = EXCLUDED.response, expires_at = EXCLUDED.expires_at
+                """,
+                key, response, datetime.now() + timedelta(seconds=ttl)
+            )
+    except Exception as e:
+        logging.error(f"Ошибка при сохранении ответа ChatGPT в кэш: {e}")
+
+def clear_response_cache() -> None:
+    """Очищает кэш ответов в памяти"""
+    _cache.clear()
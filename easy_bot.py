@@ -1,6 +1,8 @@
 import logging
 import os
+import sys
 import asyncio
+import inspect
 from datetime import datetime
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import Application, CommandHandler, CallbackQueryHandler, ContextTypes, MessageHandler, filters
@@ -16,7 +18,10 @@ __all__ = [
     'get_chat_id_from_update',
     'callbacks',
     'current_update',
-    'current_context'
+    'current_context',
+    'on_startup',
+    'on_stop',
+    'on_shutdown'
 ]
 
 # Импортируем функцию перевода
@@ -50,11 +55,18 @@ except ImportError as e:
 BOT_TOKEN = ""  # Будет загружен из файла конфигурации
 TIMEOUT = 30
 
+# Отладочный вывод обработчиков (включается уровнем DEBUG для логгера easy_bot)
+logger = logging.getLogger(__name__)
+
 # Глобальные переменные
 callbacks = {}
 current_update = None
 current_context = None
 chatgpt_handler = None  # Обработчик для ChatGPT запросов
+_startup_hooks = []  # Функции, вызываемые при запуске приложения
+_stop_hooks = []  # Функции, вызываемые после остановки обработки обновлений (бот еще доступен)
+_shutdown_hooks = []  # Функции, вызываемые при остановке приложения
+ADMIN_IDS = set()  # ID администраторов бота (credentials/telegram/admins.txt)
 
 # PostgreSQL настройки
 DB_HOST = None
@@ -65,6 +77,8 @@ DB_PASSWORD = None
 BOT_PREFIX = "tgbot_"  # Префикс по умолчанию
 db_lock = Lock()  # Блокировка для DB-операций
 db_initialized = False  # Флаг инициализации БД
+db_pool = None  # Пул соединений с БД для частых запросов
+db_pool_lock = Lock()  # Блокировка создания пула
 
 # Настройки языков
 LANGUAGES = {
@@ -127,7 +141,7 @@ async def init_preset_translations():
 
 # Импортируем обработчик опросов, если доступен
 try:
-    from base.survey import handle_survey_response
+    from base.survey import handle_survey_response, register_survey_routes
     print("Survey module imported successfully")
     has_survey_module = True
 except ImportError as e:
@@ -137,6 +151,9 @@ except ImportError as e:
 # Глобальный экземпляр приложения бота
 _bot_application = None
 
+# Маршрутизатор нажатий inline-кнопок (создается вместе с приложением)
+callback_router = None
+
 # Функция для создания экземпляра бота
 def get_bot_instance(token=None):
     """
@@ -168,12 +185,19 @@ def get_bot_instance(token=None):
             print("3. Передайте токен явно в функцию")
             return None
     
+    # Загружаем список администраторов
+    load_admins()
+    
     # Создание приложения
-    application = Application.builder().token(BOT_TOKEN).build()
+    application = Application.builder().token(BOT_TOKEN).post_init(_post_init).post_stop(_post_stop).post_shutdown(_post_shutdown).build()
     
     # Добавление обработчиков
     application.add_handler(CommandHandler("start", start_command))
     application.add_handler(CommandHandler("reload_bot", reload_bot_command))
+    application.add_handler(CommandHandler("cancel_broadcast", cancel_broadcast_command))
+    application.add_handler(CommandHandler("metrics", metrics_command))
+    application.add_handler(CommandHandler("survey_stats", survey_stats_command))
+    build_callback_router()
     application.add_handler(CallbackQueryHandler(button_callback))
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, message_handler))
     
@@ -212,6 +236,133 @@ def run_bot(token=None):
     # Эта строка не выполнится, пока бот работает
     return application
 
+# Регистрация функции, выполняемой при запуске приложения
+def on_startup(func):
+    """
+    Регистрирует асинхронную функцию, которая будет вызвана при запуске приложения
+    (например, для возобновления прерванных фоновых задач).
+    Функция получает экземпляр приложения бота.
+    """
+    _startup_hooks.append(func)
+    return func
+
+async def _post_init(application):
+    """Выполняет зарегистрированные функции запуска приложения"""
+    for hook in _startup_hooks:
+        try:
+            await hook(application)
+        except Exception as e:
+            logging.error(f"Ошибка в функции запуска {getattr(hook, '__name__', hook)}: {e}")
+
+# Регистрация функции, выполняемой после остановки обработки обновлений
+def on_stop(func):
+    """
+    Регистрирует асинхронную функцию, которая будет вызвана после остановки
+    обработки обновлений, но до закрытия соединения бота с Telegram
+    (например, для завершения отложенных запросов к Bot API).
+    Функция получает экземпляр приложения бота.
+    """
+    _stop_hooks.append(func)
+    return func
+
+async def _post_stop(application):
+    """Выполняет зарегистрированные функции остановки обработки обновлений (в обратном порядке)"""
+    for hook in reversed(_stop_hooks):
+        try:
+            await hook(application)
+        except Exception as e:
+            logging.error(f"Ошибка в функции остановки {getattr(hook, '__name__', hook)}: {e}")
+
+# Регистрация функции, выполняемой при остановке приложения
+def on_shutdown(func):
+    """
+    Регистрирует асинхронную функцию, которая будет вызвана при остановке приложения
+    (например, для закрытия соединений и сброса буферов). К этому моменту
+    соединение бота с Telegram уже закрыто: запросы к Bot API нужно завершать
+    в функциях on_stop.
+    Функция получает экземпляр приложения бота.
+    """
+    _shutdown_hooks.append(func)
+    return func
+
+async def _post_shutdown(application):
+    """Выполняет зарегистрированные функции остановки приложения (в обратном порядке)"""
+    for hook in reversed(_shutdown_hooks):
+        try:
+            await hook(application)
+        except Exception as e:
+            logging.error(f"Ошибка в функции остановки {getattr(hook, '__name__', hook)}: {e}")
+
+# Общая HTTP-сессия для внешних API создается при запуске и закрывается при остановке
+@on_startup
+async def _start_http_session(application):
+    from base.http_client import start_http_session
+    await start_http_session(application)
+
+@on_shutdown
+async def _close_http_session(application):
+    from base.http_client import close_http_session
+    await close_http_session(application)
+
+@on_shutdown
+async def _close_db_pool(application):
+    await close_db_pool()
+
+# Буферизованные записи в Google Sheets дописываются перед остановкой
+@on_shutdown
+async def _flush_sheets_writers(application):
+    writer_module = sys.modules.get("google.sheets_writer")
+    if writer_module is not None:
+        await writer_module.flush_all_writers(application)
+
+# Несохраненные изменения сессий опросов записываются в БД перед закрытием пула
+@on_shutdown
+async def _close_survey_sessions(application):
+    from base.survey.session_store import close_session_store
+    await close_session_store(application)
+
+# Накопленные ответы на опросы записываются в БД перед закрытием пула
+@on_shutdown
+async def _flush_survey_responses(application):
+    from base.survey.responses import flush_responses
+    await flush_responses(application)
+
+# Фоновые изменения клавиатур завершаются, пока соединение бота с Telegram еще открыто
+@on_stop
+async def _flush_keyboard_edits(application):
+    from base.keyboard import flush_keyboard_edits
+    await flush_keyboard_edits(application)
+
+# HTTP-сервер метрик запускается, только если задан METRICS_PORT
+@on_startup
+async def _start_metrics_server(application):
+    from base.metrics import start_metrics_server
+    await start_metrics_server(application)
+
+@on_shutdown
+async def _stop_metrics_server(application):
+    from base.metrics import stop_metrics_server
+    await stop_metrics_server(application)
+
+# Загрузка списка администраторов
+def load_admins():
+    """Загружает ID администраторов бота из credentials/telegram/admins.txt"""
+    admins_path = "credentials/telegram/admins.txt"
+    try:
+        if os.path.exists(admins_path):
+            with open(admins_path, "r") as f:
+                for line in f:
+                    line = line.strip()
+                    if line and not line.startswith("#"):
+                        ADMIN_IDS.add(int(line))
+    except Exception as e:
+        print(f"Ошибка при загрузке списка администраторов: {e}")
+    return ADMIN_IDS
+
+def is_admin(user_id):
+    """Проверяет, является ли пользователь администратором бота"""
+    return user_id in ADMIN_IDS
+
 # Функция для добавления callback
 def add_callback(callback_name, func):
     callbacks[callback_name] = func
@@ -323,6 +474,53 @@ async def get_db_connection():
         print(f"Ошибка при создании соединения с БД: {e}")
         return None
 
+# Пул соединений с БД
+async def get_db_pool():
+    """
+    Возвращает пул соединений с базой данных, создавая его при первом обращении.
+    Соединения берутся через `async with pool.acquire() as conn` и возвращаются в пул.
+    """
+    global db_pool
+    
+    if db_pool is not None:
+        return db_pool
+    
+    if asyncpg is None:
+        print("PostgreSQL не доступен - модуль asyncpg не установлен")
+        return None
+    
+    if None in (DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD):
+        print("Настройки PostgreSQL не загружены")
+        return None
+    
+    async with db_pool_lock:
+        if db_pool is None:
+            try:
+                db_pool = await asyncpg.create_pool(
+                    host=DB_HOST,
+                    port=DB_PORT,
+                    user=DB_USER,
+                    password=DB_PASSWORD,
+                    database=DB_NAME,
+                    min_size=1,
+                    max_size=10,
+                    timeout=10.0,
+                    command_timeout=10.0,
+                    ssl=False
+                )
+            except Exception as e:
+                print(f"Ошибка при создании пула соединений с БД: {e}")
+                return None
+    return db_pool
+
+async def close_db_pool():
+    """Закрывает пул соединений с базой данных"""
+    global db_pool
+    
+    if db_pool is not None:
+        await db_pool.close()
+        db_pool = None
+
 # Инициализация PostgreSQL
 async def init_postgres():
     """Инициализирует соединение с PostgreSQL и создает таблицы"""
@@ -393,6 +591,12 @@ async def create_tables(connection=None):
             )
         ''')
         
+        # Столбцы для сегментации рассылок (язык и последняя активность)
+        await connection.execute(f"ALTER TABLE {BOT_PREFIX}users ADD COLUMN IF NOT EXISTS language VARCHAR(10)")
+        await connection.execute(f"ALTER TABLE {BOT_PREFIX}users ADD COLUMN IF NOT EXISTS last_active_at TIMESTAMP")
+        await connection.execute(f"ALTER TABLE {BOT_PREFIX}users ADD COLUMN IF NOT EXISTS is_active BOOLEAN NOT NULL DEFAULT TRUE")
+        await connection.execute(f"CREATE INDEX IF NOT EXISTS {BOT_PREFIX}users_chat_id_idx ON {BOT_PREFIX}users (chat_id)")
+        
         # Таблица сообщений
         await connection.execute(f'''
             CREATE TABLE IF NOT EXISTS {BOT_PREFIX}messages (
@@ -403,6 +607,10 @@ async def create_tables(connection=None):
             )
         ''')
         
+        # Признак сообщения бота и индекс для выборки истории диалога (ChatGPT)
+        await connection.execute(f"ALTER TABLE {BOT_PREFIX}messages ADD COLUMN IF NOT EXISTS is_bot_message BOOLEAN NOT NULL DEFAULT FALSE")
+        await connection.execute(f"CREATE INDEX IF NOT EXISTS {BOT_PREFIX}messages_user_created_idx ON {BOT_PREFIX}messages (user_id, created_at)")
+        
         # Таблица переводов
         await connection.execute(f'''
             CREATE TABLE IF NOT EXISTS {BOT_PREFIX}translations (
@@ -458,6 +666,11 @@ async def add_user_to_db(user_id, chat_id, username):
                 
                 if user:
                     print(f"Пользователь {user_id} уже существует в БД")
+                    # Пользователь вернулся - снова включаем его в рассылки
+                    await connection.execute(
+                        f"UPDATE {BOT_PREFIX}users SET is_active = TRUE, chat_id = $2 WHERE id = $1 AND NOT is_active",
+                        user['id'], chat_id
+                    )
                     return user['id']
                 
                 # Добавляем нового пользователя
@@ -518,6 +731,12 @@ async def add_message_to_db(user_db_id, message_text):
                     user_db_id, message_text
                 )
                 
+                # Отмечаем активность пользователя (используется фильтрами рассылок)
+                await connection.execute(
+                    f"UPDATE {BOT_PREFIX}users SET last_active_at = CURRENT_TIMESTAMP WHERE id = $1",
+                    user_db_id
+                )
+                
                 return True
                 
         except Exception as e:
@@ -534,6 +753,31 @@ async def add_message_to_db(user_db_id, message_text):
     
     return False
 
+# Сохранение языка пользователя в БД
+async def save_user_language(user_id, lang_code):
+    """Сохраняет выбранный пользователем язык (используется фильтрами рассылок)"""
+    if not db_initialized:
+        return False
+    
+    connection = None
+    try:
+        async with db_lock:
+            connection = await get_db_connection()
+            if connection is None:
+                return False
+            
+            await connection.execute(
+                f"UPDATE {BOT_PREFIX}users SET language = $2, last_active_at = CURRENT_TIMESTAMP WHERE user_id = $1",
+                user_id, lang_code
+            )
+            return True
+    except Exception as e:
+        print(f"Ошибка при сохранении языка пользователя: {e}")
+        return False
+    finally:
+        if connection:
+            await connection.close()
+
 # Получение перевода из БД
 async def get_translation_from_db(source_text, target_language):
     """Получает перевод из базы данных"""
@@ -657,6 +901,30 @@ async def save_translation_to_db(source_text, translated_text, source_language,
     
     return False
 
+# Обработка ошибки отправки сообщения в текущий чат
+def report_delivery_error(error, chat_id=None):
+    """
+    Классифицирует ошибку отправки сообщения. Если чат недоступен
+    (бот заблокирован, чат удален), пользователь помечается неактивным
+    и исключается из последующих рассылок.
+    
+    Args:
+        error: Исключение, возникшее при отправке
+        chat_id: ID чата (по умолчанию - чат текущего обновления)
+        
+    Returns:
+        str: Результат классификации или None, если модуль доставки недоступен
+    """
+    try:
+        from base.delivery import handle_delivery_error
+    except ImportError as import_error:
+        logging.error(f"Модуль доставки недоступен: {import_error}")
+        return None
+    
+    if chat_id is None:
+        chat_id = get_chat_id_from_update()
+    return handle_delivery_error(chat_id, error)
+
 # Функция для отправки сообщения
 async def write_message(text):
     """Простая функция для отправки сообщения"""
@@ -771,6 +1039,12 @@ async def translate(text, target_lang=None):
         if current_context and hasattr(current_context, 'user_data'):
             current_context.user_data['translation_in_progress'] = False
 
+async def _settle_query_keyboard(query):
+    """Дожидается фоновой деактивации кнопок сообщения перед изменением его текста"""
+    if query.message:
+        from base.keyboard import settle_keyboard
+        await settle_keyboard(query.message.chat_id, query.message.message_id)
+
 # Функция для отправки переведенного сообщения
 async def write_translated_message(text):
     """Отправляет сообщение, переведенное на язык пользователя"""
@@ -810,6 +1084,7 @@ async def write_translated_message(text):
             )
         except Exception as e:
             logging.error(f"Ошибка при отправке сообщения об обработке: {e}")
+            report_delivery_error(e)
     
     # Выполняем перевод
     translated_text = await translate(text)
@@ -819,6 +1094,7 @@ async def write_translated_message(text):
     if current_update and current_context:
         try:
             if current_update.callback_query:
+                await _settle_query_keyboard(current_update.callback_query)
                 result_message = await current_update.callback_query.edit_message_text(text=translated_text)
             else:
                 result_message = await current_update.message.reply_text(text=translated_text)
@@ -827,6 +1103,7 @@ async def write_translated_message(text):
             await asyncio.sleep(0.2)
         except Exception as e:
             logging.error(f"Ошибка при отправке переведенного сообщения: {e}")
+            report_delivery_error(e)
     
     # Удаляем сообщение "Обрабатываю запрос..." ТОЛЬКО ПОСЛЕ отправки нового сообщения
     if processing_message and current_update and hasattr(current_update, 'effective_chat'):
@@ -892,6 +1169,7 @@ async def button(buttons_layout):
             )
         except Exception as e:
             logging.error(f"Ошибка при отправке сообщения об обработке: {e}")
+            report_delivery_error(e)
     
     try:
         # Собираем все тексты кнопок в один список для параллельного перевода
@@ -965,7 +1243,12 @@ async def button(buttons_layout):
     result_message = None
     if current_update and current_context:
         try:
-            if current_update.callback_query:
+            if current_update.callback_query and current_update.callback_query.message:
+                # Новая клавиатура не должна быть перезаписана фоновой деактивацией кнопок
+                from base.keyboard import replace_keyboard
+                query_message = current_update.callback_query.message
+                await replace_keyboard(current_context.bot, query_message.chat_id, query_message.message_id, reply_markup)
+            elif current_update.callback_query:
                 await current_update.callback_query.edit_message_reply_markup(reply_markup=reply_markup)
             else:
                 result_message = await current_update.message.reply_text(
@@ -977,6 +1260,7 @@ async def button(buttons_layout):
             await asyncio.sleep(0.2)
         except Exception as e:
             logging.error(f"Ошибка при отправке сообщения с кнопками: {e}")
+            report_delivery_error(e)
     
     # Удаляем сообщение "Обрабатываю запрос..." ТОЛЬКО ПОСЛЕ отправки нового сообщения
     if processing_message and current_update and hasattr(current_update, 'effective_chat'):
@@ -1039,6 +1323,7 @@ async def message_with_buttons(text, buttons_layout):
             )
         except Exception as e:
             logging.error(f"Ошибка при отправке сообщения об обработке: {e}")
+            report_delivery_error(e)
     
     try:
         # Собираем все тексты кнопок в один список для параллельного перевода
@@ -1114,6 +1399,7 @@ async def message_with_buttons(text, buttons_layout):
     if current_update and current_context:
         try:
             if current_update.callback_query:
+                await _settle_query_keyboard(current_update.callback_query)
                 await current_update.callback_query.edit_message_text(
                     text=translated_text,
                     reply_markup=reply_markup
@@ -1128,6 +1414,7 @@ async def message_with_buttons(text, buttons_layout):
             await asyncio.sleep(0.2)  
         except Exception as e:
             logging.error(f"Ошибка при отправке сообщения с кнопками: {e}")
+            report_delivery_error(e)
     
     # Удаляем сообщение "Обрабатываю запрос..." ТОЛЬКО ПОСЛЕ отправки нового сообщения
     if processing_message and current_update and hasattr(current_update, 'effective_chat'):
@@ -1313,124 +1600,99 @@ async def message_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await write_translated_message(f"Вы написали: {update.message.text}")
 
 # Обработчик callback запросов
+def build_callback_router():
+    """
+    Создает таблицу маршрутов нажатий inline-кнопок.
+    
+    Порядок выбора обработчика: точные маршруты, маршруты по префиксу
+    (выбор языка, кнопки экрана проверки опроса), ответ кнопкой на вопрос
+    опроса (только при активном опросе), функции, зарегистрированные через @callback.
+    """
+    global callback_router
+    from base.router import CallbackRouter
+    
+    callback_router = CallbackRouter()
+    callback_router.add("disabled", _on_disabled_button)
+    callback_router.add_prefix("lang_", _on_language_selected)
+    if has_survey_module:
+        register_survey_routes(callback_router)
+    callback_router.add_fallback(_on_registered_callback)
+    return callback_router
+
 async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     global current_update, current_context
     current_update = update
     current_context = context
     
     callback_data = update.callback_query.data
-    print(f"[HANDLER] Received callback query: {callback_data}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"[HANDLER] Received callback query: {callback_data}")
     
-    # Получаем сообщение и клавиатуру
+    try:
+        await (callback_router or build_callback_router()).dispatch(update, context)
+    except Exception as e:
+        logging.error(f"Ошибка при обработке callback {callback_data}: {e}")
+        import traceback
+        traceback.print_exc()
+
+async def _on_disabled_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    # Если кнопка "disabled", ничего не делаем
+    await update.callback_query.answer("Эта кнопка уже была нажата")
+
+async def _on_language_selected(update: Update, context: ContextTypes.DEFAULT_TYPE, value: str):
+    """Выбор языка: lang_{код языка}"""
+    # Сохраняем выбранный язык
+    context.user_data['language'] = value
+    if update.effective_user:
+        await save_user_language(update.effective_user.id, value)
+    
+    # Сообщаем о выбранном языке
+    lang_name = LANGUAGES.get(value, "Unknown")
+    await update.callback_query.answer(f"Выбран язык: {lang_name}")
+    
+    # Деактивируем кнопки языка в фоне, не дожидаясь ответа Telegram
+    from base.keyboard import deactivate_keyboard
+    deactivate_keyboard(context.bot, update.callback_query.message)
+    
+    # Запускаем стартовую функцию
+    if 'start' in callbacks:
+        await callbacks['start']()
+    else:
+        await write_translated_message("Привет! Я бот. Используйте /help для помощи.")
+
+async def _on_registered_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Функции, зарегистрированные через @callback и add_callback"""
+    callback_data = update.callback_query.data
     message = update.callback_query.message
     
-    # Проверяем, не выбор ли это языка
-    if callback_data.startswith("lang_"):
-        lang_code = callback_data.replace("lang_", "")
-        # Сохраняем выбранный язык
-        context.user_data['language'] = lang_code
-        
-        # Сообщаем о выбранном языке
-        lang_name = LANGUAGES.get(lang_code, "Unknown")
-        await update.callback_query.answer(f"Выбран язык: {lang_name}")
-        
-        # Деактивируем кнопки языка
-        if message and message.reply_markup:
-            from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-            
-            # Получаем текущую клавиатуру
-            current_keyboard = message.reply_markup.inline_keyboard
-            
-            # Создаем новую клавиатуру, делая нажатую кнопку выбранной
-            new_keyboard = []
-            for row in current_keyboard:
-                new_row = []
-                for button in row:
-                    if button.callback_data == callback_data:
-                        # Деактивируем нажатую кнопку (без изменения текста)
-                        new_button = InlineKeyboardButton(button.text, callback_data="disabled")
-                    else:
-                        # Деактивируем остальные кнопки
-                        new_button = InlineKeyboardButton(button.text, callback_data="disabled")
-                    new_row.append(new_button)
-                new_keyboard.append(new_row)
-            
-            # Обновляем клавиатуру сообщения
-            new_reply_markup = InlineKeyboardMarkup(new_keyboard)
-            await context.bot.edit_message_reply_markup(
-                chat_id=message.chat_id,
-                message_id=message.message_id,
-                reply_markup=new_reply_markup
-            )
-        
-        # Запускаем стартовую функцию
-        if 'start' in callbacks:
-            await callbacks['start']()
-        else:
-            await write_translated_message("Привет! Я бот. Используйте /help для помощи.")
-        return
-    
-    # Проверяем, есть ли обработчик опросов и пробуем обработать выбор кнопки
-    if has_survey_module:
-        try:
-            survey_handled = await handle_survey_response(update, context)
-            if survey_handled:
-                return
-        except Exception as e:
-            logging.error(f"Ошибка при обработке callback опроса: {e}")
-            import traceback
-            traceback.print_exc()
-    
-    # Если кнопка "disabled", ничего не делаем
-    if callback_data == "disabled":
+    # Повторное нажатие до того, как у пользователя обновилась клавиатура
+    from base.keyboard import deactivate_keyboard, is_keyboard_disabled
+    if message and is_keyboard_disabled(message):
         await update.callback_query.answer("Эта кнопка уже была нажата")
         return
     
     # Запускаем соответствующий обработчик callback
-    if callback_data in callbacks:
-        try:
-            callback_func = callbacks[callback_data]
-            print(f"[HANDLER] Calling callback function for {callback_data}")
-            
-            # Деактивируем кнопки в сообщении перед выполнением callback
-            if message and message.reply_markup:
-                from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-                
-                # Получаем текущую клавиатуру
-                current_keyboard = message.reply_markup.inline_keyboard
-                
-                # Создаем новую клавиатуру, делая нажатую кнопку неактивной
-                new_keyboard = []
-                for row in current_keyboard:
-                    new_row = []
-                    for button in row:
-                        if button.callback_data == callback_data:
-                            # Деактивируем нажатую кнопку (без изменения текста)
-                            new_button = InlineKeyboardButton(button.text, callback_data="disabled")
-                        else:
-                            # Деактивируем остальные кнопки
-                            new_button = InlineKeyboardButton(button.text, callback_data="disabled")
-                        new_row.append(new_button)
-                    new_keyboard.append(new_row)
-                
-                # Обновляем клавиатуру сообщения
-                new_reply_markup = InlineKeyboardMarkup(new_keyboard)
-                await context.bot.edit_message_reply_markup(
-                    chat_id=message.chat_id,
-                    message_id=message.message_id,
-                    reply_markup=new_reply_markup
-                )
-            
-            # Действительно асинхронно вызываем callback функцию
-            await callback_func()
-            print(f"[HANDLER] Callback function for {callback_data} completed")
-        except Exception as e:
-            logging.error(f"Ошибка при выполнении callback {callback_data}: {e}")
-            import traceback
-            traceback.print_exc()
-            await update.callback_query.answer(text=f"Ошибка при обработке: {e}")
-    else:
+    callback_func = callbacks.get(callback_data)
+    if callback_func is None:
         await update.callback_query.answer(text=f"Обработчик для {callback_data} не найден")
+        return
+    
+    try:
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"[HANDLER] Calling callback function for {callback_data}")
+        
+        # Деактивируем кнопки в сообщении параллельно с выполнением callback
+        deactivate_keyboard(context.bot, message)
+        
+        # Действительно асинхронно вызываем callback функцию
+        await callback_func()
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"[HANDLER] Callback function for {callback_data} completed")
+    except Exception as e:
+        logging.error(f"Ошибка при выполнении callback {callback_data}: {e}")
+        import traceback
+        traceback.print_exc()
+        await update.callback_query.answer(text=f"Ошибка при обработке: {e}")
 
 # Функция для регистрации обработчика команды /start
 def on_start(func):
@@ -1439,52 +1701,64 @@ def on_start(func):
     return func
 
 # Функция для регистрации обработчика callback
+def _make_call_adapter(func):
+    """
+    Готовит вызов функции-обработчика callback.
+    
+    Сигнатура функции разбирается один раз при регистрации: если количество
+    позиционных аргументов совпадает с количеством параметров, они передаются
+    как именованные (без разбора сигнатуры при каждом нажатии).
+    
+    Args:
+        func: Функция-обработчик
+        
+    Returns:
+        Функция call(args, kwargs), возвращающая результат func
+    """
+    try:
+        params = tuple(inspect.signature(func).parameters)
+    except (TypeError, ValueError):
+        params = None
+    
+    # Позиционные аргументы нельзя переименовать, если сигнатура неизвестна или функция принимает *args
+    if params is None or 'args' in params:
+        return lambda args, kwargs: func(*args, **kwargs)
+    
+    param_count = len(params)
+    
+    def call(args, kwargs):
+        if args and not kwargs and len(args) == param_count:
+            return func(**dict(zip(params, args)))
+        return func(*args, **kwargs)
+    return call
+
 def callback(callback_data):
     """
     Декоратор для регистрации функции как обработчика callback
     с автоматическим запуском асинхронных функций
     """
     def decorator(func):
+        call = _make_call_adapter(func)
+        
         async def async_wrapper(*args, **kwargs):
-            import inspect
-            print(f"[CALLBACK] Executing callback {callback_data} with args: {args} and kwargs: {kwargs}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"[CALLBACK] Executing callback {callback_data} with args: {args} and kwargs: {kwargs}")
             try:
                 # Автоматически обновляем глобальный chat_id при вызове callback
                 global chat_id
                 chat_id = get_chat_id_from_update()
                 
-                # Если args содержит позиционные аргументы, но функция их не ожидает,
-                # преобразуем их в именованные параметры
-                if args and not kwargs:
-                    sig = inspect.signature(func)
-                    params = list(sig.parameters.keys())
-                    
-                    # Проверяем сигнатуру функции и конвертируем позиционные аргументы в именованные
-                    if len(params) == len(args) and all(param != 'args' for param in params):
-                        kwargs = dict(zip(params, args))
-                        args = ()
-                
-                # Вызываем функцию с правильными аргументами
-                result = func(*args, **kwargs)
-                
-                # Проверяем, является ли результат корутиной (для асинхронных функций)
-                if inspect.iscoroutine(result):
-                    # Если это корутина, ожидаем ее завершения
-                    result = await result
-                    
-                print(f"[CALLBACK] Function {callback_data} returned: {result}")
+                # Вызываем функцию с правильными аргументами (корутина ожидается),
+                # затем выполняем действия auto-функций, вызванных в ней
+                from base.effects import run_with_effects
+                result = await run_with_effects(call, args, kwargs)
                 
-                # Запускаем автоматические функции
-                if current_context and 'auto_functions' in current_context.user_data:
-                    for f in current_context.user_data['auto_functions']:
-                        await f()
-                    current_context.user_data['auto_functions'] = []
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"[CALLBACK] Function {callback_data} returned: {result}")
                 
                 return result
             except Exception as e:
-                print(f"[CALLBACK] Error in callback {callback_data}: {e}")
-                import traceback
-                traceback.print_exc()
+                logger.exception(f"[CALLBACK] Error in callback {callback_data}: {e}")
                 raise
 
         callbacks[callback_data] = async_wrapper
@@ -1576,10 +1850,14 @@ async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         if update.effective_user:
             user_id = update.effective_user.id
             error = context.error
-            error_str = str(error).lower()
             
-            # Проверяем, заблокировал ли пользователь бота
-            if 'forbidden' in error_str or 'bot was blocked' in error_str or 'chat not found' in error_str:
+            # Недоступный чат помечается неактивным (группа, ставшая супергруппой, получает новый chat_id)
+            from telegram.error import Forbidden
+            chat_id = update.effective_chat.id if update.effective_chat else user_id
+            report_delivery_error(error, chat_id)
+            
+            # Данные удаляются, только если пользователь заблокировал бота в личном чате
+            if isinstance(error, Forbidden) and chat_id == user_id:
                 print(f"Пользователь {user_id} заблокировал бота. Удаляем его данные из БД.")
                 await delete_user_data(user_id)
                 
@@ -1615,61 +1893,116 @@ async def reload_bot_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
     # Показываем выбор языка
     await show_language_selection()
 
+# Обработчик команды /cancel_broadcast
+async def cancel_broadcast_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Отменяет выполняющуюся рассылку: /cancel_broadcast [id задания]"""
+    if not update.effective_user or not is_admin(update.effective_user.id):
+        await update.message.reply_text("Команда доступна только администраторам")
+        return
+    
+    job_id = None
+    if context.args:
+        try:
+            job_id = int(context.args[0])
+        except ValueError:
+            await update.message.reply_text("Использование: /cancel_broadcast [id задания]")
+            return
+    
+    from announcement import cancel_broadcast_job, get_broadcast_job
+    cancelled = await cancel_broadcast_job(job_id)
+    
+    if not cancelled:
+        await update.message.reply_text("Нет выполняющихся рассылок для отмены")
+        return
+    
+    text = f"Отменено рассылок: {cancelled}"
+    if job_id is not None:
+        job = await get_broadcast_job(job_id)
+        if job:
+            text += f"\nОтправлено: {job['sent_count']}, ошибок: {job['failed_count']}, всего: {job['total_count']}"
+    await update.message.reply_text(text)
+
+# Команда просмотра метрик
+async def metrics_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Показывает текущие метрики бота: /metrics"""
+    if not update.effective_user or not is_admin(update.effective_user.id):
+        await update.message.reply_text("Команда доступна только администраторам")
+        return
+    
+    from base.metrics import render_metrics
+    text = render_metrics().strip() or "Метрики пока не собраны"
+    
+    # Ограничение длины сообщения Telegram
+    if len(text) > 4000:
+        text = text[:4000] + "\n..."
+    await update.message.reply_text(text)
+
+# Команда просмотра статистики опросов
+async def survey_stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Показывает воронку и время ответов по опросам: /survey_stats [survey_id]"""
+    if not update.effective_user or not is_admin(update.effective_user.id):
+        await update.message.reply_text("Команда доступна только администраторам")
+        return
+    
+    from base.survey.stats import render_survey_stats
+    survey_id = context.args[0] if context.args else None
+    text = render_survey_stats(survey_id).strip() or "Статистика опросов пока не собрана"
+    
+    # Ограничение длины сообщения Telegram
+    if len(text) > 4000:
+        text = text[:4000] + "\n..."
+    await update.message.reply_text(text)
+
 # Добавляем новые функции-обертки для упрощения использования бота
 def auto_write_translated_message(text):
     """
     Синхронная обертка для write_translated_message.
-    Автоматически запускает асинхронную функцию в текущем обработчике.
+    Сообщение отправляется после выполнения текущего обработчика
+    (тексты всех auto-функций обработчика переводятся одним вызовом).
     """
+    from base.effects import EFFECT_MESSAGE, Effect, queue_effect
+    queue_effect(Effect(EFFECT_MESSAGE, text))
+    
     async def wrapper():
         await write_translated_message(text)
-    
-    if 'auto_functions' not in current_context.user_data:
-        current_context.user_data['auto_functions'] = []
-    
-    current_context.user_data['auto_functions'].append(wrapper)
     return wrapper
 
 def auto_button(buttons_layout):
     """
     Синхронная обертка для button.
-    Автоматически запускает асинхронную функцию в текущем обработчике.
+    Кнопки отправляются после выполнения текущего обработчика.
     """
+    from base.effects import EFFECT_BUTTONS, Effect, queue_effect
+    queue_effect(Effect(EFFECT_BUTTONS, buttons_layout=buttons_layout))
+    
     async def wrapper():
         await button(buttons_layout)
-    
-    if 'auto_functions' not in current_context.user_data:
-        current_context.user_data['auto_functions'] = []
-    
-    current_context.user_data['auto_functions'].append(wrapper)
     return wrapper
 
 def auto_message_with_buttons(text, buttons_layout):
     """
     Синхронная обертка для message_with_buttons.
-    Автоматически запускает асинхронную функцию в текущем обработчике.
+    Сообщение отправляется после выполнения текущего обработчика.
     """
+    from base.effects import EFFECT_MESSAGE_WITH_BUTTONS, Effect, queue_effect
+    queue_effect(Effect(EFFECT_MESSAGE_WITH_BUTTONS, text, buttons_layout))
+    
     async def wrapper():
         await message_with_buttons(text, buttons_layout)
-    
-    if 'auto_functions' not in current_context.user_data:
-        current_context.user_data['auto_functions'] = []
-    
-    current_context.user_data['auto_functions'].append(wrapper)
     return wrapper
 
 def auto_translate(text, target_lang=None):
     """
     Синхронная обертка для translate.
-    Автоматически запускает асинхронную функцию и возвращает результат.
+    Текст переводится вместе с остальными текстами обработчика,
+    возвращаемая функция получает перевод из кэша.
     """
+    if target_lang is None:
+        from base.effects import EFFECT_TRANSLATE, Effect, queue_effect
+        queue_effect(Effect(EFFECT_TRANSLATE, text))
+    
     async def wrapper():
         return await translate(text, target_lang)
-    
-    if 'auto_functions' not in current_context.user_data:
-        current_context.user_data['auto_functions'] = []
-    
-    current_context.user_data['auto_functions'].append(wrapper)
     return wrapper
 
 # Модифицируем декораторы для автоматического запуска асинхронных функций
@@ -1679,11 +2012,8 @@ def start(func):
     с автоматическим запуском асинхронных функций
     """
     async def wrapper():
-        func()
-        if current_context and 'auto_functions' in current_context.user_data:
-            for f in current_context.user_data['auto_functions']:
-                await f()
-            current_context.user_data['auto_functions'] = []
+        from base.effects import run_with_effects
+        await run_with_effects(func)
 
     callbacks['start'] = wrapper
     return func
@@ -1694,11 +2024,8 @@ def on_auto_text_message(func):
     с автоматическим запуском асинхронных функций
     """
     async def wrapper(text):
-        func(text)
-        if current_context and 'auto_functions' in current_context.user_data:
-            for f in current_context.user_data['auto_functions']:
-                await f()
-            current_context.user_data['auto_functions'] = []
+        from base.effects import run_with_effects
+        await run_with_effects(func, text)
 
     callbacks['text_message'] = wrapper
     return func
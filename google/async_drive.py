@@ -0,0 +1,286 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from google.oauth2 import service_account
+from googleapiclient.discovery import build
+
+# Scope of the Drive client (also covers changes.list)
+SCOPES = ['https://www.googleapis.com/auth/drive.readonly']
+
+# Metadata fields requested for every file
+FILE_FIELDS = 'id, name, mimeType, size, createdTime, modifiedTime, parents, trashed'
+
+# Files requested per page
+DEFAULT_PAGE_SIZE = 100
+
+# Minimum time between two changes.list checks (seconds)
+DEFAULT_CHANGES_INTERVAL = 10
+
+# Worker threads for blocking Google API calls
+DEFAULT_MAX_WORKERS = 4
+
+logger = logging.getLogger(__name__)
+
+def build_query(folder_id: Optional[str] = None, query: Optional[str] = None) -> str:
+    """
+    Build the files.list query the same way as GoogleDrive.list_files.
+
+    Args:
+        folder_id: Optional folder ID to list files from
+        query: Optional search query
+
+    Returns:
+        The query string
+    """
+    if folder_id:
+        return f"'{folder_id}' in parents"
+    return query or "trashed = false"
+
+class AsyncGoogleDrive:
+    """
+    Async Google Drive client with a listing and metadata cache.
+
+    Blocking googleapiclient calls run in a thread pool with a service object
+    per worker thread. Listings are cached per query and metadata per file.
+    Instead of re-listing, the cache is kept up to date through the changes
+    API: a start token is saved before the first listing and only the changes
+    made since then are fetched (at most once per changes_interval seconds).
+    Folder listings are patched with the changed files; listings by arbitrary
+    queries cannot be evaluated locally and are dropped when anything changes.
+    """
+
+    def __init__(
+        self,
+        credentials_path: str,
+        changes_interval: float = DEFAULT_CHANGES_INTERVAL,
+        max_workers: int = DEFAULT_MAX_WORKERS
+    ):
+        """
+        Initialize the client.
+
+        Args:
+            credentials_path: Path to the service account credentials JSON file
+            changes_interval: Minimum time between two changes checks (seconds)
+            max_workers: Number of worker threads for Google API calls
+        """
+        self.credentials = service_account.Credentials.from_service_account_file(
+            credentials_path,
+            scopes=SCOPES
+        )
+        self.changes_interval = changes_interval
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='google-drive')
+        self._local = threading.local()
+
+        # file_id -> metadata
+        self._metadata: Dict[str, Dict[str, Any]] = {}
+        # query -> (folder_id or None, file_id -> metadata)
+        self._listings: Dict[str, tuple] = {}
+        self._start_token: Optional[str] = None
+        self._synced_at = 0.0
+        self._sync_lock = asyncio.Lock()
+
+    def _drive(self):
+        """Return the Drive service of the current worker thread"""
+        drive = getattr(self._local, 'drive', None)
+        if drive is None:
+            drive = build('drive', 'v3', credentials=self.credentials, cache_discovery=False)
+            self._local.drive = drive
+        return drive
+
+    async def _run(self, func):
+        """Run a blocking call in the thread pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func)
+
+    async def iter_files(
+        self,
+        folder_id: Optional[str] = None,
+        query: Optional[str] = None,
+        page_size: int = DEFAULT_PAGE_SIZE
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        List files page by page without the cache.
+
+        Args:
+            folder_id: Optional folder ID to list files from
+            query: Optional search query
+            page_size: Files requested per page
+
+        Yields:
+            File metadata dictionaries
+        """
+        q = build_query(folder_id, query)
+        page_token = None
+        while True:
+            response = await self._run(
+                lambda token=page_token: self._drive().files().list(
+                    q=q,
+                    pageSize=page_size,
+                    pageToken=token,
+                    fields=f'nextPageToken, files({FILE_FIELDS})'
+                ).execute()
+            )
+            for file in response.get('files', []):
+                self._metadata[file['id']] = file
+                yield file
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                break
+
+    async def list_files(
+        self,
+        folder_id: Optional[str] = None,
+        query: Optional[str] = None,
+        use_cache: bool = True
+    ) -> List[Dict[str, Any]]:
+        """
+        List files in a folder or matching a query.
+
+        Args:
+            folder_id: Optional folder ID to list files from
+            query: Optional search query
+            use_cache: Serve the listing from the cache when possible
+
+        Returns:
+            List of file metadata dictionaries
+        """
+        q = build_query(folder_id, query)
+        if use_cache:
+            await self._ensure_start_token()
+            await self.sync_changes()
+            cached = self._listings.get(q)
+            if cached is not None:
+                return list(cached[1].values())
+
+        files = {}
+        async for file in self.iter_files(folder_id, query):
+            files[file['id']] = file
+        self._listings[q] = (folder_id, files)
+        return list(files.values())
+
+    async def get_file_metadata(self, file_id: str, use_cache: bool = True) -> Dict[str, Any]:
+        """
+        Get metadata for a file.
+
+        Args:
+            file_id: The ID of the file
+            use_cache: Serve the metadata from the cache when possible
+
+        Returns:
+            Dictionary containing file metadata
+        """
+        if use_cache:
+            await self._ensure_start_token()
+            await self.sync_changes()
+            cached = self._metadata.get(file_id)
+            if cached is not None:
+                return cached
+
+        metadata = await self._run(
+            lambda: self._drive().files().get(fileId=file_id, fields=FILE_FIELDS).execute()
+        )
+        self._metadata[file_id] = metadata
+        return metadata
+
+    async def _ensure_start_token(self) -> None:
+        """Save the changes start token before anything is cached"""
+        if self._start_token is None:
+            self._start_token = await self._run(
+                lambda: self._drive().changes().getStartPageToken().execute()['startPageToken']
+            )
+            self._synced_at = time.monotonic()
+
+    async def sync_changes(self, force: bool = False) -> int:
+        """
+        Apply the changes made since the last check to the cache.
+
+        Args:
+            force: Check even if changes_interval has not passed
+
+        Returns:
+            Number of changed files
+        """
+        if self._start_token is None:
+            return 0
+        if not force and time.monotonic() - self._synced_at < self.changes_interval:
+            return 0
+
+        async with self._sync_lock:
+            # Another caller may have synced while we were waiting for the lock
+            if not force and time.monotonic() - self._synced_at < self.changes_interval:
+                return 0
+
+            changes = []
+            page_token = self._start_token
+            while True:
+                response = await self._run(
+                    lambda token=page_token: self._drive().changes().list(
+                        pageToken=token,
+                        pageSize=1000,
+                        fields=f'nextPageToken, newStartPageToken, changes(fileId, removed, file({FILE_FIELDS}))'
+                    ).execute()
+                )
+                changes.extend(response.get('changes', []))
+                if 'newStartPageToken' in response:
+                    self._start_token = response['newStartPageToken']
+                    break
+                page_token = response['nextPageToken']
+
+            self._synced_at = time.monotonic()
+            for change in changes:
+                self._apply_change(change)
+            if changes:
+                logger.debug(f"Applied {len(changes)} Drive changes to the cache")
+            return len(changes)
+
+    def _apply_change(self, change: Dict[str, Any]) -> None:
+        """Update cached metadata and listings with one change"""
+        file_id = change['fileId']
+        file = None if change.get('removed') else change.get('file')
+        if file is not None and file.get('trashed'):
+            file = None
+
+        if file is None:
+            self._metadata.pop(file_id, None)
+        else:
+            self._metadata[file_id] = file
+
+        parents = set(file.get('parents', [])) if file is not None else set()
+        for q in list(self._listings):
+            folder_id, files = self._listings[q]
+            if folder_id is None:
+                # Arbitrary queries cannot be evaluated locally
+                del self._listings[q]
+            elif folder_id in parents:
+                files[file_id] = file
+            else:
+                files.pop(file_id, None)
+
+    def invalidate(self) -> None:
+        """Drop all cached listings and metadata"""
+        self._listings.clear()
+        self._metadata.clear()
+
+    def close(self) -> None:
+        """Shut down the worker threads"""
+        self._executor.shutdown(wait=False)
+
+# Example usage:
+"""
+drive = AsyncGoogleDrive('credentials/google/credentials.json')
+
+# First call lists the folder, the next ones are served from memory
+# and only fetch the changes made since then
+files = await drive.list_files(folder_id='your-folder-id')
+
+# Iterate over a large listing page by page
+async for file in drive.iter_files(query="name contains 'report'"):
+    print(file['name'])
+
+# Metadata of a single file
+metadata = await drive.get_file_metadata('your-file-id')
+"""
@@ -0,0 +1,311 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from google.oauth2 import service_account
+from googleapiclient.discovery import build
+
+from .sheets import GoogleSheets, SCOPES
+
+# Time a cached range is served without any check (seconds)
+DEFAULT_CACHE_TTL = 60
+
+# Scope needed to read the spreadsheet version from Drive
+DRIVE_METADATA_SCOPE = 'https://www.googleapis.com/auth/drive.metadata.readonly'
+
+# Worker threads for blocking Google API calls
+DEFAULT_MAX_WORKERS = 4
+
+# Marks a spreadsheet version that has not been requested yet
+_UNKNOWN = object()
+
+logger = logging.getLogger(__name__)
+
+class AsyncGoogleSheets:
+    """
+    Async Google Sheets client with an in-memory range cache.
+
+    Blocking googleapiclient calls run in a thread pool, so handlers do not block
+    the event loop. Each worker thread has its own service object (httplib2 is not
+    thread-safe). Cached ranges are served from memory for cache_ttl seconds; after
+    that the spreadsheet version is checked through Drive and the values are
+    re-read only if the spreadsheet has changed. Writes through this client
+    invalidate the cache of the spreadsheet.
+    """
+
+    def __init__(
+        self,
+        credentials_path: str,
+        cache_ttl: float = DEFAULT_CACHE_TTL,
+        revision_check: bool = True,
+        max_workers: int = DEFAULT_MAX_WORKERS
+    ):
+        """
+        Initialize the client.
+
+        Args:
+            credentials_path: Path to the service account credentials JSON file
+            cache_ttl: Time a cached range is served without any check (seconds, 0 disables the cache)
+            revision_check: Check the spreadsheet version in Drive before re-reading expired ranges
+            max_workers: Number of worker threads for Google API calls
+        """
+        scopes = SCOPES + ([DRIVE_METADATA_SCOPE] if revision_check else [])
+        self.credentials = service_account.Credentials.from_service_account_file(
+            credentials_path,
+            scopes=scopes
+        )
+        self.cache_ttl = cache_ttl
+        self.revision_check = revision_check
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='google-sheets')
+        self._local = threading.local()
+
+        # (spreadsheet_id, range) -> (fetched_at, version, values)
+        self._cache: Dict[Tuple[str, str], Tuple[float, Optional[str], List[List[Any]]]] = {}
+        # Reads in progress, shared by concurrent callers of the same ranges
+        self._inflight: Dict[Tuple[str, Tuple[str, ...]], asyncio.Future] = {}
+
+    def _sheets(self) -> GoogleSheets:
+        """Return the Sheets client of the current worker thread"""
+        sheets = getattr(self._local, 'sheets', None)
+        if sheets is None:
+            sheets = GoogleSheets(None, credentials=self.credentials)
+            self._local.sheets = sheets
+        return sheets
+
+    def _drive(self):
+        """Return the Drive service of the current worker thread"""
+        drive = getattr(self._local, 'drive', None)
+        if drive is None:
+            drive = build('drive', 'v3', credentials=self.credentials, cache_discovery=False)
+            self._local.drive = drive
+        return drive
+
+    async def _run(self, func):
+        """Run a blocking call in the thread pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func)
+
+    async def get_version(self, spreadsheet_id: str) -> Optional[str]:
+        """
+        Get the current version of the spreadsheet from Drive.
+
+        Args:
+            spreadsheet_id: The ID of the spreadsheet
+
+        Returns:
+            Version string, or None if revision checks are disabled or unavailable
+        """
+        if not self.revision_check:
+            return None
+        try:
+            return await self._run(
+                lambda: self._drive().files().get(fileId=spreadsheet_id, fields='version').execute().get('version')
+            )
+        except Exception as e:
+            logger.warning(f"Could not get spreadsheet version, re-reading ranges: {e}")
+            return None
+
+    async def batch_get(
+        self,
+        spreadsheet_id: str,
+        ranges: List[str],
+        use_cache: bool = True
+    ) -> Dict[str, List[List[Any]]]:
+        """
+        Read several ranges, serving fresh ones from the cache and
+        fetching the rest in a single batchGet request.
+
+        Args:
+            spreadsheet_id: The ID of the spreadsheet
+            ranges: The ranges to read (e.g., ['Sheet1!A1:B10', 'Config'])
+            use_cache: Serve ranges from the cache when possible
+
+        Returns:
+            Dictionary mapping each requested range to its data
+        """
+        now = time.monotonic()
+        result = {}
+        expired = []
+        missing = []
+
+        for range_name in ranges:
+            entry = self._cache.get((spreadsheet_id, range_name)) if use_cache and self.cache_ttl > 0 else None
+            if entry is None:
+                missing.append(range_name)
+            elif now - entry[0] < self.cache_ttl:
+                result[range_name] = entry[2]
+            else:
+                expired.append(range_name)
+
+        # Expired ranges are still valid if the spreadsheet has not changed since they were read
+        if expired:
+            version = await self.get_version(spreadsheet_id)
+            for range_name in expired:
+                fetched_at, cached_version, values = self._cache[(spreadsheet_id, range_name)]
+                if version is not None and version == cached_version:
+                    self._cache[(spreadsheet_id, range_name)] = (time.monotonic(), version, values)
+                    result[range_name] = values
+                else:
+                    missing.append(range_name)
+
+        if missing:
+            result.update(await self._fetch(spreadsheet_id, missing, version if expired else _UNKNOWN))
+
+        return {range_name: result[range_name] for range_name in ranges}
+
+    async def _fetch(self, spreadsheet_id: str, ranges: List[str], version=_UNKNOWN) -> Dict[str, List[List[Any]]]:
+        """Fetch ranges from the API and store them in the cache"""
+        key = (spreadsheet_id, tuple(ranges))
+        future = self._inflight.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            # Version is read before the values, so a change made in between triggers a re-read later
+            if version is _UNKNOWN:
+                version = await self.get_version(spreadsheet_id)
+            values = await self._run(lambda: self._sheets().batch_get(spreadsheet_id, ranges))
+            fetched_at = time.monotonic()
+            for range_name, range_values in values.items():
+                self._cache[(spreadsheet_id, range_name)] = (fetched_at, version, range_values)
+            future.set_result(values)
+            return values
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                # Mark the exception as retrieved when nobody else is waiting for it
+                future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    async def read_range(
+        self,
+        spreadsheet_id: str,
+        range_name: str,
+        use_cache: bool = True
+    ) -> List[List[Any]]:
+        """
+        Read data from a specific range in the spreadsheet.
+
+        Args:
+            spreadsheet_id: The ID of the spreadsheet
+            range_name: The range to read (e.g., 'Sheet1!A1:B10')
+            use_cache: Serve the range from the cache when possible
+
+        Returns:
+            List of lists containing the data
+        """
+        result = await self.batch_get(spreadsheet_id, [range_name], use_cache=use_cache)
+        return result[range_name]
+
+    async def write_range(
+        self,
+        spreadsheet_id: str,
+        range_name: str,
+        values: List[List[Any]]
+    ) -> None:
+        """
+        Write data to a specific range in the spreadsheet.
+
+        Args:
+            spreadsheet_id: The ID of the spreadsheet
+            range_name: The range to write to (e.g., 'Sheet1!A1:B10')
+            values: List of lists containing the data to write
+        """
+        await self._run(lambda: self._sheets().write_range(spreadsheet_id, range_name, values))
+        self.invalidate(spreadsheet_id)
+
+    async def batch_update(
+        self,
+        spreadsheet_id: str,
+        data: Dict[str, List[List[Any]]]
+    ) -> None:
+        """
+        Write several ranges of the spreadsheet in one request.
+
+        Args:
+            spreadsheet_id: The ID of the spreadsheet
+            data: Dictionary mapping ranges to the data to write
+        """
+        await self._run(lambda: self._sheets().batch_update(spreadsheet_id, data))
+        self.invalidate(spreadsheet_id)
+
+    async def append_row(
+        self,
+        spreadsheet_id: str,
+        range_name: str,
+        values: List[Any]
+    ) -> None:
+        """
+        Append a row to the spreadsheet.
+
+        Args:
+            spreadsheet_id: The ID of the spreadsheet
+            range_name: The range to append to (e.g., 'Sheet1')
+            values: List containing the values for the new row
+        """
+        await self._run(lambda: self._sheets().append_row(spreadsheet_id, range_name, values))
+        self.invalidate(spreadsheet_id)
+
+    async def append_rows(
+        self,
+        spreadsheet_id: str,
+        range_name: str,
+        rows: List[List[Any]],
+        insert_data_option: Optional[str] = None
+    ) -> None:
+        """
+        Append several rows to the spreadsheet in one request.
+
+        Args:
+            spreadsheet_id: The ID of the spreadsheet
+            range_name: The range to append to (e.g., 'Sheet1')
+            rows: List of rows, each a list of values
+            insert_data_option: 'INSERT_ROWS' to insert new rows for the data or
+                'OVERWRITE' to write after the table; None uses the API default (OVERWRITE)
+        """
+        await self._run(lambda: self._sheets().append_rows(spreadsheet_id, range_name, rows, insert_data_option))
+        self.invalidate(spreadsheet_id)
+
+    def invalidate(self, spreadsheet_id: Optional[str] = None) -> None:
+        """
+        Drop cached ranges.
+
+        Args:
+            spreadsheet_id: The spreadsheet to drop, or None to drop everything
+        """
+        if spreadsheet_id is None:
+            self._cache.clear()
+            return
+        for key in [key for key in self._cache if key[0] == spreadsheet_id]:
+            del self._cache[key]
+
+    def close(self) -> None:
+        """Shut down the worker threads"""
+        self._executor.shutdown(wait=False)
+
+# Example usage:
+"""
+sheets = AsyncGoogleSheets('credentials/google/credentials.json', cache_ttl=60)
+
+# Read a range (served from memory for the next 60 seconds,
+# then re-read only if the spreadsheet has changed)
+config = await sheets.read_range('your-spreadsheet-id', 'Config!A:B')
+
+# Read several ranges in one request
+data = await sheets.batch_get('your-spreadsheet-id', ['Sheet1!A1:B10', 'Prices'])
+
+# Write several ranges in one request
+await sheets.batch_update('your-spreadsheet-id', {
+    'Sheet1!A1:B1': [['Name', 'Age']],
+    'Sheet1!A2:B2': [['John', '25']]
+})
+"""
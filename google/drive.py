@@ -1,11 +1,43 @@
 import os
-from typing import Optional
+import asyncio
+import hashlib
+import logging
+import random
+import threading
+import time
+from typing import AsyncIterator, Iterator, Optional
 from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 from google.oauth2 import service_account
 from googleapiclient.http import MediaIoBaseDownload
+import httplib2
 import io
 
+# Bytes requested per Range request when streaming a file
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Attempts per chunk on quota and server errors
+DEFAULT_MAX_RETRIES = 5
+
+# Backoff between attempts (seconds)
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 32.0
+
+# HTTP statuses worth retrying: quota exceeded and temporary server errors
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+# Network errors worth retrying: connection resets, timeouts, DNS failures
+RETRYABLE_ERRORS = (OSError, httplib2.HttpLib2Error)
+
+# Suffix of a partially downloaded file
+PARTIAL_SUFFIX = '.part'
+
+logger = logging.getLogger(__name__)
+
+class ChecksumMismatchError(Exception):
+    """Downloaded file does not match the MD5 checksum reported by Drive"""
+
 class GoogleDrive:
     """A class to handle Google Drive operations."""
     
@@ -20,7 +52,22 @@ class GoogleDrive:
             credentials_path,
             scopes=['https://www.googleapis.com/auth/drive.readonly']
         )
-        self.service = build('drive', 'v3', credentials=self.credentials)
+        self.service = self._build_service()
+        # httplib2 is not thread-safe: every thread gets its own service
+        self._local = threading.local()
+        self._local.drive = self.service
+    
+    def _build_service(self):
+        """Build a new Drive service"""
+        return build('drive', 'v3', credentials=self.credentials, cache_discovery=False)
+    
+    def _drive(self):
+        """Return the Drive service of the current thread"""
+        drive = getattr(self._local, 'drive', None)
+        if drive is None:
+            drive = self._build_service()
+            self._local.drive = drive
+        return drive
     
     def download_file(
         self,
@@ -37,22 +84,207 @@ class GoogleDrive:
         Returns:
             The file contents as bytes
         """
-        request = self.service.files().get_media(fileId=file_id)
+        if save_path:
+            # Stream to disk first, so the contents are held in memory only once
+            self.download_to_file(file_id, save_path)
+            with open(save_path, 'rb') as f:
+                return f.read()
+        
+        request = self._drive().files().get_media(fileId=file_id)
         file = io.BytesIO()
-        downloader = MediaIoBaseDownload(file, request)
+        downloader = MediaIoBaseDownload(file, request, chunksize=DEFAULT_CHUNK_SIZE)
         done = False
         
         while done is False:
             status, done = downloader.next_chunk()
         
-        file.seek(0)
-        file_contents = file.read()
+        return file.getvalue()
+    
+    def iter_file(
+        self,
+        file_id: str,
+        start: int = 0,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        max_retries: int = DEFAULT_MAX_RETRIES
+    ) -> Iterator[bytes]:
+        """
+        Stream a file from Google Drive in chunks using Range requests.
+        
+        Only one chunk is held in memory at a time. Quota and server errors
+        are retried with exponential backoff.
         
-        if save_path:
-            with open(save_path, 'wb') as f:
-                f.write(file_contents)
+        Args:
+            file_id: The ID of the file to download
+            start: Byte offset to start from (for resuming)
+            chunk_size: Bytes requested per request
+            max_retries: Attempts per chunk on quota and server errors
+            
+        Yields:
+            Consecutive chunks of the file contents
+        """
+        return self._iter_chunks(self._drive(), file_id, start, chunk_size, max_retries)
+    
+    def _iter_chunks(self, service, file_id: str, start: int, chunk_size: int, max_retries: int) -> Iterator[bytes]:
+        """Stream a file with the given Drive service (see iter_file)"""
+        request = service.files().get_media(fileId=file_id)
+        offset = start
+        total = None
+        
+        while total is None or offset < total:
+            headers = dict(request.headers)
+            headers['range'] = f'bytes={offset}-{offset + chunk_size - 1}'
+            resp, content = self._request_chunk(request, headers, max_retries)
+            
+            if resp.status == 416:
+                # Range starts at the end of the file: nothing left to download
+                return
+            if resp.status == 200:
+                # Server ignored the range and sent the whole file
+                total = len(content)
+                content = content[offset:]
+            else:
+                content_range = resp.get('content-range', '')
+                total = int(content_range.rsplit('/', 1)[1]) if '/' in content_range and not content_range.endswith('*') else None
+                if total is None and len(content) < chunk_size:
+                    total = offset + len(content)
+            
+            if not content:
+                return
+            offset += len(content)
+            yield content
+    
+    def _request_chunk(self, request, headers: dict, max_retries: int):
+        """Request one range of a file, retrying quota, server and network errors"""
+        for attempt in range(1, max_retries + 1):
+            try:
+                resp, content = request.http.request(request.uri, method='GET', headers=headers)
+            except RETRYABLE_ERRORS as e:
+                if attempt == max_retries:
+                    raise
+                reason = repr(e)
+            else:
+                if resp.status in (200, 206, 416):
+                    return resp, content
+                if resp.status not in RETRYABLE_STATUSES or attempt == max_retries:
+                    raise HttpError(resp, content, uri=request.uri)
+                reason = resp.status
+            delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempt - 1)))
+            logger.warning(f"Drive download failed with {reason}, retrying in {delay:.1f}s ({attempt}/{max_retries})")
+            time.sleep(delay)
+    
+    def download_to_file(
+        self,
+        file_id: str,
+        save_path: str,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        resume: bool = True,
+        verify: bool = True
+    ) -> str:
+        """
+        Download a file from Google Drive straight to disk in constant memory.
+        
+        Chunks are appended to save_path + '.part', which is renamed to
+        save_path once the download is complete. If the download fails, the
+        next call continues from the end of the partial file.
         
-        return file_contents
+        Args:
+            file_id: The ID of the file to download
+            save_path: Path to save the file to
+            chunk_size: Bytes requested per request
+            resume: Continue from an existing partial file
+            verify: Check the MD5 checksum reported by Drive
+            
+        Returns:
+            The path of the downloaded file
+            
+        Raises:
+            ChecksumMismatchError: The downloaded file is corrupted (the partial file is removed)
+        """
+        metadata = self._drive().files().get(fileId=file_id, fields='size,md5Checksum').execute()
+        expected_md5 = metadata.get('md5Checksum') if verify else None
+        expected_size = int(metadata['size']) if 'size' in metadata else None
+        
+        part_path = save_path + PARTIAL_SUFFIX
+        offset = os.path.getsize(part_path) if resume and os.path.exists(part_path) else 0
+        if expected_size is not None and offset > expected_size:
+            # Partial file belongs to another version of the file
+            offset = 0
+        
+        md5 = hashlib.md5()
+        if offset and expected_md5:
+            # Hash the already downloaded part without loading it at once
+            with open(part_path, 'rb') as f:
+                for block in iter(lambda: f.read(chunk_size), b''):
+                    md5.update(block)
+        if offset:
+            logger.info(f"Resuming download of {file_id} from byte {offset}")
+        
+        with open(part_path, 'ab' if offset else 'wb') as f:
+            for chunk in self.iter_file(file_id, start=offset, chunk_size=chunk_size):
+                f.write(chunk)
+                if expected_md5:
+                    md5.update(chunk)
+        
+        if expected_md5 and md5.hexdigest() != expected_md5:
+            os.remove(part_path)
+            raise ChecksumMismatchError(f"MD5 mismatch for {file_id}: expected {expected_md5}, got {md5.hexdigest()}")
+        
+        os.replace(part_path, save_path)
+        return save_path
+    
+    async def aiter_file(
+        self,
+        file_id: str,
+        start: int = 0,
+        chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> AsyncIterator[bytes]:
+        """
+        Stream a file from Google Drive as an async iterator.
+        
+        Each chunk is requested in a worker thread, so the event loop is not
+        blocked. The download uses its own Drive service, because consecutive
+        chunks may be requested from different threads. Useful for forwarding
+        a file without saving it first.
+        
+        Args:
+            file_id: The ID of the file to download
+            start: Byte offset to start from
+            chunk_size: Bytes requested per request
+            
+        Yields:
+            Consecutive chunks of the file contents
+        """
+        loop = asyncio.get_running_loop()
+        service = await loop.run_in_executor(None, self._build_service)
+        chunks = self._iter_chunks(service, file_id, start, chunk_size, DEFAULT_MAX_RETRIES)
+        done = object()
+        while True:
+            chunk = await loop.run_in_executor(None, next, chunks, done)
+            if chunk is done:
+                break
+            yield chunk
+    
+    async def download_to_file_async(
+        self,
+        file_id: str,
+        save_path: str,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        resume: bool = True,
+        verify: bool = True
+    ) -> str:
+        """
+        Download a file to disk in a worker thread (see download_to_file).
+        
+        The worker thread uses its own Drive service.
+        
+        Returns:
+            The path of the downloaded file
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None,
+            lambda: self.download_to_file(file_id, save_path, chunk_size=chunk_size, resume=resume, verify=verify)
+        )
     
     def get_file_metadata(self, file_id: str) -> dict:
         """
@@ -64,7 +296,7 @@ class GoogleDrive:
         Returns:
             Dictionary containing file metadata
         """
-        return self.service.files().get(
+        return self._drive().files().get(
             fileId=file_id,
             fields='id,name,mimeType,size,createdTime,modifiedTime'
         ).execute()
@@ -89,7 +321,7 @@ class GoogleDrive:
         elif not query:
             query = "trashed = false"
         
-        results = self.service.files().list(
+        results = self._drive().files().list(
             q=query,
             fields='files(id, name, mimeType, size, createdTime, modifiedTime)'
         ).execute()
@@ -106,6 +338,14 @@ file_contents = drive.download_file(
     save_path='downloaded_file.pdf'
 )
 
+# Download a large file to disk in constant memory
+# (an interrupted download continues from the partial file on the next call)
+drive.download_to_file('your-file-id', 'video.mp4', chunk_size=16 * 1024 * 1024)
+
+# Stream a file without saving it
+async for chunk in drive.aiter_file('your-file-id'):
+    await process_chunk(chunk)
+
 # Get file metadata
 metadata = drive.get_file_metadata('your-file-id')
 print(f"File name: {metadata['name']}")
@@ -1,12 +1,30 @@
 import os
 import json
+import time
+import asyncio
+import hashlib
 import logging
 import aiohttp
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, List, Any, Tuple
+
+logger = logging.getLogger(__name__)
 
 # Глобальная переменная для хранения URL API
 _api_url = None
 
+# Таймауты запроса к API
+API_TIMEOUT = aiohttp.ClientTimeout(total=30, connect=10)
+
+# Возраст снимка таблицы, после которого он обновляется в фоне (секунды)
+SNAPSHOT_REFRESH_INTERVAL = 300
+
+# Каталог для снимков таблиц (сохраняются между перезапусками бота)
+SNAPSHOT_DIR = "cache/google_sheets"
+
+# Снимки таблиц: (spreadsheet_id, лист) -> (время загрузки, данные)
+_snapshots: Dict[Tuple[str, str], Tuple[float, Any]] = {}
+_refresh_tasks: Dict[Tuple[str, str], asyncio.Task] = {}
+
 def load_api_key():
     """Загружает URL API для доступа к Google Sheets."""
     global _api_url
@@ -49,7 +67,104 @@ def load_api_key():
     logging.warning("API URL для Google Sheets не найден. Функция будет недоступна.")
     return False
 
-async def get_sheets(spreadsheet_id: str, need_sheet: Optional[str] = None) -> Optional[List[List[Any]]]:
+def _snapshot_path(key: Tuple[str, str]) -> str:
+    """Возвращает путь к файлу снимка таблицы на диске"""
+    name = hashlib.sha1("\x1f".join(key).encode("utf-8")).hexdigest()
+    return os.path.join(SNAPSHOT_DIR, f"{name}.json")
+
+def _load_snapshot(key: Tuple[str, str]) -> Optional[Tuple[float, Any]]:
+    """Загружает снимок таблицы с диска"""
+    path = _snapshot_path(key)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+        return snapshot["fetched_at"], snapshot["data"]
+    except Exception as e:
+        logger.warning(f"Не удалось прочитать снимок таблицы {path}: {e}")
+        return None
+
+def _save_snapshot(key: Tuple[str, str], fetched_at: float, data: Any) -> None:
+    """Сохраняет снимок таблицы на диск (атомарно, через временный файл)"""
+    try:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        path = _snapshot_path(key)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"fetched_at": fetched_at, "data": data}, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logger.warning(f"Не удалось сохранить снимок таблицы: {e}")
+
+async def _refresh_snapshot(key: Tuple[str, str]) -> Optional[Any]:
+    """Загружает таблицу из API и обновляет снимок в памяти и на диске"""
+    spreadsheet_id, need_sheet = key
+    data = await _fetch_sheets(spreadsheet_id, need_sheet or None)
+    if data is None:
+        return None
+    
+    fetched_at = time.time()
+    _snapshots[key] = (fetched_at, data)
+    await asyncio.get_running_loop().run_in_executor(None, _save_snapshot, key, fetched_at, data)
+    return data
+
+def _schedule_refresh(key: Tuple[str, str]) -> None:
+    """Запускает фоновое обновление снимка, если оно еще не выполняется"""
+    task = _refresh_tasks.get(key)
+    if task is not None and not task.done():
+        return
+    
+    async def refresh():
+        try:
+            await _refresh_snapshot(key)
+        except Exception as e:
+            logger.error(f"Ошибка при фоновом обновлении таблицы {key[0]}: {e}")
+        finally:
+            _refresh_tasks.pop(key, None)
+    
+    _refresh_tasks[key] = asyncio.create_task(refresh())
+
+async def get_sheets(spreadsheet_id: str,
+                     need_sheet: Optional[str] = None,
+                     use_cache: bool = True,
+                     max_age: float = SNAPSHOT_REFRESH_INTERVAL) -> Optional[List[List[Any]]]:
+    """
+    Получает данные из Google Sheets.
+    
+    Данные отдаются из снимка в памяти (или на диске, после перезапуска бота).
+    Если снимок старше max_age, он все равно возвращается, а в фоне запускается
+    его обновление. API вызывается в обработчике только при первом обращении к таблице.
+    
+    Args:
+        spreadsheet_id: ID таблицы Google Sheets
+        need_sheet: Имя листа (необязательно)
+        use_cache: Использовать снимок (False - всегда запрашивать API)
+        max_age: Возраст снимка, после которого он обновляется в фоне (секунды)
+        
+    Returns:
+        Данные из таблицы или None в случае ошибки
+    """
+    key = (spreadsheet_id, need_sheet or "")
+    
+    if not use_cache:
+        return await _refresh_snapshot(key)
+    
+    snapshot = _snapshots.get(key)
+    if snapshot is None:
+        snapshot = _load_snapshot(key)
+        if snapshot is not None:
+            _snapshots[key] = snapshot
+    
+    if snapshot is None:
+        return await _refresh_snapshot(key)
+    
+    fetched_at, data = snapshot
+    if time.time() - fetched_at > max_age:
+        _schedule_refresh(key)
+    return data
+
+async def _fetch_sheets(spreadsheet_id: str, need_sheet: Optional[str] = None) -> Optional[List[List[Any]]]:
     """
     Получает данные из Google Sheets через API.
     
@@ -65,6 +180,8 @@ async def get_sheets(spreadsheet_id: str, need_sheet: Optional[str] = None) -> O
             logging.error("API URL не найден. Невозможно выполнить запрос.")
             return None
     
+    from base.http_client import get_http_session
+    
     try:
         # Настраиваем запрос к API
         data = {
@@ -79,53 +196,54 @@ async def get_sheets(spreadsheet_id: str, need_sheet: Optional[str] = None) -> O
             "Content-Type": "application/json"
         }
         
-        print(f"Отправка запроса к API Google Sheets: {_api_url}")
-        print(f"Параметры: spreadsheet_id={spreadsheet_id}, need_sheet={need_sheet}")
+        logger.debug(f"Отправка запроса к API Google Sheets: {_api_url}")
+        logger.debug(f"Параметры: spreadsheet_id={spreadsheet_id}, need_sheet={need_sheet}")
         
-        async with aiohttp.ClientSession() as session:
-            async with session.post(_api_url, 
-                                  headers=headers, 
-                                  json=data) as response:
-                if response.status != 200:
-                    error_text = await response.text()
-                    print(f"Ошибка API ({response.status}): {error_text}")
-                    return None
-                
-                # Получаем ответ
-                response_text = await response.text()
-                print(f"Ответ от API: {response_text[:200]}...")  # Выводим первые 200 символов ответа
+        session = await get_http_session()
+        async with session.post(_api_url, 
+                              headers=headers, 
+                              json=data,
+                              timeout=API_TIMEOUT) as response:
+            if response.status != 200:
+                error_text = await response.text()
+                logger.error(f"Ошибка API ({response.status}): {error_text}")
+                return None
+            
+            # Получаем ответ
+            response_text = await response.text()
+            logger.debug(f"Ответ от API: {response_text[:200]}...")  # Выводим первые 200 символов ответа
+            
+            try:
+                # Пробуем распарсить JSON
+                result = json.loads(response_text)
                 
-                try:
-                    # Пробуем распарсить JSON
-                    result = json.loads(response_text)
-                    
-                    # Проверяем разные варианты полей в ответе
-                    if isinstance(result, list):
-                        # Если ответ сразу пришел как список, возвращаем его
-                        return result
-                    elif isinstance(result, dict):
-                        # Ищем данные в различных полях JSON
-                        if "data" in result:
-                            return result["data"]
-                        elif "values" in result:
-                            return result["values"]
-                        elif "result" in result:
-                            return result["result"]
-                        elif "rows" in result:
-                            return result["rows"]
-                        else:
-                            # Если не нашли известных полей, возвращаем весь словарь
-                            print(f"Неизвестный формат ответа: {result}")
-                            return result
+                # Проверяем разные варианты полей в ответе
+                if isinstance(result, list):
+                    # Если ответ сразу пришел как список, возвращаем его
+                    return result
+                elif isinstance(result, dict):
+                    # Ищем данные в различных полях JSON
+                    if "data" in result:
+                        return result["data"]
+                    elif "values" in result:
+                        return result["values"]
+                    elif "result" in result:
+                        return result["result"]
+                    elif "rows" in result:
+                        return result["rows"]
                     else:
-                        print(f"Неизвестный формат ответа: {result}")
-                        return None
-                except json.JSONDecodeError:
-                    print(f"Не удалось распарсить JSON: {response_text[:100]}...")
+                        # Если не нашли известных полей, возвращаем весь словарь
+                        logger.warning(f"Неизвестный формат ответа: {result}")
+                        return result
+                else:
+                    logger.warning(f"Неизвестный формат ответа: {result}")
                     return None
-                    
+            except json.JSONDecodeError:
+                logger.error(f"Не удалось распарсить JSON: {response_text[:100]}...")
+                return None
+                
     except Exception as e:
-        print(f"Ошибка при вызове API Google Sheets: {e}")
+        logger.error(f"Ошибка при вызове API Google Sheets: {e}")
         return None
 
 # Загружаем API ключ при импорте модуля
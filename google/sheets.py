@@ -1,23 +1,26 @@
-from typing import List, Any, Optional
+from typing import Dict, List, Any, Optional
 from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
 from google.oauth2 import service_account
 
+SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
+
 class GoogleSheets:
     """A class to handle Google Sheets operations."""
     
-    def __init__(self, credentials_path: str):
+    def __init__(self, credentials_path: str, credentials=None):
         """
         Initialize Google Sheets client.
         
         Args:
             credentials_path: Path to the service account credentials JSON file
+            credentials: Already loaded credentials (credentials_path is ignored if given)
         """
-        self.credentials = service_account.Credentials.from_service_account_file(
+        self.credentials = credentials or service_account.Credentials.from_service_account_file(
             credentials_path,
-            scopes=['https://www.googleapis.com/auth/spreadsheets']
+            scopes=SCOPES
         )
-        self.service = build('sheets', 'v4', credentials=self.credentials)
+        self.service = build('sheets', 'v4', credentials=self.credentials, cache_discovery=False)
         self.sheets = self.service.spreadsheets()
     
     def read_range(
@@ -42,6 +45,57 @@ class GoogleSheets:
         
         return result.get('values', [])
     
+    def batch_get(
+        self,
+        spreadsheet_id: str,
+        ranges: List[str]
+    ) -> Dict[str, List[List[Any]]]:
+        """
+        Read several ranges of the spreadsheet in one request.
+        
+        Args:
+            spreadsheet_id: The ID of the spreadsheet
+            ranges: The ranges to read (e.g., ['Sheet1!A1:B10', 'Config'])
+            
+        Returns:
+            Dictionary mapping each requested range to its data
+        """
+        result = self.sheets.values().batchGet(
+            spreadsheetId=spreadsheet_id,
+            ranges=ranges
+        ).execute()
+        
+        value_ranges = result.get('valueRanges', [])
+        return {
+            range_name: value_range.get('values', [])
+            for range_name, value_range in zip(ranges, value_ranges)
+        }
+    
+    def batch_update(
+        self,
+        spreadsheet_id: str,
+        data: Dict[str, List[List[Any]]]
+    ) -> None:
+        """
+        Write several ranges of the spreadsheet in one request.
+        
+        Args:
+            spreadsheet_id: The ID of the spreadsheet
+            data: Dictionary mapping ranges to the data to write
+        """
+        body = {
+            'valueInputOption': 'RAW',
+            'data': [
+                {'range': range_name, 'values': values}
+                for range_name, values in data.items()
+            ]
+        }
+        
+        self.sheets.values().batchUpdate(
+            spreadsheetId=spreadsheet_id,
+            body=body
+        ).execute()
+    
     def write_range(
         self,
         spreadsheet_id: str,
@@ -81,15 +135,39 @@ class GoogleSheets:
             range_name: The range to append to (e.g., 'Sheet1')
             values: List containing the values for the new row
         """
+        self.append_rows(spreadsheet_id, range_name, [values])
+    
+    def append_rows(
+        self,
+        spreadsheet_id: str,
+        range_name: str,
+        rows: List[List[Any]],
+        insert_data_option: Optional[str] = None
+    ) -> None:
+        """
+        Append several rows to the spreadsheet in one request.
+        
+        Args:
+            spreadsheet_id: The ID of the spreadsheet
+            range_name: The range to append to (e.g., 'Sheet1')
+            rows: List of rows, each a list of values
+            insert_data_option: 'INSERT_ROWS' to insert new rows for the data or
+                'OVERWRITE' to write after the table; None uses the API default (OVERWRITE)
+        """
         body = {
-            'values': [values]
+            'values': rows
         }
         
+        options = {}
+        if insert_data_option is not None:
+            options['insertDataOption'] = insert_data_option
+        
         self.sheets.values().append(
             spreadsheetId=spreadsheet_id,
             range=range_name,
             valueInputOption='RAW',
-            body=body
+            body=body,
+            **options
         ).execute()
 
 # Example usage:
@@ -115,4 +193,10 @@ sheets.append_row(
     'Sheet1',
     ['Jane', '30']
 )
+
+# Read several ranges at once
+data = sheets.batch_get(
+    'your-spreadsheet-id',
+    ['Sheet1!A1:B10', 'Config!A:B']
+)
 """ 
\ No newline at end of file
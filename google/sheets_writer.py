@@ -0,0 +1,211 @@
+import asyncio
+import logging
+import random
+import weakref
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from googleapiclient.errors import HttpError
+
+from .async_sheets import AsyncGoogleSheets
+
+# Rows buffered per (spreadsheet_id, range) before an immediate flush
+DEFAULT_MAX_ROWS = 100
+
+# Maximum time a row waits in the buffer (seconds)
+DEFAULT_FLUSH_INTERVAL = 5.0
+
+# Maximum rows kept per range while Sheets is unavailable; the oldest rows are dropped
+DEFAULT_MAX_BUFFERED_ROWS = 10000
+
+# Attempts per flush on quota and server errors
+DEFAULT_MAX_RETRIES = 5
+
+# Backoff between attempts (seconds)
+RETRY_BASE_DELAY = 2.0
+RETRY_MAX_DELAY = 64.0
+
+# HTTP statuses worth retrying: quota exceeded and temporary server errors
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+logger = logging.getLogger(__name__)
+
+# Writers that must be flushed on shutdown
+_writers = weakref.WeakSet()
+
+class BufferedSheetsWriter:
+    """
+    Buffered writer for appending rows to Google Sheets.
+
+    Rows are accumulated per (spreadsheet_id, range) and written with one
+    values.append request when max_rows rows are buffered or flush_interval
+    seconds have passed since the first buffered row. Quota (429) and server
+    errors are retried with exponential backoff; rows of a failed flush are
+    kept in the buffer for the next one, up to max_buffered_rows per range.
+    Rows rejected with a non-retryable error (e.g. 400, 403) are passed to
+    dead_letter, if given, and dropped.
+    """
+
+    def __init__(
+        self,
+        sheets: AsyncGoogleSheets,
+        max_rows: int = DEFAULT_MAX_ROWS,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        max_buffered_rows: int = DEFAULT_MAX_BUFFERED_ROWS,
+        dead_letter: Optional[Callable[[str, str, List[List[Any]], Exception], None]] = None
+    ):
+        """
+        Initialize the writer.
+
+        Args:
+            sheets: Async Google Sheets client
+            max_rows: Rows buffered per range before an immediate flush
+            flush_interval: Maximum time a row waits in the buffer (seconds)
+            max_retries: Attempts per flush on quota and server errors
+            max_buffered_rows: Maximum rows kept per range; the oldest rows are dropped
+            dead_letter: Called with (spreadsheet_id, range_name, rows, error) for rows
+                rejected with a non-retryable error
+        """
+        self.sheets = sheets
+        self.max_rows = max_rows
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.max_buffered_rows = max(max_buffered_rows, max_rows)
+        self.dead_letter = dead_letter
+        self._buffers: Dict[Tuple[str, str], List[List[Any]]] = {}
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+        self._timers: Dict[Tuple[str, str], asyncio.Task] = {}
+        self._flushes: Dict[Tuple[str, str], asyncio.Task] = {}
+        _writers.add(self)
+
+    async def append_row(self, spreadsheet_id: str, range_name: str, values: List[Any]) -> None:
+        """
+        Buffer a row for appending to the spreadsheet.
+
+        Args:
+            spreadsheet_id: The ID of the spreadsheet
+            range_name: The range to append to (e.g., 'Sheet1')
+            values: List containing the values for the new row
+        """
+        key = (spreadsheet_id, range_name)
+        buffer = self._buffers.setdefault(key, [])
+        buffer.append(list(values))
+        self._trim(key)
+
+        if len(buffer) >= self.max_rows:
+            # The flush runs in the background so the caller does not wait for the Sheets API
+            if key not in self._flushes:
+                task = asyncio.create_task(self._flush_key(key))
+                self._flushes[key] = task
+                task.add_done_callback(lambda _, key=key: self._flushes.pop(key, None))
+        elif key not in self._timers:
+            self._timers[key] = asyncio.create_task(self._flush_later(key))
+
+    def _trim(self, key: Tuple[str, str]) -> None:
+        """Drop the oldest rows of a range above max_buffered_rows"""
+        buffer = self._buffers.get(key)
+        overflow = len(buffer) - self.max_buffered_rows if buffer else 0
+        if overflow > 0:
+            del buffer[:overflow]
+            logger.error(f"Sheets buffer for {key[1]} is full, dropped {overflow} oldest rows")
+
+    def pending_rows(self) -> int:
+        """Return the number of rows waiting to be written"""
+        return sum(len(buffer) for buffer in self._buffers.values())
+
+    async def _flush_later(self, key: Tuple[str, str]) -> None:
+        """Flush a buffer after flush_interval"""
+        try:
+            await asyncio.sleep(self.flush_interval)
+        finally:
+            if self._timers.get(key) is asyncio.current_task():
+                del self._timers[key]
+        await self._flush_key(key)
+
+    async def _flush_key(self, key: Tuple[str, str]) -> None:
+        """Write the buffered rows of one range"""
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            rows = self._buffers.get(key)
+            if not rows:
+                return
+            self._buffers[key] = []
+
+            timer = self._timers.pop(key, None)
+            if timer is not None and timer is not asyncio.current_task():
+                timer.cancel()
+
+            spreadsheet_id, range_name = key
+            try:
+                await self._append_with_retry(spreadsheet_id, range_name, rows)
+            except Exception as e:
+                status = getattr(getattr(e, 'resp', None), 'status', None)
+                if isinstance(e, HttpError) and int(status or 0) not in RETRYABLE_STATUSES:
+                    # The request itself is rejected: retrying the same rows would fail forever
+                    logger.error(f"Sheets rejected {len(rows)} rows for {range_name} with {status}, dropping them: {e}")
+                    if self.dead_letter is not None:
+                        try:
+                            self.dead_letter(spreadsheet_id, range_name, rows, e)
+                        except Exception as dead_letter_error:
+                            logger.error(f"Dead letter handler failed for {range_name}: {dead_letter_error}")
+                    return
+                # Keep the rows (before the ones buffered meanwhile) for the next flush
+                self._buffers[key] = rows + self._buffers.get(key, [])
+                self._trim(key)
+                logger.error(f"Failed to append {len(rows)} rows to {range_name}: {e}")
+                if key not in self._timers:
+                    self._timers[key] = asyncio.create_task(self._flush_later(key))
+
+    async def _append_with_retry(self, spreadsheet_id: str, range_name: str, rows: List[List[Any]]) -> None:
+        """Append rows, retrying quota and server errors with exponential backoff"""
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                await self.sheets.append_rows(spreadsheet_id, range_name, rows)
+                logger.debug(f"Appended {len(rows)} rows to {range_name}")
+                return
+            except HttpError as e:
+                status = getattr(e.resp, 'status', None)
+                if int(status or 0) not in RETRYABLE_STATUSES or attempt == self.max_retries:
+                    raise
+                delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempt - 1)))
+                logger.warning(f"Sheets append failed with {status}, retrying in {delay:.1f}s ({attempt}/{self.max_retries})")
+                await asyncio.sleep(delay)
+
+    async def flush(self) -> None:
+        """Write all buffered rows"""
+        await asyncio.gather(*(self._flush_key(key) for key in list(self._buffers)))
+
+    async def close(self) -> None:
+        """Stop the timers and write all buffered rows"""
+        for timer in list(self._timers.values()):
+            timer.cancel()
+        self._timers.clear()
+        if self._flushes:
+            await asyncio.gather(*self._flushes.values(), return_exceptions=True)
+        await self.flush()
+        _writers.discard(self)
+
+async def flush_all_writers(application=None) -> None:
+    """
+    Flush and close every buffered writer (called on bot shutdown).
+
+    Args:
+        application: Bot application instance (unused)
+    """
+    for writer in list(_writers):
+        try:
+            await writer.close()
+        except Exception as e:
+            logger.error(f"Failed to flush Sheets writer: {e}")
+
+# Example usage:
+"""
+sheets = AsyncGoogleSheets('credentials/google/credentials.json')
+writer = BufferedSheetsWriter(sheets, max_rows=100, flush_interval=5)
+
+# Rows are written in batches of up to 100 rows, at most 5 seconds later
+await writer.append_row('your-spreadsheet-id', 'Results', ['Jane', '30'])
+
+# Write everything that is still buffered
+await writer.flush()
+"""
@@ -57,17 +57,19 @@ async def process_survey_results(answers, update=None, context=None):
             questions = []
             if update and update.effective_user:
                 user_id = update.effective_user.id
-                from base.survey.survey import _active_surveys
-                if user_id in _active_surveys:
-                    survey_data = _active_surveys[user_id].get('data', {})
-                    questions = survey_data.get('questions', [])
+                from base.survey.session_store import get_session_store
+                from base.survey.survey import get_survey_definition
+                progress = get_session_store().peek(user_id)
+                definition = get_survey_definition(progress.survey_id) if progress else None
+                if definition:
+                    questions = definition.questions
             
             # Если удалось получить вопросы, форматируем ответы с их названиями
             if questions and len(questions) >= len(answers):
                 for i, answer in enumerate(answers):
                     if i < len(questions):
                         # Извлекаем текст вопроса без пояснений в скобках
-                        question_text = questions[i]['text']
+                        question_text = questions[i].text
                         if '(' in question_text:
                             question_text = question_text.split('(')[0].strip()
                         message += f"🔸 <b>{question_text}:</b> {answer}\n"
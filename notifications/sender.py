@@ -15,6 +15,9 @@ from base.db import (
     mark_notification_as_sent, fix_notification_timezone, 
     NOTIFICATIONS_TABLE, get_db_connection, get_notifications_to_send
 )
+from base.delivery import (
+    DELIVERY_DEAD, DELIVERY_RETRY, handle_delivery_error, resend_chat_id, retry_delay, flush_inactive_chats
+)
 
 # Получаем логгер
 logger = logging.getLogger(__name__)
@@ -81,11 +84,12 @@ async def check_notifications(context):
             
             # Отправляем с повторными попытками
             max_retries = 3
+            target_chat_id = user_id
             for attempt in range(1, max_retries + 1):
                 try:
                     # Отправляем сообщение пользователю
                     await context.bot.send_message(
-                        chat_id=user_id,
+                        chat_id=target_chat_id,
                         text=f"🔔 Напоминание: {message}"
                     )
                     logger.info(f"Уведомление #{notification_id} успешно отправлено пользователю {user_id}")
@@ -100,18 +104,26 @@ async def check_notifications(context):
                 except Exception as e:
                     error_traceback = traceback.format_exc()
                     logger.error(f"Попытка {attempt}/{max_retries} - Ошибка при отправке уведомления #{notification_id} пользователю {user_id}: {e}")
-                    if "bot was blocked by the user" in str(e).lower():
-                        logger.warning(f"Бот заблокирован пользователем {user_id}, пометка уведомления как отправленное")
+                    
+                    # Классифицируем ошибку: недоступный чат помечается неактивным
+                    kind = handle_delivery_error(target_chat_id, e)
+                    if kind == DELIVERY_DEAD:
+                        logger.warning(f"Чат пользователя {user_id} недоступен, пометка уведомления как отправленное")
                         mark_notification_as_sent(notification_id)
                         break
                     
-                    if attempt < max_retries:
-                        wait_time = 2 * attempt  # Увеличиваем время ожидания с каждой попыткой
+                    if kind == DELIVERY_RETRY and attempt < max_retries:
+                        target_chat_id = resend_chat_id(target_chat_id, e)
+                        wait_time = retry_delay(e, attempt)  # Увеличиваем время ожидания с каждой попыткой
                         logger.info(f"Повторная попытка через {wait_time} секунд...")
                         await asyncio.sleep(wait_time)
                     else:
-                        logger.error(f"Не удалось отправить уведомление #{notification_id} после {max_retries} попыток")
+                        logger.error(f"Не удалось отправить уведомление #{notification_id} после {attempt} попыток")
                         logger.error(f"Трассировка ошибки: {error_traceback}")
+                        break
+        
+        # Помечаем недоступные чаты одним запросом
+        await flush_inactive_chats()
     except Exception as e:
         error_traceback = traceback.format_exc()
         logger.error(f"Критическая ошибка в функции проверки уведомлений: {e}")